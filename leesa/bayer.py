@@ -1,154 +1,346 @@
+import functools
+import concurrent.futures
 import PIL.Image
 from leesa.image import *
+from leesa.color import image_rgb_to_lum_itu7096
+from leesa.raw import raw_format_bits, raw_write
 import numpy as np
 
+# CFA patterns, one string per pattern row
+_CFA_PATTERNS = {
+    'RGGB': ['RG',
+             'GB'],
+    'BGGR': ['BG',
+             'GR'],
+    'GRBG': ['GR',
+             'BG'],
+    'GBRG': ['GB',
+             'RG'],
+    'X-TRANS': ['GBRGRB',
+                'RGGBGG',
+                'BGGRGG',
+                'GRBGBR',
+                'BGGRGG',
+                'RGGBGG'],
+    'QUAD-BAYER': ['RRGG',
+                   'RRGG',
+                   'GGBB',
+                   'GGBB'],
+    'RGBW': ['WBWG',
+             'BWGW',
+             'WGWR',
+             'GWRW'],
+}
+# the channel for every CFA color, W is the luminance of RGB
+_CFA_CHANNELS = {'R': 0, 'G': 1, 'B': 2, 'W': 3}
+# the order and names of the per channel planes
+_CFA_CHANNEL_NAMES = ['r', 'g', 'b', 'w']
+# raw plane data type for the bit depth
+_BIT_DEPTH = {8: np.uint8, 10: np.uint16, 12: np.uint16, 16: np.uint16}
+# the rgb_to_bayer output types
+_BAYER_OUTPUT = {'channels', 'mosaic', 'raw'}
+# input images of the batch conversion
+_BAYER_BATCH_EXTENSIONS = {'.png', '.bmp', '.jpg', '.jpeg', '.tif', '.tiff'}
+
+
+def cfa_pattern_add(bayer_type: str = None, pattern: list = None) -> None:
+    """
+    Add the CFA pattern definition, any NxM pattern is accepted.
+
+    :param bayer_type: the pattern name
+    :param pattern: list of N strings with M colors each, the colors are 'R', 'G', 'B' and 'W'.
+                    example - ['GR', 'BG']
+    :return: None
+    """
+    if bayer_type is None:
+        raise ValueError("The Bayer type must be non-empty.")
+    if pattern is None or len(pattern) == 0 or len(pattern[0]) == 0:
+        raise ValueError("The pattern must be non-empty.")
+    for row in pattern:
+        if len(row) != len(pattern[0]):
+            raise ValueError("All pattern rows must have the same length.")
+        for e in row:
+            if e not in _CFA_CHANNELS:
+                raise ValueError("The pattern color {0} is not exist.".format(e))
+    _CFA_PATTERNS[bayer_type] = [str(row) for row in pattern]
+    cfa_sites.cache_clear()
+
+
+@functools.lru_cache(maxsize=64)
+def cfa_sites(bayer_type: str = 'RGGB', height: int = 0, width: int = 0) -> tuple:
+    """
+    The precomputed CFA sites of the pattern for the frame shape. Every site is a strided view
+    of the frame, so the conversion of many frames with one shape does only the copies.
+
+    :param bayer_type: Bayer type, key of the _CFA_PATTERNS
+    :param height: frame height
+    :param width: frame width
+    :return: tuple of (channel, rows slice, columns slice) sites, grouped by channel
+    """
+    if bayer_type not in _CFA_PATTERNS:
+        raise ValueError("This Bayer type is not supported yet.")
+    pattern = _CFA_PATTERNS[bayer_type]
+    ph = len(pattern)
+    pw = len(pattern[0])
+    sites = []
+    for dy, row in enumerate(pattern):
+        for dx, color in enumerate(row):
+            if dy < height and dx < width:
+                sites.append((_CFA_CHANNELS[color], slice(dy, height, ph), slice(dx, width, pw)))
+    return tuple(sorted(sites, key=lambda e: e[0]))
+
+
+def cfa_pattern(bayer_type: str = 'RGGB') -> list:
+    """
+    The CFA pattern definition.
+
+    :param bayer_type: Bayer type, key of the _CFA_PATTERNS
+    :return: list of pattern rows
+    """
+    if bayer_type not in _CFA_PATTERNS:
+        raise ValueError("This Bayer type is not supported yet.")
+    return list(_CFA_PATTERNS[bayer_type])
+
+
+def cfa_channels(bayer_type: str = 'RGGB') -> list:
+    """
+    The channels of the per channel planes: R, G, B and W if the pattern has W.
+
+    :param bayer_type: Bayer type, key of the _CFA_PATTERNS
+    :return: list of channels
+    """
+    if bayer_type not in _CFA_PATTERNS:
+        raise ValueError("This Bayer type is not supported yet.")
+    has_w = any('W' in row for row in _CFA_PATTERNS[bayer_type])
+    return [0, 1, 2, 3] if has_w else [0, 1, 2]
+
+
+def _cfa_site_values(img: np.ndarray, channel: int, sy: slice, sx: slice) -> np.ndarray:
+    if img.ndim == 2:
+        return img[sy, sx]
+    if channel == 3:
+        # W site is the luminance of RGB
+        return np.rint(image_rgb_to_lum_itu7096(img[sy, sx, :3])).clip(0, 255).astype(img.dtype)
+    return img[sy, sx, channel]
+
+
+def rgb_to_cfa_channel(c: np.ndarray = None, bayer_type: str = 'RGGB', channel: int = 0) -> np.ndarray:
+    """
+    Keep the pixels of one channel plane at the sites of this channel, other pixels are zero.
+
+    :param c: the channel plane with shape (height, width)
+    :param bayer_type: Bayer type, key of the _CFA_PATTERNS
+    :param channel: 0 - R, 1 - G, 2 - B, 3 - W
+    :return: the channel plane with CFA applied
+    """
+    if c is None:
+        raise ValueError("Image object must be non-empty.")
+    c = np.asarray(c)
+    r = np.zeros_like(c)
+    for e, sy, sx in cfa_sites(bayer_type, c.shape[0], c.shape[1]):
+        if e == channel:
+            r[sy, sx] = c[sy, sx]
+    return r
+
 
 def rgb_to_xtrans(c, channel):
-    # filter red
-    fr = [[0, 0, 1, 0, 1, 0],
-          [1, 0, 0, 0, 0, 0],
-          [0, 0, 0, 1, 0, 0],
-          [0, 1, 0, 0, 0, 1],
-          [0, 0, 0, 1, 0, 0],
-          [1, 0, 0, 0, 0, 0]]
-    # filter green
-    fg = [[1, 0, 0, 1, 0, 0],
-          [0, 1, 1, 0, 1, 1],
-          [0, 1, 1, 0, 1, 1],
-          [1, 0, 0, 1, 0, 0],
-          [0, 1, 1, 0, 1, 1],
-          [0, 1, 1, 0, 1, 1]]
-    # filter blue
-    fb = [[0, 1, 0, 0, 0, 1],
-          [0, 0, 0, 1, 0, 0],
-          [1, 0, 0, 0, 0, 0],
-          [0, 0, 1, 0, 1, 0],
-          [1, 0, 0, 0, 0, 0],
-          [0, 0, 0, 1, 0, 0]]
-
-    f = fr
-    if channel == 1:
-        f = fg
-    elif channel == 2:
-        f = fb
-    # # limit height by multiplier of 6
-    # h = len(c) // 6 * 6
-    # # limit width by multiplier of 6
-    # w = len(c[0]) // 6 * 6
-    #
-    # for y in range(0, h, 6):
-    #     for x in range(0, w, 6):
-    #         c[y:y + 6, x:x + 6] = c[y:y + 6, x:x + 6] * f
-
-    ht = len(c) // 6 + 1
-    wt = len(c[0]) // 6 + 1
-    f = np.tile(f, (ht, wt))
-    f = f[0:len(c), 0:len(c[0])]
-    c = c * f
-    return c
+    return rgb_to_cfa_channel(c=c, bayer_type='X-TRANS', channel=channel)
 
 
 def rgb_to_rggb(c, channel):
-    # filter red
-    fr = [[1, 0],
-          [0, 0]]
-    # filter green
-    fg = [[0, 1],
-          [1, 0]]
-    # filter blue
-    fb = [[0, 0],
-          [0, 1]]
-
-    f = fr
-    if channel == 1:
-        f = fg
-    elif channel == 2:
-        f = fb
-
-    ht = len(c) // 2 + 1
-    wt = len(c[0]) // 2 + 1
-    f = np.tile(f, (ht, wt))
-    f = f[0:len(c), 0:len(c[0])]
-    c = c * f
-    return c
+    return rgb_to_cfa_channel(c=c, bayer_type='RGGB', channel=channel)
+
 
 def rgb_to_bggr(c, channel):
-    # filter red
-    fr = [[0, 0],
-          [0, 1]]
-    # filter green
-    fg = [[0, 1],
-          [1, 0]]
-    # filter blue
-    fb = [[1, 0],
-          [0, 0]]
-
-    f = fr
-    if channel == 1:
-        f = fg
-    elif channel == 2:
-        f = fb
-
-    ht = len(c) // 2 + 1
-    wt = len(c[0]) // 2 + 1
-    f = np.tile(f, (ht, wt))
-    f = f[0:len(c), 0:len(c[0])]
-    c = c * f
-    return c
-
-
-def rgb_to_bayer(image_name: str = None, dir_name: str = None, bayer_type: str = 'RGGB') -> list:
+    return rgb_to_cfa_channel(c=c, bayer_type='BGGR', channel=channel)
+
+
+def rgb_to_mosaic(img: np.ndarray = None, bayer_type: str = 'RGGB', bit_depth: int = 8) -> np.ndarray:
+    """
+    Convert RGB image to the single raw plane as the sensor outputs it.
+    Every CFA site is copied by strided slice assignment, no masks and no type promotion.
+
+    :param img: RGB image as uint8 array with shape (height, width, 3 or 4)
+    :param bayer_type: Bayer type, key of the _CFA_PATTERNS
+    :param bit_depth: 8 - uint8 plane, 10, 12 or 16 - uint16 plane with 8 bits values shifted
+                      to the most significant bits
+    :return: raw plane with shape (height, width)
+    """
+    if img is None:
+        raise ValueError("Image object must be non-empty.")
+    if bayer_type not in _CFA_PATTERNS:
+        raise ValueError("This Bayer type is not supported yet.")
+    if bit_depth not in _BIT_DEPTH:
+        raise ValueError("The bit depth must be 8, 10, 12 or 16.")
+
+    raw = np.empty(img.shape[:2], dtype=_BIT_DEPTH[bit_depth])
+    for channel, sy, sx in cfa_sites(bayer_type, img.shape[0], img.shape[1]):
+        site = _cfa_site_values(img, channel, sy, sx)
+        if bit_depth == 8:
+            raw[sy, sx] = site
+        else:
+            np.left_shift(site, bit_depth - 8, out=raw[sy, sx], dtype=raw.dtype)
+    return raw
+
+
+def rgb_to_channels(img: np.ndarray = None, bayer_type: str = 'RGGB') -> list:
+    """
+    Convert RGB image to the per channel planes, the pixels of other channels are zero.
+
+    :param img: RGB image as uint8 array with shape (height, width, 3 or 4)
+    :param bayer_type: Bayer type, key of the _CFA_PATTERNS
+    :return: list of R, G and B planes, and W plane if the pattern has W
+    """
+    if img is None:
+        raise ValueError("Image object must be non-empty.")
+    if bayer_type not in _CFA_PATTERNS:
+        raise ValueError("This Bayer type is not supported yet.")
+
+    planes = [np.zeros(img.shape[:2], dtype=np.uint8) for _ in cfa_channels(bayer_type)]
+    for channel, sy, sx in cfa_sites(bayer_type, img.shape[0], img.shape[1]):
+        planes[channel][sy, sx] = _cfa_site_values(img, channel, sy, sx)
+    return planes
+
+
+def rgb_to_bayer(image_name: str = None,
+                 dir_name: str = None,
+                 bayer_type: str = 'RGGB',
+                 output: str = 'channels',
+                 bit_depth: int = 8,
+                 raw_format: str = 'RAW10') -> list:
     """
     Convert RGB image to the Bayer images.
 
     :param image_name: input RGB image name
     :param dir_name: output directory for Bayer images
-    :param bayer_type: Bayer type:
+    :param bayer_type: Bayer type: 'RGGB', 'BGGR', 'GRBG', 'GBRG', 'X-TRANS', 'QUAD-BAYER', 'RGBW'
+                       or the name added by cfa_pattern_add
+    :param output: 'channels' - r.png, g.png, b.png (and w.png for RGBW) with zeros at the other channels sites,
+                   'mosaic' - single raw plane raw.png,
+                   'raw' - single raw plane packed to raw.raw with raw.json sidecar
+    :param bit_depth: bit depth of the raw plane for 'mosaic' output, 8, 10, 12 or 16
+    :param raw_format: packing for 'raw' output: 'RAW8', 'RAW10', 'RAW12' or 'RAW16'
     :return: list of the Bayer images names
     """
-    bt = {'RGGB', 'BGGR', 'X-TRANS'}
     r = []
 
-    if bayer_type not in bt:
+    if bayer_type not in _CFA_PATTERNS:
         print('This Bayer type is not supported yet')
         return r
+    if output not in _BAYER_OUTPUT:
+        raise ValueError("The output is not exist.")
+
+    return _bayer_save(dt=_bayer_image_read(image_name), dir_name=dir_name, bayer_type=bayer_type, output=output,
+                       bit_depth=bit_depth, raw_format=raw_format)
+
 
+def _bayer_image_read(image_name: str) -> np.ndarray:
+    # decode the image to RGB(A) array
     img = PIL.Image.open(image_name)
-    dt = np.array(img).astype(int)
-
-    # R channel
-    c = dt[:, :, 0]
-    if bayer_type == 'X-TRANS':
-        c = rgb_to_xtrans(c=c, channel=0)
-    elif bayer_type == 'RGGB':
-        c = rgb_to_rggb(c=c, channel=0)
-    elif bayer_type == 'BGGR':
-        c = rgb_to_bggr(c=c, channel=0)
-    filepath = os.path.join(dir_name, 'r.png')
-    img = PIL.Image.fromarray(c).convert('L')
-    img_save(img=img, image_name=filepath)
-    r.append(filepath)
-    # G channel
-    c = dt[:, :, 1]
-    if bayer_type == 'X-TRANS':
-        c = rgb_to_xtrans(c=c, channel=1)
-    elif bayer_type == 'RGGB':
-        c = rgb_to_rggb(c=c, channel=1)
-    elif bayer_type == 'BGGR':
-        c = rgb_to_bggr(c=c, channel=1)
-    filepath = os.path.join(dir_name, 'g.png')
-    img = PIL.Image.fromarray(c).convert('L')
-    img_save(img=img, image_name=filepath)
-    r.append(filepath)
-    # B channel
-    c = dt[:, :, 2]
-    if bayer_type == 'X-TRANS':
-        c = rgb_to_xtrans(c=c, channel=2)
-    elif bayer_type == 'RGGB':
-        c = rgb_to_rggb(c=c, channel=2)
-    elif bayer_type == 'BGGR':
-        c = rgb_to_bggr(c=c, channel=2)
-    filepath = os.path.join(dir_name, 'b.png')
-    img = PIL.Image.fromarray(c).convert('L')
-    img_save(img=img, image_name=filepath)
-    r.append(filepath)
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGB')
+    return np.asarray(img)
+
+
+def _bayer_save(dt: np.ndarray, dir_name: str, bayer_type: str, output: str, bit_depth: int, raw_format: str,
+                prefix: str = '') -> list:
+    # save the Bayer images of the decoded RGB image, names start with the prefix
+    r = []
+    if output == 'mosaic':
+        raw = rgb_to_mosaic(img=dt, bayer_type=bayer_type, bit_depth=bit_depth)
+        filepath = os.path.join(dir_name, prefix + 'raw.png')
+        img_save(img=PIL.Image.fromarray(raw), image_name=filepath)
+        r.append(filepath)
+    elif output == 'raw':
+        raw = rgb_to_mosaic(img=dt, bayer_type=bayer_type, bit_depth=raw_format_bits(raw_format))
+        rw = raw_write(raw=raw, file_name=os.path.join(dir_name, prefix + 'raw.raw'), raw_format=raw_format,
+                       cfa=bayer_type)
+        r.append(rw['raw'])
+        r.append(rw['json'])
+    else:
+        planes = rgb_to_channels(img=dt, bayer_type=bayer_type)
+        for c, name in zip(planes, _CFA_CHANNEL_NAMES):
+            filepath = os.path.join(dir_name, prefix + name + '.png')
+            img_save(img=PIL.Image.fromarray(c), image_name=filepath)
+            r.append(filepath)
+    return r
+
+
+def _bayer_batch_job(image_name: str, stem: str, dir_name: str, bayer_types: list, output: str, bit_depth: int,
+                     raw_format: str, patterns: dict) -> list:
+    # one job of the batch: decode the image once and save every Bayer type
+    for bayer_type, pattern in patterns.items():
+        if bayer_type not in _CFA_PATTERNS:
+            cfa_pattern_add(bayer_type=bayer_type, pattern=pattern)
+    dt = _bayer_image_read(image_name)
+    r = []
+    for bayer_type in bayer_types:
+        r += _bayer_save(dt=dt, dir_name=dir_name, bayer_type=bayer_type, output=output, bit_depth=bit_depth,
+                         raw_format=raw_format, prefix=stem + '_' + bayer_type + '_')
+    return r
+
+
+def rgb_to_bayer_batch(images=None,
+                       dir_name: str = None,
+                       bayer_types: list = None,
+                       output: str = 'channels',
+                       bit_depth: int = 8,
+                       raw_format: str = 'RAW10',
+                       workers: int = None) -> dict:
+    """
+    Convert RGB images to the Bayer images of several Bayer types. Every image is decoded once,
+    the images are processed on a process pool. The output names are {image name}_{Bayer type}_{r.png, g.png, ...},
+    the image names that are already taken get the suffix _1, _2, ...
+
+    :param images: directory with PNG, BMP, JPG or TIFF images or list of image names
+    :param dir_name: output directory for Bayer images
+    :param bayer_types: list of Bayer types, None - ['RGGB', 'BGGR', 'X-TRANS']
+    :param output: 'channels', 'mosaic' or 'raw' as for rgb_to_bayer
+    :param bit_depth: bit depth of the raw plane for 'mosaic' output, 8, 10, 12 or 16
+    :param raw_format: packing for 'raw' output: 'RAW8', 'RAW10', 'RAW12' or 'RAW16'
+    :param workers: the number of worker processes, None - the number of CPUs, 1 - run in this process
+    :return: dictionary with the unique image name {image name} or {image name}_1, ... as key and the list of
+             the Bayer images names as value, the keys are in the order of the input images
+    """
+    if images is None:
+        raise ValueError("The images must be non-empty.")
+    if dir_name is None:
+        raise ValueError("The output directory must be non-empty.")
+    if bayer_types is None:
+        bayer_types = ['RGGB', 'BGGR', 'X-TRANS']
+    for bayer_type in bayer_types:
+        if bayer_type not in _CFA_PATTERNS:
+            raise ValueError("This Bayer type is not supported yet.")
+    if output not in _BAYER_OUTPUT:
+        raise ValueError("The output is not exist.")
+    if workers is not None and workers < 1:
+        raise ValueError("The number of workers must be > 0.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if isinstance(images, str):
+        images = sorted(os.path.join(images, f) for f in os.listdir(images)
+                        if os.path.splitext(f)[1].lower() in _BAYER_BATCH_EXTENSIONS)
+    stems = []
+    taken = set()
+    for image_name in images:
+        stem = os.path.splitext(os.path.basename(image_name))[0]
+        unique = stem
+        n = 0
+        # the suffix can give the name of the other image, chart_1.png and the second chart.png
+        while unique in taken:
+            n += 1
+            unique = stem + '_' + str(n)
+        taken.add(unique)
+        stems.append(unique)
+    # the patterns added by cfa_pattern_add are passed to the worker processes
+    patterns = {k: v for k, v in _CFA_PATTERNS.items() if k in bayer_types}
+    jobs = [(image_name, stem, dir_name, list(bayer_types), output, bit_depth, raw_format, patterns)
+            for image_name, stem in zip(images, stems)]
+
+    if workers == 1 or len(jobs) < 2:
+        return {job[1]: _bayer_batch_job(*job) for job in jobs}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = [executor.submit(_bayer_batch_job, *job) for job in jobs]
+        return {job[1]: f.result() for job, f in zip(jobs, futures)}
@@ -0,0 +1,339 @@
+"""Contains the benchmark suite of the library hot paths: the time and the peak memory are saved to the JSON baseline,
+the baselines are compared to find the regressions.
+
+python -m leesa.benchmark run --json_name img/out/baseline.json
+python -m leesa.benchmark compare img/out/baseline.json img/out/current.json --threshold 0.1
+"""
+import os
+import gc
+import sys
+import json
+import time
+import datetime
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import leesa
+from leesa.image import *
+from leesa.color import image_rgb_to_lum_itu7096
+from leesa.chart import Chart
+from leesa.odchart import ODChart
+from leesa.bayer import rgb_to_bayer
+from leesa.edge import gradient_calc_np, gradient_angle_quantization_np, canny_np, edge_analysis_parallel
+from leesa.camera import Camera, CamAngle, fov_vs_ground_intersection
+from leesa.sensor import Sensor
+from leesa.optics import Optics
+
+# the frame types of the benchmark sizes
+_BENCHMARK_SIZE = {
+    'small': 'nHD',
+    'medium': 'FHD',
+    'huge': 'CHR70M'
+}
+
+
+def _chart_case(method: str, params: dict):
+    # the Chart method with saving of the image and JSON
+    def setup(frame_type, dir_data, dir_out):
+        def run():
+            ct = Chart(frame_type=frame_type, color_background=(127, 127, 127))
+            getattr(ct, method)(image_name=os.path.join(dir_out, method + '.png'),
+                                json_name=os.path.join(dir_out, method + '.json'), **params)
+        return run
+    return setup
+
+
+def _chart_lum(frame_type: str) -> np.ndarray:
+    # luminance of the edge test chart as input of the edge functions
+    ct = Chart(frame_type=frame_type, color_background=(127, 127, 127))
+    ct.edge_test()
+    return image_rgb_to_lum_itu7096(ct.canvas)
+
+
+def _bayer_setup(frame_type, dir_data, dir_out):
+    image_name = os.path.join(dir_out, 'bayer_input.png')
+    Chart(frame_type=frame_type, color_background=(127, 127, 127)).ramps(image_name=image_name)
+    return lambda: rgb_to_bayer(image_name=image_name, dir_name=os.path.join(dir_out, 'bayer'), bayer_type='RGGB')
+
+
+def _gradient_setup(frame_type, dir_data, dir_out):
+    lum = _chart_lum(frame_type)
+
+    def run():
+        _, _, amp, r_angle = gradient_calc_np(lum)
+        gradient_angle_quantization_np(r_angle, amp)
+    return run
+
+
+def _canny_setup(frame_type, dir_data, dir_out):
+    lum = _chart_lum(frame_type)
+    return lambda: canny_np(lum)
+
+
+def _edge_parallel_setup(frame_type, dir_data, dir_out):
+    lum = _chart_lum(frame_type)
+    return lambda: edge_analysis_parallel(lum)
+
+
+def _od_one_image_setup(frame_type, dir_data, dir_out):
+    dir_sample = os.path.join(dir_data, 'sample_2')
+    return lambda: ODChart(frame_type=frame_type, color_background=(255, 255, 255)).object_to_one_image(
+        dir_img=dir_sample, dir_json=dir_sample, dir_out=os.path.join(dir_out, 'od_one_image'), scale_size=3)
+
+
+def _od_images_setup(frame_type, dir_data, dir_out):
+    dir_sample = os.path.join(dir_data, 'sample_2')
+    return lambda: ODChart(frame_type=frame_type, color_background=(255, 255, 255)).object_to_images(
+        dir_img=dir_sample, dir_json=dir_sample, dir_out=os.path.join(dir_out, 'od_images'), scales=[17, 18, 19, 20],
+        scale_size=3, gap_x=8, gap_y=8)
+
+
+def _warping_setup(frame_type, dir_data, dir_out):
+    dir_sample = os.path.join(dir_data, 'sample_5')
+    return lambda: image_warping_2d_2d(img_auto=os.path.join(dir_sample, 'sample_2.jpg'),
+                                       json_auto=os.path.join(dir_sample, 'sample_2.json'),
+                                       img_plate=os.path.join(dir_sample,
+                                                              'USACalifornia-1963-M44149-26_Jul_2024-15_41_36.png'),
+                                       img_dst=os.path.join(dir_out, 'warping', 'sample_2.png'))
+
+
+def _fov_setup(frame_type, dir_data, dir_out):
+    cam = Camera(sensor=Sensor(sensor_name='IMX662-AAQR'), optics=Optics(focal_length=2.8e-03),
+                 angle=CamAngle(pitch=75), altitude=4)
+    return lambda: fov_vs_ground_intersection(cam=cam, distance_maximum=50)
+
+
+# the benchmark cases: the setup function returns the measured function, it is called out of the measurement;
+# the cases with False do not depend on the frame type and are measured once
+_BENCHMARK_CASES = {
+    'chart_rectangles': (_chart_case('rectangles', {'rectangle_width': 50, 'rectangle_height': 50, 'gap_x': 14,
+                                                    'gap_y': 10, 'color_mode': 'gradient_color',
+                                                    'rectangle_color': [[0, 0, 0], [0, 255, 0]],
+                                                    'border': True}), True),
+    'chart_ramps': (_chart_case('ramps', {}), True),
+    'chart_combinations': (_chart_case('combinations', {}), True),
+    'chart_edge_test': (_chart_case('edge_test', {}), True),
+    'rgb_to_bayer': (_bayer_setup, True),
+    'edge_gradient': (_gradient_setup, True),
+    'edge_canny': (_canny_setup, True),
+    'edge_parallel': (_edge_parallel_setup, True),
+    'od_object_to_one_image': (_od_one_image_setup, True),
+    'od_object_to_images': (_od_images_setup, True),
+    'image_warping_2d_2d': (_warping_setup, False),
+    'fov_vs_ground_intersection': (_fov_setup, False)
+}
+
+
+def benchmark_cases() -> list:
+    """
+    The names of the benchmark cases.
+
+    :return: list of the case names
+    """
+    return list(_BENCHMARK_CASES)
+
+
+def _measure(run, repeat: int) -> tuple:
+    # the best time of the repeats and the peak memory of one more run under tracemalloc,
+    # tracemalloc slows down the run, so the time is measured without it
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def benchmark_run(cases: list = None,
+                  sizes: list = None,
+                  repeat: int = 3,
+                  dir_data: str = 'tests/data_sample',
+                  dir_out: str = None,
+                  json_name: str = None) -> dict:
+    """
+    Measure the time and the peak memory of the library hot paths. The time is the best of the repeats,
+    the memory is the peak of the Python and numpy allocations traced by tracemalloc, the native buffers
+    of the PIL images are not traced. The failed case does not stop the benchmark, it is reported with the error
+    in the failures and is not saved to the results of the baseline.
+
+    :param cases: list of the case names from benchmark_cases, None - all cases
+    :param sizes: list of the sizes: 'small', 'medium', 'huge' or frame types, None - all sizes
+    :param repeat: the number of repeats
+    :param dir_data: the directory with the data samples
+    :param dir_out: the directory for the output files of the cases, None - temporary directory
+    :param json_name: the JSON file name to save the baseline, None - do not save
+    :return: dictionary with the environment, the list of results with the case name, the size,
+             the frame type, the time in seconds, the peak memory in bytes and the error None,
+             and the list of the failed cases with the error
+    """
+    if cases is None:
+        cases = benchmark_cases()
+    for case in cases:
+        if case not in _BENCHMARK_CASES:
+            raise ValueError("The benchmark case is not exist.")
+    if sizes is None:
+        sizes = list(_BENCHMARK_SIZE)
+    fr = FrameResolution()
+    _FRAME_SIZE = fr.get_dict()
+    frames = [(s, _BENCHMARK_SIZE.get(s, s)) for s in sizes]
+    for _, frame_type in frames:
+        if frame_type not in _FRAME_SIZE:
+            raise ValueError("The frame size is not exist.")
+    if repeat is None or repeat < 1:
+        raise ValueError("The repeat must be non-empty or > 0.")
+
+    timestamp = datetime.datetime.now().strftime("%d-%b-%Y(%H-%M-%S)")
+    results = []
+    failures = []
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        for case in cases:
+            setup, sized = _BENCHMARK_CASES[case]
+            for size, frame_type in (frames if sized else [(None, None)]):
+                e = {'case': case, 'size': size, 'frame_type': frame_type, 'time': None, 'memory': None,
+                     'error': None}
+                try:
+                    run = setup(frame_type, dir_data, dir_tmp if dir_out is None else dir_out)
+                    e['time'], e['memory'] = _measure(run, repeat)
+                except Exception as err:
+                    e['error'] = repr(err)
+                    failures.append(e)
+                    continue
+                results.append(e)
+
+    r = {'exporter': 'Leesa Exporter v0.1.8', 'time': timestamp, 'version': leesa.__version__,
+         'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+         'cpu_count': os.cpu_count(), 'repeat': repeat, 'results': results, 'failures': failures}
+    if json_name is not None:
+        if os.path.dirname(json_name):
+            os.makedirs(os.path.dirname(json_name), exist_ok=True)
+        with open(json_name, 'w') as outfile:
+            json.dump(r, outfile, indent=2)
+    return r
+
+
+def benchmark_compare(baseline=None,
+                      current=None,
+                      threshold: float = 0.1,
+                      memory_threshold: float = None,
+                      time_minimum: float = 1e-3) -> dict:
+    """
+    Compare the benchmark results with the baseline. The case is a regression if its time or peak memory
+    is larger than the baseline by more than the threshold.
+
+    :param baseline: the baseline dictionary from benchmark_run or its JSON file name
+    :param current: the current dictionary from benchmark_run or its JSON file name
+    :param threshold: the allowed relative increase of the time, 0.1 - 10%
+    :param memory_threshold: the allowed relative increase of the peak memory, None - the same as threshold
+    :param time_minimum: the times below this value in seconds are too noisy and are not compared
+    :return: dictionary with the compared cases, the regressions, the cases missing or failed in one of results
+             and the cases failed in the current results
+    """
+    if baseline is None or current is None:
+        raise ValueError("The baseline and current results must be non-empty.")
+    if threshold is None or threshold < 0:
+        raise ValueError("The threshold must be non-empty or >= 0.")
+    if memory_threshold is None:
+        memory_threshold = threshold
+    results = []
+    for dt in [baseline, current]:
+        if isinstance(dt, str):
+            with open(dt, 'r') as f:
+                dt = json.load(f)
+        results.append({(e['case'], e['frame_type']): e for e in dt['results'] + dt.get('failures', [])})
+    base, cur = results
+
+    compared = []
+    missing = []
+    for key in base.keys() | cur.keys():
+        b = base.get(key)
+        c = cur.get(key)
+        if b is None or c is None or b['error'] is not None or c['error'] is not None:
+            missing.append({'case': key[0], 'frame_type': key[1],
+                            'baseline_error': None if b is None else b['error'],
+                            'current_error': None if c is None else c['error'],
+                            'in_baseline': b is not None, 'in_current': c is not None})
+            continue
+        time_ratio = c['time'] / b['time'] if b['time'] > 0 else None
+        memory_ratio = c['memory'] / b['memory'] if b['memory'] > 0 else None
+        time_regression = (max(b['time'], c['time']) >= time_minimum and time_ratio is not None
+                           and time_ratio > 1 + threshold)
+        memory_regression = memory_ratio is not None and memory_ratio > 1 + memory_threshold
+        compared.append({'case': key[0], 'size': c['size'], 'frame_type': key[1],
+                         'time_baseline': b['time'], 'time': c['time'], 'time_ratio': time_ratio,
+                         'memory_baseline': b['memory'], 'memory': c['memory'], 'memory_ratio': memory_ratio,
+                         'time_regression': time_regression, 'memory_regression': memory_regression})
+    compared.sort(key=lambda e: (e['case'], e['frame_type'] or ''))
+    missing.sort(key=lambda e: (e['case'], e['frame_type'] or ''))
+    return {'threshold': threshold, 'memory_threshold': memory_threshold,
+            'cases': compared,
+            'regressions': [e for e in compared if e['time_regression'] or e['memory_regression']],
+            'missing': missing,
+            'failures': [e for e in missing if e['current_error'] is not None]}
+
+
+def _print_compare(r: dict) -> None:
+    for e in r['cases']:
+        flags = ('TIME ' if e['time_regression'] else '') + ('MEMORY' if e['memory_regression'] else '')
+        print('%-28s %-8s %10.4f s %7.2fx %10.1f MB %7.2fx %s' % (
+            e['case'], e['frame_type'] or '-', e['time'], e['time_ratio'] or 0, e['memory'] / 2 ** 20,
+            e['memory_ratio'] or 0, flags))
+    for e in r['missing']:
+        print('%-28s %-8s not compared: %s' % (e['case'], e['frame_type'] or '-',
+                                               e['current_error'] or e['baseline_error'] or 'missing'))
+    print('The regressions:', len(r['regressions']))
+    print('The failures:', len(r['failures']))
+
+
+def main(argv: list = None) -> int:
+    """
+    The command line of the benchmark.
+
+    :param argv: the command line arguments, None - sys.argv
+    :return: exit code, 1 if any case failed or the comparison found regressions
+    """
+    parser = argparse.ArgumentParser(prog='python -m leesa.benchmark', description='Leesa benchmark suite')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('run', help='measure and save the results')
+    p.add_argument('--json_name', required=True, help='the JSON file to save the results')
+    p.add_argument('--cases', nargs='+', default=None, choices=benchmark_cases())
+    p.add_argument('--sizes', nargs='+', default=None, help='small, medium, huge or frame types')
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--dir_data', default='tests/data_sample')
+    p.add_argument('--baseline', default=None, help='the baseline JSON file to compare the results with')
+    p.add_argument('--threshold', type=float, default=0.1)
+    p = sub.add_parser('compare', help='compare the results with the baseline')
+    p.add_argument('baseline')
+    p.add_argument('current')
+    p.add_argument('--threshold', type=float, default=0.1)
+    p.add_argument('--memory_threshold', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        current = benchmark_run(cases=args.cases, sizes=args.sizes, repeat=args.repeat, dir_data=args.dir_data,
+                                json_name=args.json_name)
+        if args.baseline is None:
+            for e in current['results'] + current['failures']:
+                print('%-28s %-8s' % (e['case'], e['frame_type'] or '-'),
+                      e['error'] or '%10.4f s %10.1f MB' % (e['time'], e['memory'] / 2 ** 20))
+            print('The failures:', len(current['failures']))
+            return 1 if current['failures'] else 0
+        r = benchmark_compare(args.baseline, current, threshold=args.threshold)
+    else:
+        r = benchmark_compare(args.baseline, args.current, threshold=args.threshold,
+                              memory_threshold=args.memory_threshold)
+    _print_compare(r)
+    return 1 if r['regressions'] or r['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
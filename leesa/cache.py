@@ -0,0 +1,245 @@
+"""Contains the content-addressed on-disk cache of the generated charts.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import contextlib
+import numpy as np
+import leesa
+
+# the image formats restored to the chart canvas without loss
+_CACHE_IMAGE_FORMATS = {'.png', '.bmp', '.tif', '.tiff'}
+# the index of the cache entries
+_CACHE_INDEX = 'index.json'
+# the lock of the index updates, the lock older than the timeout in seconds is left by the killed process
+_CACHE_LOCK = 'index.lock'
+_CACHE_LOCK_TIMEOUT = 60
+
+
+class ChartCache:
+    """
+    Content-addressed cache of the chart images and JSON files. The key is the hash of the chart method name,
+    its parameters, the canvas before the call and the leesa version. The entries above the size limit
+    are evicted in the least recently used order.
+
+    cache = ChartCache(dir_name='img/cache', size_limit=2 ** 30)
+    ct = Chart(frame_type='4K_UHD', color_background=(127, 127, 127), cache=cache)
+    ct.ramps(image_name='img/out/ramps.png', json_name='img/out/ramps.json')
+
+    """
+
+    def __init__(self, dir_name: str = None, size_limit: int = 2 ** 30, link: bool = False):
+        """
+
+        :param dir_name: the cache directory
+        :param size_limit: the cache size limit in bytes
+        :param link: True - hard-link the cached files to the requested names, the linked files are read-only
+                     and must be removed before they are written by the other writers, False - copy them
+        """
+        if dir_name is None:
+            raise ValueError("The cache directory must be non-empty.")
+        if size_limit is None or size_limit < 0:
+            raise ValueError("The size limit must be non-empty or >= 0.")
+        self.dir_name = dir_name
+        self.size_limit = size_limit
+        self.link = link
+        os.makedirs(dir_name, exist_ok=True)
+
+    @staticmethod
+    def key(method: str = None, params: dict = None, canvas=None) -> str:
+        """
+        The cache key of the chart.
+
+        :param method: the chart method name
+        :param params: the method parameters without output file names
+        :param canvas: the canvas before the method call as numpy array
+        :return: hexadecimal SHA-256 digest
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps({'method': method, 'params': params, 'version': leesa.__version__},
+                            sort_keys=True, default=str).encode())
+        if canvas is not None:
+            h.update(json.dumps([list(canvas.shape), str(canvas.dtype)]).encode())
+            h.update(np.ascontiguousarray(canvas))
+        return h.hexdigest()
+
+    def _index_read(self) -> dict:
+        try:
+            with open(os.path.join(self.dir_name, _CACHE_INDEX), 'r') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return dict()
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        # the exclusive creation of the lock file, the processes sharing the cache update the index one by one
+        lock_name = os.path.join(self.dir_name, _CACHE_LOCK)
+        while True:
+            try:
+                os.close(os.open(lock_name, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_name) > _CACHE_LOCK_TIMEOUT:
+                        os.remove(lock_name)
+                except OSError:
+                    pass
+                time.sleep(0.005)
+        try:
+            yield
+        finally:
+            os.remove(lock_name)
+
+    def _file_store(self, src: str, name: str) -> None:
+        # copy the file to the cache by the temporary file, the readers never see the partial file
+        file_name = os.path.join(self.dir_name, name)
+        tmp_name = file_name + '.' + str(os.getpid()) + '.tmp'
+        shutil.copyfile(src, tmp_name)
+        # the cached file is read-only, the writer of its hard-linked output can not change it in place
+        os.chmod(tmp_name, 0o444)
+        os.replace(tmp_name, file_name)
+
+    def _index_write(self, index: dict) -> None:
+        # write to the temporary file and replace the index, the readers never see the partial index
+        file_name = os.path.join(self.dir_name, _CACHE_INDEX)
+        tmp_name = file_name + '.' + str(os.getpid()) + '.tmp'
+        with open(tmp_name, 'w') as fp:
+            json.dump(index, fp, indent=2)
+        os.replace(tmp_name, file_name)
+
+    def _file_place(self, src: str, dst: str) -> None:
+        # hard-link or copy the file, hard link falls back to copy between file systems
+        if os.path.dirname(dst):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if os.path.abspath(src) == os.path.abspath(dst):
+            return
+        if os.path.lexists(dst):
+            os.remove(dst)
+        if self.link:
+            try:
+                os.link(src, dst)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(src, dst)
+
+    def image_format_supported(self, image_name: str = None) -> bool:
+        """
+        The chart with this image format can be cached, the format must restore the canvas without loss.
+
+        :param image_name: the image file name
+        :return: True or False
+        """
+        return image_name is not None and os.path.splitext(image_name)[1].lower() in _CACHE_IMAGE_FORMATS
+
+    def get(self, key: str = None, image_name: str = None, json_name: str = None) -> str:
+        """
+        Place the cached image and JSON files to the requested names.
+
+        :param key: the cache key
+        :param image_name: the requested image file name
+        :param json_name: the requested JSON file name, None - JSON is not required
+        :return: the cached image file name or None if there is no entry
+        """
+        with self._index_lock():
+            index = self._index_read()
+            e = index.get(key)
+            if e is None or os.path.splitext(e['image'])[1] != os.path.splitext(image_name)[1].lower():
+                return None
+            if json_name is not None and e.get('json') is None:
+                return None
+            files = [os.path.join(self.dir_name, e['image'])]
+            if json_name is not None:
+                files.append(os.path.join(self.dir_name, e['json']))
+            if not all(os.path.isfile(f) for f in files):
+                return None
+            self._file_place(files[0], image_name)
+            if json_name is not None:
+                self._file_place(files[1], json_name)
+            e['last_access'] = time.time()
+            self._index_write(index)
+        return files[0]
+
+    @staticmethod
+    def detach(*file_names) -> None:
+        """
+        Remove the hard-linked files before they are written in place, otherwise the writer changes the cached files.
+
+        :param file_names: the output file names or None
+        :return: None
+        """
+        for f in file_names:
+            if f is not None and os.path.isfile(f) and os.stat(f).st_nlink > 1:
+                os.remove(f)
+
+    def put(self, key: str = None, image_name: str = None, json_name: str = None) -> None:
+        """
+        Store the chart image and JSON files and evict the least recently used entries above the size limit.
+
+        :param key: the cache key
+        :param image_name: the image file name
+        :param json_name: the JSON file name or None
+        :return: None
+        """
+        e = {'image': key + os.path.splitext(image_name)[1].lower(), 'json': None}
+        self._file_store(image_name, e['image'])
+        e['size'] = os.path.getsize(image_name)
+        if json_name is not None:
+            e['json'] = key + os.path.splitext(json_name)[1].lower()
+            self._file_store(json_name, e['json'])
+            e['size'] += os.path.getsize(json_name)
+        # the index is read, changed and written under the lock, the entries of the other processes are kept
+        with self._index_lock():
+            e['last_access'] = time.time()
+            index = self._index_read()
+            index[key] = e
+            self._index_write(self._evict(index, self.size_limit))
+
+    def _evict(self, index: dict, size_limit: int) -> dict:
+        # remove the least recently used entries until the cache size is below the limit
+        size = sum(e['size'] for e in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_access']):
+            if size <= size_limit:
+                break
+            e = index.pop(key)
+            for f in [e['image'], e['json']]:
+                if f is not None and os.path.isfile(os.path.join(self.dir_name, f)):
+                    os.remove(os.path.join(self.dir_name, f))
+            size -= e['size']
+        return index
+
+    def info(self) -> dict:
+        """
+        The cache state.
+
+        :return: dictionary with the number of entries, the size, the size limit and the entries
+                 sorted from the most recently used
+        """
+        index = self._index_read()
+        entries = [dict(e, key=k) for k, e in sorted(index.items(), key=lambda i: -i[1]['last_access'])]
+        return {'entries': len(entries),
+                'size': sum(e['size'] for e in entries),
+                'size_limit': self.size_limit,
+                'items': entries}
+
+    def prune(self, size_limit: int = None) -> dict:
+        """
+        Evict the least recently used entries above the size limit.
+
+        :param size_limit: the size limit in bytes, None - the cache size limit
+        :return: the cache state after pruning
+        """
+        with self._index_lock():
+            index = self._index_read()
+            self._index_write(self._evict(index, self.size_limit if size_limit is None else size_limit))
+        return self.info()
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+
+        :return: None
+        """
+        self.prune(size_limit=0)
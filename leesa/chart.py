@@ -7,13 +7,338 @@ import datetime
 import os
 from enum import Enum
 import itertools
+import functools
+import inspect
+import time
+import concurrent.futures
 from leesa.image import *
+from leesa.cache import ChartCache
+from leesa.encoder import strip_writer
+from leesa.groundtruth import gt_columns, gt_concatenate, gt_objects, gt_file_name, gt_save
+from leesa.raw import raw_write
 
 # chart color type
 _CHART_COLOR_MODE = {
     'single_color': 0,
     'gradient_color': 1
 }
+# canvas data type of the bit depth
+_CHART_BIT_DEPTH = {8: np.uint8, 10: np.uint16, 12: np.uint16, 16: np.uint16}
+# raw file packing of the bit depth
+_CHART_RAW_FORMAT = {8: 'RAW8', 10: 'RAW10', 12: 'RAW12', 16: 'RAW16'}
+
+
+def _color_ramps(start_color, end_color, size: int, divisor: int, dtype=np.uint8) -> np.ndarray:
+    # color tables of the ramps from start to end colors: the color i is truncated start + i * (end - start) / divisor,
+    # the accumulation is sequential as a loop of r += r_step, the last color is the exact end color
+    start = np.asarray(start_color, dtype=np.float64).reshape(-1, 3)
+    end = np.asarray(end_color, dtype=np.float64).reshape(-1, 3)
+    acc = np.empty((start.shape[0], size, 3), dtype=np.float64)
+    if size == 0:
+        return acc.astype(dtype)
+    acc[:, 0] = start
+    if size > 1:
+        acc[:, 1:] = ((end - start) / divisor)[:, None]
+    table = np.trunc(np.cumsum(acc, axis=1)).astype(dtype)
+    table[:, -1] = end
+    return table
+
+
+def _axis_index(starts: np.ndarray, size: np.ndarray, limit: int, offset: int = 0) -> tuple:
+    # pixel coordinates of the sorted non-overlapping bands moved by -offset and clipped by [0, limit),
+    # and the band index of every pixel, the contiguous coordinates are returned as slice
+    starts = np.asarray(starts, dtype=np.int64) - offset
+    ends = np.clip(starts + size, 0, limit)
+    starts = np.clip(starts, 0, limit)
+    sizes = np.maximum(ends - starts, 0)
+    k = np.repeat(np.arange(starts.size), sizes)
+    pix = starts[k] + np.arange(k.size) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    if k.size and pix[-1] - pix[0] + 1 == k.size:
+        pix = slice(int(pix[0]), int(pix[-1]) + 1)
+    return pix, k
+
+
+def _layer_paint(img: np.ndarray, layer: tuple, offset: int = 0) -> None:
+    # paint the layer of rectangles (rows, columns, palette): rows and columns are (band starts, band sizes),
+    # the color of the rectangle in row band i and column band j is palette[i, j], every pixel of the layer
+    # is written once, the first row of img is the row offset of the layer
+    rows, columns, palette = layer
+    py, ky = _axis_index(rows[0], rows[1], img.shape[0], offset)
+    px, kx = _axis_index(columns[0], columns[1], img.shape[1])
+    if ky.size == 0 or kx.size == 0:
+        return
+    if not isinstance(py, slice) and not isinstance(px, slice):
+        py = py[:, None]
+    img[py, px] = palette[ky[:, None], kx[None, :]]
+
+
+def _grid_bands(start: int, step: int, count: int, sub: tuple) -> tuple:
+    # bands of count grid cells, every cell has sub bands (offset, size)
+    offsets = np.array([e[0] for e in sub], dtype=np.int64)
+    sizes = np.array([e[1] for e in sub], dtype=np.int64)
+    base = start + np.arange(count, dtype=np.int64) * step
+    return (base[:, None] + offsets[None, :]).ravel(), np.tile(sizes, count)
+
+
+def _grid_layers(palette: np.ndarray,
+                 n_columns: int,
+                 start_y: int,
+                 start_x: int,
+                 step_y: int,
+                 step_x: int,
+                 sub_y: tuple,
+                 sub_x: tuple) -> list:
+    # layers of elements placed row by row in the grid of n_columns, the last row can be incomplete,
+    # palette has shape (elements, len(sub_y), len(sub_x), 3) or (elements, 3)
+    layers = []
+    n = palette.shape[0]
+    palette = palette.reshape(n, len(sub_y), len(sub_x), 3)
+    n_full = n // n_columns if n_columns > 0 else 0
+    n_rest = n - n_full * n_columns
+    parts = [(start_y, n_full, n_columns, palette[:n_full * n_columns]),
+             (start_y + n_full * step_y, 1 if n_rest > 0 else 0, n_rest, palette[n_full * n_columns:])]
+    for y, count_rows, count_columns, p in parts:
+        if count_rows == 0 or count_columns == 0:
+            continue
+        p = p.reshape(count_rows, count_columns, len(sub_y), len(sub_x), 3).transpose(0, 2, 1, 3, 4)
+        layers.append((_grid_bands(y, step_y, count_rows, sub_y),
+                       _grid_bands(start_x, step_x, count_columns, sub_x),
+                       p.reshape(count_rows * len(sub_y), count_columns * len(sub_x), 3)))
+    return layers
+
+
+def _grid_positions(n: int, n_columns: int, start_y: int, start_x: int, step_y: int, step_x: int) -> tuple:
+    # top left corners of n elements placed row by row in the grid of n_columns
+    k = np.arange(n, dtype=np.int64)
+    return start_x + (k % n_columns) * step_x, start_y + (k // n_columns) * step_y
+
+
+# chart methods rendered by chart_render_all
+_CHART_METHOD = {'rectangles', 'ramps', 'combinations', 'edge_test'}
+# peak memory of one chart render in frames: the canvas, the painted layer and the image at save
+_RENDER_MEMORY_FACTOR = 3
+# memory of the worker process without the chart
+_RENDER_MEMORY_BASE = 64 * 2 ** 20
+
+
+def _render_memory(frame: dict, bit_depth: int = 8) -> int:
+    # estimated peak memory of one chart render in bytes
+    return (frame['w'] * frame['h'] * 3 * np.dtype(_CHART_BIT_DEPTH[bit_depth]).itemsize * _RENDER_MEMORY_FACTOR
+            + _RENDER_MEMORY_BASE)
+
+
+def _memory_available() -> int:
+    # available physical memory in bytes, 4 GB if the system does not report it
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return 4 * 2 ** 30
+
+
+def _chart_render_job(frame_type: str, color_background: tuple, method: str, params: dict,
+                      image_name: str, json_name: str, gt_format: str, bit_depth: int) -> dict:
+    # one job of chart_render_all
+    time_start = time.time()
+    ct = Chart(frame_type=frame_type, color_background=color_background, gt_format=gt_format, bit_depth=bit_depth)
+    getattr(ct, method)(image_name=image_name, json_name=json_name, **params)
+    return {'frame_type': frame_type, 'w': ct.frame['w'], 'h': ct.frame['h'],
+            'image': image_name, 'json': gt_file_name(json_name, gt_format), 'time': time.time() - time_start}
+
+
+def chart_render_all(method: str = 'ramps',
+                     params: dict = None,
+                     frame_types: list = None,
+                     color_background: tuple = (0, 0, 0),
+                     dir_name: str = None,
+                     workers: int = None,
+                     memory_limit: int = None,
+                     gt_format: str = 'json',
+                     bit_depth: int = 8) -> dict:
+    """
+    Render the same chart at many resolutions on a process pool. The jobs are started from the largest frame,
+    a job is started only if the estimated memory of the running jobs fits the memory limit,
+    one job is always running even if it does not fit.
+
+    :param method: Chart method: 'rectangles', 'ramps', 'combinations' or 'edge_test'
+    :param params: the method parameters without image_name and json_name
+    :param frame_types: list of frame types, None - all frame types of FrameResolution
+    :param color_background: color for image background fill, color as RGB list
+    :param dir_name: output directory, the files are {method}_{frame_type}.png and .json
+    :param workers: the number of worker processes, None - the number of CPUs, 1 - run in this process
+    :param memory_limit: memory limit in bytes for the running jobs, None - available physical memory
+    :param gt_format: ground truth format: 'json' or 'npz'
+    :param bit_depth: the chart bit depth: 8, 10, 12 or 16
+    :return: manifest dictionary with the list of the rendered frames from the smallest frame,
+             the manifest is saved to {method}_manifest.json
+    """
+    if method not in _CHART_METHOD:
+        raise ValueError("The chart method is not exist.")
+    if dir_name is None:
+        raise ValueError("The output directory must be non-empty.")
+    if workers is not None and workers < 1:
+        raise ValueError("The number of workers must be > 0.")
+    if bit_depth not in _CHART_BIT_DEPTH:
+        raise ValueError("The bit depth is not supported.")
+    fr = FrameResolution()
+    _FRAME_SIZE = fr.get_dict()
+    if frame_types is None:
+        frame_types = list(_FRAME_SIZE)
+    for frame_type in frame_types:
+        if frame_type not in _FRAME_SIZE:
+            raise ValueError("The frame size is not exist.")
+    if params is None:
+        params = dict()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if memory_limit is None:
+        memory_limit = _memory_available()
+
+    time_start = time.time()
+    timestamp = datetime.datetime.now().strftime("%d-%b-%Y(%H-%M-%S)")
+    # the largest frames first
+    pending = sorted(frame_types, key=lambda f: -_FRAME_SIZE[f]['w'] * _FRAME_SIZE[f]['h'])
+    jobs = {f: (f, color_background, method, params,
+                os.path.join(dir_name, method + '_' + f + '.png'), os.path.join(dir_name, method + '_' + f + '.json'),
+                gt_format, bit_depth)
+            for f in pending}
+
+    results = []
+    if workers == 1:
+        results = [_chart_render_job(*jobs[f]) for f in pending]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            running = dict()
+            while pending or running:
+                # admit the largest pending jobs fitting the memory limit
+                memory = sum(_render_memory(_FRAME_SIZE[f], bit_depth) for f in running.values())
+                for f in list(pending):
+                    if len(running) == workers:
+                        break
+                    m = _render_memory(_FRAME_SIZE[f], bit_depth)
+                    if not running or memory + m <= memory_limit:
+                        running[executor.submit(_chart_render_job, *jobs[f])] = f
+                        pending.remove(f)
+                        memory += m
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    results.append(future.result())
+
+    results.sort(key=lambda e: (e['w'] * e['h'], e['frame_type']))
+    manifest = {'exporter': 'Leesa Exporter v0.1.8', 'time': timestamp, 'type': method, 'params': params,
+                'color_background': list(color_background), 'render_time': time.time() - time_start,
+                'frames': results}
+    if bit_depth != 8:
+        manifest['bit_depth'] = bit_depth
+    os.makedirs(dir_name, exist_ok=True)
+    with open(os.path.join(dir_name, method + '_manifest.json'), 'w') as outfile:
+        json.dump(manifest, outfile, indent=2)
+    return manifest
+
+
+@functools.lru_cache(maxsize=None)
+def _border_font():
+    # the font of the frame ratio, the default font if Tahoma is not installed
+    try:
+        return PIL.ImageFont.truetype("tahoma.ttf", 9)
+    except OSError:
+        return PIL.ImageFont.load_default()
+
+
+def _border_triangles(f_width: int, f_height: int, b_size: int) -> list:
+    # white triangles of the border
+    b2 = b_size // 2
+    w2 = f_width // 2
+    h2 = f_height // 2
+    return [[(w2 - b2, 0), (w2 + b2, 0), (w2, b_size)],  # top triangle
+            [(w2 - b2, f_height - 1), (w2 + b2, f_height - 1), (w2, f_height - 1 - b_size)],  # bottom triangle
+            # left side triangles
+            [(0, h2 - b2), (b_size, h2), (0, h2 + b2)],
+            [(0, b_size), (b_size, b2 + b_size), (0, b_size + b_size)],
+            [(0, f_height - b_size * 2), (b_size, f_height - b2 - b_size), (0, f_height - b_size)],
+            # right side triangles
+            [(f_width - 1, h2 - b2), (f_width - 1 - b_size, h2), (f_width - 1, h2 + b2)],
+            [(f_width - 1, b_size), (f_width - 1 - b_size, b_size + b2), (f_width - 1, b_size + b_size)],
+            [(f_width - 1, f_height - b_size * 2), (f_width - 1 - b_size, f_height - b_size - b2),
+             (f_width - 1, f_height - b_size)]]
+
+
+@functools.lru_cache(maxsize=None)
+def _border_patches(frame_type: str) -> dict:
+    # the border template of the frame type as read-only patches: 4 strips of the black ring with white triangles
+    # and the alpha mask of the ratio text, the ring is drawn by strips and the text by its bounding box
+    # instead of the whole bordered frame
+    frame = FrameResolution().get_dict()[frame_type]
+    b_size = frame['w'] // 46  # border size
+    f_width = frame['w'] + b_size * 2
+    f_height = frame['h'] + b_size * 2
+    triangles = _border_triangles(f_width, f_height, b_size)
+    ring = []
+    for y, x, w, h in [(0, 0, f_width, b_size), (f_height - b_size, 0, f_width, b_size),
+                       (b_size, 0, b_size, frame['h']), (b_size, f_width - b_size, b_size, frame['h'])]:
+        if w == 0 or h == 0:
+            continue
+        img = PIL.Image.new(mode='RGB', size=(w, h), color=(0, 0, 0))
+        draw = PIL.ImageDraw.Draw(img)
+        for t in triangles:
+            draw.polygon([(px - x, py - y) for px, py in t], fill=(255, 255, 255))
+        patch = np.array(img)
+        patch.setflags(write=False)
+        ring.append((y, x, patch))
+    # the text mask is the text drawn by white color on black
+    font = _border_font()
+    text_x = b_size + 1
+    text_y = f_height - 1 - 9 - b_size
+    bbox = PIL.ImageDraw.Draw(PIL.Image.new(mode='L', size=(1, 1))).textbbox((0, 0), frame['ratio'], font=font)
+    mask = PIL.Image.new(mode='L', size=(max(bbox[2], 1), max(bbox[3], 1)), color=0)
+    PIL.ImageDraw.Draw(mask).text((0, 0), frame['ratio'], font=font, fill=255)
+    mask = np.array(mask)
+    mask.setflags(write=False)
+    return {'size': b_size, 'width': f_width, 'height': f_height, 'ring': ring,
+            'text': (text_y, text_x, mask)}
+
+
+def _patch_blend_black(img: np.ndarray, mask: np.ndarray) -> None:
+    # blend the image to black by the mask as PIL draws the black text: (img * (255 - mask) + 128) / 255 rounded,
+    # the high bit depth image is divided exactly
+    a = img.astype(np.uint32) * (255 - mask.astype(np.uint32))[:, :, None]
+    if img.dtype == np.uint8:
+        a += 128
+        img[:] = ((a >> 8) + a) >> 8
+    else:
+        img[:] = (a + 127) // 255
+
+
+def _chart_cached(method):
+    # take the chart from the cache of the Chart object if the method with the same parameters was called
+    # on the same canvas, render and store the chart otherwise
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.cache is None or self.canvas is None or self.bit_depth != 8:
+            return method(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        params.pop('self')
+        image_name = params.pop('image_name')
+        json_name = gt_file_name(params.pop('json_name'), self.gt_format)
+        if not self.cache.image_format_supported(image_name):
+            return method(self, *args, **kwargs)
+        params['frame_type'] = self.frame_type
+        params['gt_format'] = self.gt_format
+        key = ChartCache.key(method=method.__name__, params=params, canvas=self.canvas)
+        if self.cache.get(key=key, image_name=image_name, json_name=json_name) is not None:
+            with PIL.Image.open(image_name) as img:
+                self.img = img
+            return self.canvas.copy() if signature.return_annotation is np.ndarray else None
+        self.cache.detach(image_name, json_name)
+        r = method(self, *args, **kwargs)
+        self.cache.put(key=key, image_name=image_name, json_name=json_name)
+        return r
+
+    return wrapper
 
 
 class Chart:
@@ -36,13 +361,37 @@ class Chart:
                   image_name='img/out/gradient_color.png',
                   json_name='img/out/gradient_color.json')
 
+    The chart methods paint in place on the canvas, numpy array with shape (height, width, 3),
+    the PIL image ct.to_image() is created from the canvas only to save the image or to draw the border.
+    The image is a copy, the drawing on it is kept by the assignment back to the chart:
+
+    img = ct.to_image()
+    PIL.ImageDraw.Draw(img).text((10, 10), 'Leesa', (0, 0, 0))
+    ct.img = img
+
+    Chart with 12-bit ramps, the colors are the code values of the bit depth:
+
+    ct = Chart(frame_type='4K_UHD', color_background=(2048, 2048, 2048), bit_depth=12)
+    ct.ramp_draw(start_x=0, start_y=0, end_color=(4095, 4095, 4095), ramp_size=4096)
+    ct.img_save('img/out/ramp12.png')
+
     """
 
-    def __init__(self, frame_type: str = 'QQVGA', color_background: tuple = (0, 0, 0)):
+    def __init__(self, frame_type: str = 'QQVGA', color_background: tuple = (0, 0, 0), cache: ChartCache = None,
+                 gt_format: str = 'json', strip_height: int = None, bit_depth: int = 8):
         """
 
         :param frame_type: key value taken from the _FRAME_SIZE dictionary
-        :param color_background: color for image background fill, color as RGB list
+        :param color_background: color for image background fill, color as RGB list of the code values
+        :param cache: ChartCache object, None - the charts are always rendered
+        :param gt_format: ground truth format: 'json' - JSON file with the list of objects,
+                          'npz' - columnar NPZ file, the extension of json_name is replaced by .npz
+        :param strip_height: None - the chart is painted on the canvas,
+                             the number of rows - the chart is kept as layers and rendered by strips of the rows
+                             straight to PNG or TIFF file, the memory does not depend on the frame size
+        :param bit_depth: 8, 10, 12 or 16, the canvas of 10, 12 and 16 bits is uint16 array of the code values,
+                          the colors of the chart methods are the code values, the palettes of ramps, combinations
+                          and edge_test are scaled to the code range
         """
         fr = FrameResolution()
         _FRAME_SIZE = fr.get_dict()
@@ -56,87 +405,234 @@ class Chart:
             raise ValueError("The color background must be non-empty.")
         if len(color_background) != 3:
             raise ValueError("The color background must be 3 elements tuple.")
-        # allocate output image
+        if strip_height is not None and strip_height <= 0:
+            raise ValueError("The strip height must be > 0.")
+        if bit_depth not in _CHART_BIT_DEPTH:
+            raise ValueError("The bit depth is not supported.")
+        if max(color_background) >= 2 ** bit_depth or min(color_background) < 0:
+            raise ValueError("The color background does not fit the bit depth.")
+        # allocate output image, the canvas is kept as numpy array for the whole chart lifetime
         self.frame = _FRAME_SIZE[frame_type]
-        self.img = PIL.Image.new(mode='RGB', size=(self.frame['w'], self.frame['h']), color=color_background)
+        self.color_background = tuple(color_background)
+        self.strip_height = strip_height
+        self.bit_depth = bit_depth
+        self.dtype = _CHART_BIT_DEPTH[bit_depth]
+        self.layers = []  # the layers of the strip mode
+        self.border = None  # the border patches of the strip mode
+        self.canvas = None
+        self.padded = None  # the canvas with the border padding, the canvas is the view of its content
+        if strip_height is None:
+            b_size = self.frame['w'] // 46  # border size
+            self.padded = np.zeros((self.frame['h'] + b_size * 2, self.frame['w'] + b_size * 2, 3), dtype=self.dtype)
+            self.canvas = self.padded[b_size:b_size + self.frame['h'], b_size:b_size + self.frame['w']]
+            self.canvas[:] = color_background
+        self.cache = cache
+        gt_file_name(gt_format=gt_format)  # check the format
+        self.gt_format = gt_format
+
+    def to_image(self) -> PIL.Image.Image:
+        """
+        The chart image as new PIL image created from the canvas.
+        The high bit depth chart is reduced to 8 bits by the shift, the image is a preview.
+
+        :return: PIL image in 'RGB' mode
+        """
+        img = self.strip_render(0, self.image_size()[0]) if self.canvas is None else self.canvas
+        if self.bit_depth != 8:
+            img = (img >> (self.bit_depth - 8)).astype(np.uint8)
+        return PIL.Image.fromarray(img)
+
+    @property
+    def img(self) -> PIL.Image.Image:
+        """
+        The chart image as PIL image, the same as to_image(). Every access creates the new image from the canvas,
+        the edits of ct.img.paste(...) or PIL.ImageDraw.Draw(ct.img) are lost, edit the image and assign it
+        to ct.img.
+
+        :return: PIL image in 'RGB' mode
+        """
+        return self.to_image()
+
+    @img.setter
+    def img(self, img: PIL.Image.Image) -> None:
+        self.canvas = self.code_values(np.array(img.convert('RGB')))
+        self.padded = None
+        self.strip_height = None
+
+    def code_values(self, colors) -> np.ndarray:
+        """
+        Scale 8-bit colors to the code values of the chart bit depth, 255 is the maximum code value.
+
+        :param colors: 8-bit color or array of colors
+        :return: array of the code values with the canvas data type
+        """
+        colors = np.asarray(colors)
+        if self.bit_depth == 8:
+            return colors.astype(np.uint8, copy=False)
+        return ((colors.astype(np.int64) * (2 ** self.bit_depth - 1) + 127) // 255).astype(self.dtype)
+
+    def colors_check(self, colors) -> None:
+        """
+        Check the colors of the chart method are the code values of the chart bit depth.
+
+        :param colors: RGB color or list of RGB colors
+        :return: None
+        """
+        colors = np.asarray(colors)
+        if colors.size == 0 or colors.shape[-1] != 3:
+            raise ValueError("The color must be 3 elements tuple.")
+        if colors.min() < 0 or colors.max() >= 2 ** self.bit_depth:
+            raise ValueError("The color does not fit the bit depth.")
+
+    def _patch(self, patch: np.ndarray) -> np.ndarray:
+        # the 8-bit border patch as code values
+        return patch if self.bit_depth == 8 else self.code_values(patch)
+
+    def layers_paint(self, layers: list = None) -> None:
+        """
+        Paint the layers of rectangles on the canvas, in the strip mode the layers are kept to render the strips.
+
+        :param layers: list of (rows, columns, palette), rows and columns are (band starts, band sizes),
+                       palette has shape (row bands, column bands, 3)
+        :return: None
+        """
+        if self.canvas is None:
+            self.layers.extend(layers)
+            return
+        for layer in layers:
+            _layer_paint(self.canvas, layer)
+
+    def image_size(self) -> tuple:
+        """
+        The output image size.
+
+        :return: tuple of the image height and width
+        """
+        if self.canvas is not None:
+            return self.canvas.shape[0], self.canvas.shape[1]
+        if self.border is not None:
+            return self.border['height'], self.border['width']
+        return self.frame['h'], self.frame['w']
+
+    def strip_render(self, y_start: int = 0, y_end: int = 0) -> np.ndarray:
+        """
+        Render the rows of the output image in the strip mode.
+
+        :param y_start: the first row
+        :param y_end: the row after the last row
+        :return: RGB array with shape (y_end - y_start, width, 3)
+        """
+        if self.canvas is not None:
+            return self.canvas[y_start:y_end].copy()
+        n_height, n_width = self.image_size()
+        y_end = min(y_end, n_height)
+        strip = np.zeros((max(y_end - y_start, 0), n_width, 3), dtype=self.dtype)
+        b_size = 0
+        if self.border is not None:
+            b_size = self.border['size']
+            for y, x, patch in self.border['ring']:
+                y0 = max(y, y_start)
+                y1 = min(y + patch.shape[0], y_end)
+                if y0 < y1:
+                    strip[y0 - y_start:y1 - y_start, x:x + patch.shape[1]] = self._patch(patch[y0 - y:y1 - y])
+        # the chart content
+        y0 = max(y_start, b_size)
+        y1 = min(y_end, b_size + self.frame['h'])
+        if y0 < y1:
+            content = strip[y0 - y_start:y1 - y_start, b_size:b_size + self.frame['w']]
+            content[:] = self.color_background
+            for layer in self.layers:
+                _layer_paint(content, layer, offset=y0 - b_size)
+        if self.border is not None:
+            y, x, mask = self.border['text']
+            y0 = max(y, y_start)
+            y1 = min(y + mask.shape[0], y_end)
+            x1 = min(x + mask.shape[1], n_width)
+            if y0 < y1:
+                _patch_blend_black(strip[y0 - y_start:y1 - y_start, x:x1], mask[y0 - y:y1 - y, :x1 - x])
+        return strip
+
+    def strips_save(self, image_name: str = None) -> None:
+        """
+        Render the chart by strips and write them to PNG or TIFF file.
+        The high bit depth chart is written as 16-bit image, the code values are shifted to the high bits.
+
+        :param image_name: the image file name with .png, .tif or .tiff extension
+        :return: None
+        """
+        n_height, n_width = self.image_size()
+        strip_height = self.strip_height if self.strip_height is not None else n_height
+        shift = 16 - self.bit_depth if self.bit_depth != 8 else 0
+        with strip_writer(image_name, n_width, n_height, bit_depth=8 if self.bit_depth == 8 else 16,
+                          significant_bits=None if self.bit_depth == 8 else self.bit_depth) as w:
+            for y in range(0, n_height, strip_height):
+                strip = self.strip_render(y, y + strip_height)
+                w.write(strip << shift if shift else strip)
 
     def border_draw(self) -> None:
-        b_size = self.frame['w'] // 46  # border size
-        f_width = self.frame['w'] + b_size * 2
-        f_height = self.frame['h'] + b_size * 2
-        img = PIL.Image.new(mode='RGB', size=(f_width, f_height), color=(0, 0, 0))
+        """
+        Add the black border with white triangles and the frame ratio. The border template of the frame type
+        is drawn once and cached, the canvas is allocated with the border padding, so the border is written
+        to the padding and the content is not copied.
 
-        draw = PIL.ImageDraw.Draw(img)
-        # borders
-        draw.polygon([(0, 0), (f_width - 1, 0), (f_width - 1, b_size - 1), (0, b_size - 1)], fill=(0, 0, 0))
-        draw.polygon(
-            [(0, f_height - b_size), (f_width - 1, f_height - b_size), (f_width - 1, f_height - 1),
-             (0, f_height - 1)],
-            fill=(0, 0, 0))
-        draw.polygon([(0, 0), (b_size - 1, 0), (b_size - 1, f_height - 1), (0, f_height - 1)], fill=(0, 0, 0))
-        draw.polygon(
-            [(f_width - b_size, 0), (f_width - 1, 0), (f_width - 1, f_height - 1),
-             (f_width - b_size, f_height - 1)],
-            fill=(0, 0, 0))
-        # triangles
-        # white triangles
-        b2 = b_size // 2
-        w2 = f_width // 2
-        h2 = f_height // 2
-        # top triangle
-        draw.polygon([(w2 - b2, 0),
-                      (w2 + b2, 0),
-                      (w2, b_size)],
-                     fill=(255, 255, 255))
-        # bottom triangle
-        draw.polygon([(w2 - b2, f_height - 1),
-                      (w2 + b2, f_height - 1),
-                      (w2, f_height - 1 - b_size)],
-                     fill=(255, 255, 255))
-        # left side triangles
-        draw.polygon([(0, h2 - b2),
-                      (b_size, h2),
-                      (0, h2 + b2)],
-                     fill=(255, 255, 255))
-        draw.polygon([(0, b_size),
-                      (b_size, b2 + b_size),
-                      (0, b_size + b_size)],
-                     fill=(255, 255, 255))
-        draw.polygon([(0, f_height - b_size * 2),
-                      (b_size, f_height - b2 - b_size),
-                      (0, f_height - b_size)],
-                     fill=(255, 255, 255))
-        # right side triangles
-        draw.polygon([(f_width - 1, h2 - b2),
-                      (f_width - 1 - b_size, h2),
-                      (f_width - 1, h2 + b2)],
-                     fill=(255, 255, 255))
-        draw.polygon([(f_width - 1, b_size),
-                      (f_width - 1 - b_size, b_size + b2),
-                      (f_width - 1, b_size + b_size)],
-                     fill=(255, 255, 255))
-        draw.polygon([(f_width - 1, f_height - b_size * 2),
-                      (f_width - 1 - b_size, f_height - b_size - b2),
-                      (f_width - 1, f_height - b_size)],
-                     fill=(255, 255, 255))
-        # display ratio
-        img.paste(self.img, (b_size, b_size))
+        :return: None
+        """
+        patches = _border_patches(self.frame_type)
+        if self.canvas is None:
+            # the border of the strip mode is rendered by strips
+            self.border = patches
+            return
+        padded = self.padded
+        if padded is None:
+            # the canvas was replaced or the border was drawn already, paste the canvas to the new padded image
+            b_size = patches['size']
+            padded = np.zeros((patches['height'], patches['width'], 3), dtype=self.dtype)
+            h = min(self.canvas.shape[0], patches['height'] - b_size)
+            w = min(self.canvas.shape[1], patches['width'] - b_size)
+            padded[b_size:b_size + h, b_size:b_size + w] = self.canvas[:h, :w]
+        for y, x, patch in patches['ring']:
+            padded[y:y + patch.shape[0], x:x + patch.shape[1]] = self._patch(patch)
         # print ratio
-        font_h = 9
-        font = PIL.ImageFont.truetype("tahoma.ttf", font_h)
-        draw.text((b_size + 1, f_height - 1 - font_h - b_size), self.frame['ratio'], font=font, fill="black")
-        self.img = img
+        y, x, mask = patches['text']
+        region = padded[y:y + mask.shape[0], x:x + mask.shape[1]]
+        _patch_blend_black(region, mask[:region.shape[0], :region.shape[1]])
+        self.canvas = padded
+        self.padded = None
+
+    def gt_save(self, json_name: str = None, header: dict = None, columns: dict = None) -> str:
+        """
+        Save the ground truth in the chart ground truth format.
+
+        :param json_name: the ground truth file name
+        :param header: dictionary of the header values
+        :param columns: dictionary from gt_columns
+        :return: the saved file name
+        """
+        if self.bit_depth != 8:
+            header = dict(header, bit_depth=self.bit_depth)
+        return gt_save(file_name=json_name, header=header, columns=columns, gt_format=self.gt_format)
 
     def img_save(self, image_name: str = None) -> None:
         """
-        Save an image to carrier
+        Save an image to carrier. The .raw file is the packed code values of RGB pixels, RAW8, RAW10, RAW12
+        or RAW16 by the bit depth, with the sidecar {image_name}.json. The high bit depth chart is saved
+        to 16-bit PNG or TIFF only.
 
         :param image_name: the image file name with path and extension
         :return: None
         """
-        # save image
-        img_save(img=self.img, image_name=image_name)
+        # save image, the PIL image is created only to save
+        if image_name is not None:
+            if os.path.splitext(image_name)[1].lower() == '.raw':
+                img = self.canvas if self.canvas is not None else self.strip_render(0, self.image_size()[0])
+                raw_write(raw=img, file_name=image_name, raw_format=_CHART_RAW_FORMAT[self.bit_depth], cfa='RGB',
+                          json_name=image_name + '.json')
+            elif self.canvas is None or self.bit_depth != 8:
+                self.strips_save(image_name)
+            else:
+                img_save(img=self.to_image(), image_name=image_name)
 
+    @_chart_cached
     def rectangles(self,
                    color_mode: str = 'single_color',
                    rectangle_color: list = None,
@@ -166,7 +662,7 @@ class Chart:
         :param border: draw border with triangles. True or False.
         :param image_name: output image file name
         :param json_name: output JSON file name
-        :return: chart image as numpy array
+        :return: chart image as numpy array, None in the strip mode
         """
 
         if color_mode is None:
@@ -175,6 +671,7 @@ class Chart:
             raise ValueError("The color mode is not exist.")
         if rectangle_color is None:
             raise ValueError("The color list must be non-empty.")
+        self.colors_check(rectangle_color[:2] if color_mode == 'gradient_color' else rectangle_color[:1])
         if rectangle_width is None or rectangle_width <= 0:
             raise ValueError("The rectangle width must be non-empty or > 0.")
         if rectangle_height is None or rectangle_height <= 0:
@@ -198,43 +695,23 @@ class Chart:
 
         timestamp = datetime.datetime.now().strftime("%d-%b-%Y(%H-%M-%S)")
 
-        stats = []  # rectangle start coordinates, width, height, color
         # create color table
-        color_table = np.zeros(shape=(rq, 3), dtype=np.uint8)
         if color_mode == 'gradient_color':
-            r_step = (rectangle_color[1][0] - rectangle_color[0][0]) / rq
-            g_step = (rectangle_color[1][1] - rectangle_color[0][1]) / rq
-            b_step = (rectangle_color[1][2] - rectangle_color[0][2]) / rq
-            r = rectangle_color[0][0]
-            g = rectangle_color[0][1]
-            b = rectangle_color[0][2]
-            for i in range(rq):
-                color_table[i] = [int(r), int(g), int(b)]
-                r += r_step
-                g += g_step
-                b += b_step
-            color_table[rq - 1] = rectangle_color[
-                1]  # last color must be exact color, but not a step error approximation
-        elif color_mode == 'single_color':
-            for i in range(rq):
-                color_table[i] = rectangle_color[0]
-
-        img = np.array(self.img)  # allocate numpy image
+            # last color must be exact color, but not a step error approximation
+            color_table = _color_ramps(rectangle_color[0], rectangle_color[1], rq, rq, self.dtype)[0]
+        else:
+            color_table = np.tile(np.asarray(rectangle_color[0], dtype=self.dtype), (rq, 1))
+
         # paint rectangles
-        color_pos = 0
-        pos_y = start_y
-        for y in range(rqy):
-            pos_x = start_x
-            for x in range(rqx):
-                img[pos_y:pos_y + rectangle_height, pos_x: pos_x + rectangle_width] = color_table[color_pos]
-                stats.append(
-                    {'x': pos_x, 'y': pos_y, 'w': rectangle_width, 'h': rectangle_height,
-                     'c': color_table[color_pos].tolist()})
-                color_pos += 1
-                pos_x = pos_x + rectangle_width + gap_x
-            pos_y = pos_y + rectangle_height + gap_y
-
-        self.img = PIL.Image.fromarray(img).convert('RGB')  # convert numpy image to PIL image
+        step_x = rectangle_width + gap_x
+        step_y = rectangle_height + gap_y
+        self.layers_paint(_grid_layers(color_table, rqx, start_y, start_x, step_y, step_x,
+                                       ((0, rectangle_height),), ((0, rectangle_width),)))
+        stats = None  # rectangle start coordinates, width, height, color
+        if json_name is not None:
+            pos_x, pos_y = _grid_positions(rq, rqx, start_y, start_x, step_y, step_x)
+            stats = gt_columns(pos_x, pos_y, rectangle_width, rectangle_height, color_table)
+
         # add border if required
         if border is True:
             self.border_draw()
@@ -242,13 +719,10 @@ class Chart:
         self.img_save(image_name)
         # save JSON
         if json_name is not None:
-            os.makedirs(os.path.dirname(json_name), exist_ok=True)
-            dt_json = {'exporter': 'Leesa Exporter v0.1.6', 'time': timestamp, 'type': 'rectangle', 'color': 'RGB',
-                       'objects': stats}
-            with open(json_name, 'w') as outfile:
-                json.dump(dt_json, outfile, indent=2)
+            self.gt_save(json_name, {'exporter': 'Leesa Exporter v0.1.6', 'time': timestamp, 'type': 'rectangle',
+                                     'color': 'RGB'}, stats)
 
-        return np.array(self.img)
+        return self.canvas.copy() if self.canvas is not None else None
 
     def ramp_draw(self,
                   start_x: int = 0,
@@ -259,41 +733,27 @@ class Chart:
                   end_color: tuple = (0, 0, 0),
                   ramp_size: int = 256,
                   direction: int = 0) -> list:
-        stats = []
-
-        img = np.array(self.img)  # allocate numpy image
-
-        r_step = (end_color[0] - start_color[0]) / (ramp_size - 1)
-        g_step = (end_color[1] - start_color[1]) / (ramp_size - 1)
-        b_step = (end_color[2] - start_color[2]) / (ramp_size - 1)
-
+        self.colors_check([start_color, end_color])
         # create color table
-        color_table = np.zeros(shape=(ramp_size, 3), dtype=np.uint8)
-        r = start_color[0]
-        g = start_color[1]
-        b = start_color[2]
-        for i in range(ramp_size - 1):
-            color_table[i] = [int(r), int(g), int(b)]
-            r += r_step
-            g += g_step
-            b += b_step
-        color_table[ramp_size - 1] = end_color
-
-        pos_x = start_x
-        pos_y = start_y
-        for i in range(ramp_size):
-            img[pos_y:pos_y + element_height, pos_x: pos_x + element_width] = color_table[i]
-            if direction == 0:
-                pos_x += element_width
-            else:
-                pos_y += element_height
-            e = {'x': pos_x, 'y': pos_y, 'w': element_width, 'h': element_height, 'c': color_table[i].tolist()}
-            stats.append(e)
-
-        self.img = PIL.Image.fromarray(img).convert('RGB')  # convert numpy image to PIL image
+        color_table = _color_ramps(start_color, end_color, ramp_size, ramp_size - 1, self.dtype)[0]
+
+        steps = np.arange(ramp_size, dtype=np.int64)
+        if direction == 0:
+            self.layers_paint([(([start_y], element_height), (start_x + steps * element_width, element_width),
+                               color_table[None])])
+            pos_x = start_x + (steps + 1) * element_width
+            pos_y = start_y
+        else:
+            self.layers_paint([((start_y + steps * element_height, element_height), ([start_x], element_width),
+                               color_table[:, None])])
+            pos_x = start_x
+            pos_y = start_y + (steps + 1) * element_height
 
-        return stats
+        # the coordinates are taken after the step to the next element
+        return gt_objects(gt_columns(np.broadcast_to(pos_x, steps.shape), pos_y, element_width, element_height,
+                                     color_table))
 
+    @_chart_cached
     def ramps(self,
               element_width: int = 1,
               element_height: int = 16,
@@ -322,49 +782,43 @@ class Chart:
              ]
         x_step = 8
         y_step = 8
-        start_x = x_step
-        start_y = y_step
-
-        stats = []
-
-        for e in a:
-            r = self.ramp_draw(start_x=start_x,
-                               start_y=start_y,
-                               start_color=e[0],
-                               end_color=e[1],
-                               element_width=element_width,
-                               element_height=element_height,
-                               ramp_size=ramp_size,
-                               direction=0,
-                               )
-            start_y = start_y + y_step + element_height
-            stats.extend(r)
-
-        start_x = x_step + len(a) * element_height + (len(a)) * x_step
-        start_y = y_step
-
-        for e in a:
-            r = self.ramp_draw(start_x=start_x,
-                               start_y=start_y,
-                               start_color=e[0],
-                               end_color=e[1],
-                               element_width=element_height,
-                               element_height=element_width,
-                               ramp_size=ramp_size,
-                               direction=1)
-            start_x = start_x + x_step + element_height
-            stats.extend(r)
+
+        # color tables of all ramps
+        color_table = _color_ramps(self.code_values([e[0] for e in a]), self.code_values([e[1] for e in a]),
+                                   ramp_size, ramp_size - 1, self.dtype)
+        n = len(a)
+
+        # horizontal ramps, one ramp per grid row
+        self.layers_paint(_grid_layers(color_table.reshape(-1, 3), ramp_size, y_step, x_step,
+                                       y_step + element_height, element_width,
+                                       ((0, element_height),), ((0, element_width),)))
+        # vertical ramps, one ramp per grid column
+        start_x = x_step + n * element_height + n * x_step
+        self.layers_paint(_grid_layers(color_table.transpose(1, 0, 2).reshape(-1, 3), n, y_step, start_x,
+                                       element_width, x_step + element_height,
+                                       ((0, element_width),), ((0, element_height),)))
+
+        stats = None
+        if json_name is not None:
+            # the coordinates are taken after the step to the next element as in ramp_draw
+            pos_x, pos_y = _grid_positions(n * ramp_size, ramp_size, y_step, x_step, y_step + element_height,
+                                           element_width)
+            stats = [gt_columns(pos_x + element_width, pos_y, element_width, element_height,
+                                color_table.reshape(-1, 3))]
+            pos_y, pos_x = _grid_positions(n * ramp_size, ramp_size, start_x, y_step, x_step + element_height,
+                                           element_width)
+            stats.append(gt_columns(pos_x, pos_y + element_width, element_height, element_width,
+                                    color_table.reshape(-1, 3)))
+            stats = gt_concatenate(stats)
 
         # save image
         self.img_save(image_name)
         # save JSON
         if json_name is not None:
-            os.makedirs(os.path.dirname(json_name), exist_ok=True)
-            dt_json = {'exporter': 'Leesa Exporter v0.1.6', 'time': timestamp, 'type': 'ramps', 'color': 'RGB',
-                       'objects': stats}
-            with open(json_name, 'w') as outfile:
-                json.dump(dt_json, outfile, indent=2)
+            self.gt_save(json_name, {'exporter': 'Leesa Exporter v0.1.6', 'time': timestamp, 'type': 'ramps',
+                                     'color': 'RGB'}, stats)
 
+    @_chart_cached
     def combinations(self,
                      element_width: int = 16,
                      element_height: int = 16,
@@ -387,7 +841,7 @@ class Chart:
         x2 = element_width // 2
         y2 = element_height // 2
 
-        stats = []
+        stats = None
         #   estimating the maximum number of the elements in the image
         # rectangles quantity in horizontal direction
         rqx = (self.frame['w']) // (element_width + gap_x)
@@ -397,64 +851,38 @@ class Chart:
         if rqx * rqy < c_limit:
             c_limit = rqx * rqy
 
-        img = np.array(self.img)  # allocate numpy image
-
-        color_pos = 0
+        # the first and the second colors of the combinations
+        pair = self.code_values([ct[i] for i in range(c_limit)]).reshape(c_limit, 2, 3)
+        step_x = element_width + gap_x
+        step_y = element_height + gap_y
+        # rows of the vertical combinations
+        n_rows = -(-c_limit // rqx) if c_limit > 0 else 0
 
         # vertical combinations
-        pos_y = start_y
-        for y in range(rqy):
-            if color_pos == c_limit:
-                break
-            pos_x = start_x
-            for x in range(rqx):
-                if color_pos == c_limit:
-                    break
-                img[pos_y:pos_y + element_height, pos_x: pos_x + x2] = ct[color_pos][0]
-                img[pos_y:pos_y + element_height, pos_x + x2: pos_x + element_width] = ct[color_pos][1]
-                stats.append(
-                    {'x': pos_x, 'y': pos_y, 'w': x2, 'h': element_height,
-                     'c': ct[color_pos][0]})
-                stats.append(
-                    {'x': pos_x + x2, 'y': pos_y, 'w': x2, 'h': element_height,
-                     'c': ct[color_pos][0]})
-                color_pos += 1
-                pos_x = pos_x + element_width + gap_x
-            pos_y = pos_y + element_height + gap_y
-
+        self.layers_paint(_grid_layers(pair[:, None], rqx, start_y, start_x, step_y, step_x,
+                                       ((0, element_height),), ((0, x2), (x2, element_width - x2))))
         # horizontal combinations
-        color_pos = 0
-        for y in range(rqy):
-            if color_pos == c_limit:
-                break
-            pos_x = start_x
-            for x in range(rqx):
-                if color_pos == c_limit:
-                    break
-                img[pos_y:pos_y + y2, pos_x: pos_x + element_width] = ct[color_pos][0]
-                img[pos_y + y2:pos_y + element_height, pos_x: pos_x + element_width] = ct[color_pos][1]
-                stats.append(
-                    {'x': pos_x, 'y': pos_y, 'w': element_width, 'h': y2,
-                     'c': ct[color_pos][0]})
-                stats.append(
-                    {'x': pos_x, 'y': pos_y + y2, 'w': element_width, 'h': y2,
-                     'c': ct[color_pos][0]})
-
-                color_pos += 1
-                pos_x = pos_x + element_width + gap_x
-            pos_y = pos_y + element_height + gap_y
-
-        self.img = PIL.Image.fromarray(img).convert('RGB')  # convert numpy image to PIL image
+        self.layers_paint(_grid_layers(pair[:, :, None], rqx, start_y + n_rows * step_y, start_x, step_y, step_x,
+                                       ((0, y2), (y2, element_height - y2)), ((0, element_width),)))
+
+        if json_name is not None:
+            pos_x, pos_y = _grid_positions(c_limit, rqx, start_y, start_x, step_y, step_x)
+            c = self.code_values([ct[i][0] for i in range(c_limit) for _ in range(2)])
+            stats = [gt_columns(np.stack([pos_x, pos_x + x2], axis=1).ravel(), np.repeat(pos_y, 2),
+                                x2, element_height, c)]
+            pos_x, pos_y = _grid_positions(c_limit, rqx, start_y + n_rows * step_y, start_x, step_y, step_x)
+            stats.append(gt_columns(np.repeat(pos_x, 2), np.stack([pos_y, pos_y + y2], axis=1).ravel(),
+                                    element_width, y2, c))
+            stats = gt_concatenate(stats)
+
         # save image
         self.img_save(image_name)
         # save JSON
         if json_name is not None:
-            os.makedirs(os.path.dirname(json_name), exist_ok=True)
-            dt_json = {'exporter': 'Leesa Exporter v0.1.6', 'time': timestamp, 'type': 'ramps', 'color': 'RGB',
-                       'objects': stats}
-            with open(json_name, 'w') as outfile:
-                json.dump(dt_json, outfile, indent=2)
+            self.gt_save(json_name, {'exporter': 'Leesa Exporter v0.1.6', 'time': timestamp, 'type': 'ramps',
+                                     'color': 'RGB'}, stats)
 
+    @_chart_cached
     def edge_test(self,
                   element_width: int = 3,
                   element_height: int = 12,
@@ -478,7 +906,7 @@ class Chart:
         x2 = element_width // 2
         y2 = element_height // 2
 
-        stats = []
+        stats = None
         # bar width
         bar_width = (gap_x + element_width) * 255 + gap_x
         bar_height = element_height + bar_border * 2
@@ -490,51 +918,28 @@ class Chart:
         if rqy < c_limit:
             c_limit = rqy
 
-        img = np.array(self.img)  # allocate numpy image
+        # prepare the color transition tables of all bars
+        color_table = _color_ramps(self.code_values([ct[i][0] for i in range(c_limit)]),
+                                   self.code_values([ct[i][1] for i in range(c_limit)]), 256, 255, self.dtype)
+        step_x = element_width + gap_x
+        step_y = bar_height + gap_y
 
-        color_pos = 0
+        # bars with the first color
+        bar_colors = self.code_values([ct[i][0] for i in range(c_limit)]).reshape(-1, 3)
+        self.layers_paint(_grid_layers(bar_colors, 1, start_y, start_x, step_y, bar_width,
+                                       ((0, bar_height),), ((0, bar_width),)))
+        # add the vertical lines
+        self.layers_paint(_grid_layers(color_table.reshape(-1, 3), 256, start_y + bar_border, start_x, step_y, step_x,
+                                       ((0, element_height),), ((0, element_width),)))
+
+        if json_name is not None:
+            # the coordinates are taken after the step to the next line
+            pos_x, pos_y = _grid_positions(c_limit * 256, 256, start_y, start_x, step_y, step_x)
+            stats = gt_columns(pos_x + step_x, pos_y, element_width, element_height, color_table.reshape(-1, 3))
 
-        # vertical combinations
-        pos_y = start_y
-        for y in range(rqy):
-            if color_pos == c_limit:
-                break
-            img[pos_y:pos_y + bar_height, start_x: start_x + bar_width] = ct[color_pos][0]
-            # add the vertical lines
-            pos_x = start_x
-            # prepare the color transition table
-            color_table = np.zeros(shape=(256, 3), dtype=np.uint8)
-            r_step = (ct[color_pos][1][0] - ct[color_pos][0][0]) / 255
-            g_step = (ct[color_pos][1][1] - ct[color_pos][0][1]) / 255
-            b_step = (ct[color_pos][1][2] - ct[color_pos][0][2]) / 255
-            r = ct[color_pos][0][0]
-            g = ct[color_pos][0][1]
-            b = ct[color_pos][0][2]
-            for i in range(256):
-                color_table[i] = [int(r), int(g), int(b)]
-                r += r_step
-                g += g_step
-                b += b_step
-                color_table[-1] = ct[color_pos][1]
-
-            for i in range(0, 256):
-                img[pos_y + bar_border:pos_y + bar_border + element_height, pos_x: pos_x + element_width] = color_table[
-                    i]
-                pos_x = pos_x + element_width + gap_x
-                stats.append(
-                    {'x': pos_x, 'y': pos_y, 'w': element_width, 'h': element_height,
-                     'c': color_table[i].tolist()})
-
-            color_pos += 1
-            pos_y = pos_y + bar_height + gap_y
-
-        self.img = PIL.Image.fromarray(img).convert('RGB')  # convert numpy image to PIL image
         # save image
         self.img_save(image_name)
         # save JSON
         if json_name is not None:
-            os.makedirs(os.path.dirname(json_name), exist_ok=True)
-            dt_json = {'exporter': 'Leesa Exporter v0.1.6', 'time': timestamp, 'type': 'ramps', 'color': 'RGB',
-                       'objects': stats}
-            with open(json_name, 'w') as outfile:
-                json.dump(dt_json, outfile, indent=2)
+            self.gt_save(json_name, {'exporter': 'Leesa Exporter v0.1.6', 'time': timestamp, 'type': 'ramps',
+                                     'color': 'RGB'}, stats)
@@ -0,0 +1,296 @@
+"""Contains the reference demosaic algorithms and the quality scoring of the demosaic by the chart ground truth.
+"""
+import json
+import numpy as np
+import PIL.Image
+from leesa.bayer import cfa_sites, cfa_channels, cfa_pattern, rgb_to_mosaic
+
+# demosaic methods
+_DEMOSAIC_METHOD = {
+    'bilinear': 0,
+    'malvar': 1,
+    'edge_aware': 2
+}
+
+# bilinear interpolation weights
+_KERNEL_BILINEAR = np.array([[1, 2, 1],
+                             [2, 4, 2],
+                             [1, 2, 1]], dtype=np.float64)
+
+# Malvar-He-Cutler kernels, the sum of every kernel is 8
+# G at R or B sites
+_KERNEL_MHC_G = np.array([[0, 0, -1, 0, 0],
+                          [0, 0, 2, 0, 0],
+                          [-1, 2, 4, 2, -1],
+                          [0, 0, 2, 0, 0],
+                          [0, 0, -1, 0, 0]], dtype=np.float64)
+# R (B) at G sites in R (B) row
+_KERNEL_MHC_ROW = np.array([[0, 0, 0.5, 0, 0],
+                            [0, -1, 0, -1, 0],
+                            [-1, 4, 5, 4, -1],
+                            [0, -1, 0, -1, 0],
+                            [0, 0, 0.5, 0, 0]], dtype=np.float64)
+# R (B) at G sites in B (R) row
+_KERNEL_MHC_COLUMN = _KERNEL_MHC_ROW.T.copy()
+# R at B sites and B at R sites
+_KERNEL_MHC_DIAGONAL = np.array([[0, 0, -1.5, 0, 0],
+                                 [0, 2, 0, 2, 0],
+                                 [-1.5, 0, 6, 0, -1.5],
+                                 [0, 2, 0, 2, 0],
+                                 [0, 0, -1.5, 0, 0]], dtype=np.float64)
+
+
+def _correlate2d(img: np.ndarray, kernel: np.ndarray, mode: str = 'constant') -> np.ndarray:
+    # 2D correlation by the sum of shifted views, only non-zero weights are used
+    n_ry = kernel.shape[0] // 2
+    n_rx = kernel.shape[1] // 2
+    n_height, n_width = img.shape
+    p = np.pad(img.astype(np.float64, copy=False), ((n_ry, n_ry), (n_rx, n_rx)), mode=mode)
+    r = np.zeros((n_height, n_width), dtype=np.float64)
+    for dy, dx in zip(*np.nonzero(kernel)):
+        r += kernel[dy, dx] * p[dy:dy + n_height, dx:dx + n_width]
+    return r
+
+
+def cfa_masks(bayer_type: str = 'RGGB', height: int = 0, width: int = 0) -> np.ndarray:
+    """
+    The sites of every channel as boolean planes.
+
+    :param bayer_type: Bayer type
+    :param height: frame height
+    :param width: frame width
+    :return: boolean array with shape (channels, height, width)
+    """
+    masks = np.zeros((len(cfa_channels(bayer_type)), height, width), dtype=bool)
+    for channel, sy, sx in cfa_sites(bayer_type, height, width):
+        masks[channel, sy, sx] = True
+    return masks
+
+
+def _bayer_masks(bayer_type: str, height: int, width: int) -> tuple:
+    # R, G and B sites, G sites in R rows, G sites in B rows of 2x2 Bayer pattern
+    pattern = cfa_pattern(bayer_type)
+    if len(pattern) != 2 or len(pattern[0]) != 2 or sorted(''.join(pattern)) != ['B', 'G', 'G', 'R'] or \
+            (pattern[0][0] != pattern[1][1] and pattern[0][1] != pattern[1][0]):
+        raise ValueError("The demosaic method supports 2x2 Bayer patterns only.")
+    masks = cfa_masks(bayer_type, height, width)
+    r_row = (np.arange(height) % 2) == (0 if 'R' in pattern[0] else 1)
+    g_r_row = masks[1] & r_row[:, None]
+    g_b_row = masks[1] & ~r_row[:, None]
+    return masks[0], masks[1], masks[2], g_r_row, g_b_row
+
+
+def _to_output(rgb: np.ndarray, dtype) -> np.ndarray:
+    # round and clip to the range of the raw data type
+    n_max = np.iinfo(dtype).max if np.issubdtype(dtype, np.integer) else None
+    if n_max is None:
+        return rgb
+    return np.clip(np.rint(rgb), 0, n_max).astype(dtype)
+
+
+def demosaic_bilinear(raw: np.ndarray = None, bayer_type: str = 'RGGB') -> np.ndarray:
+    """
+    Bilinear demosaic as normalized convolution, it works for any CFA pattern.
+    The pixels without the channel site in the 3x3 neighbourhood are interpolated in the 5x5 neighbourhood.
+
+    :param raw: raw plane with shape (height, width)
+    :param bayer_type: Bayer type of the raw plane
+    :return: RGB image with the raw data type
+    """
+    if raw is None:
+        raise ValueError("Raw image must be non-empty.")
+    raw = np.asarray(raw)
+    n_height, n_width = raw.shape
+    masks = cfa_masks(bayer_type, n_height, n_width)
+    rgb = np.zeros((n_height, n_width, 3), dtype=np.float64)
+    for c in range(3):
+        m = masks[c].astype(np.float64)
+        v = raw * m
+        num = _correlate2d(v, _KERNEL_BILINEAR)
+        den = _correlate2d(m, _KERNEL_BILINEAR)
+        missing = den == 0
+        if missing.any():
+            box = np.ones((5, 5))
+            num = np.where(missing, _correlate2d(v, box), num)
+            den = np.where(missing, _correlate2d(m, box), den)
+        rgb[:, :, c] = np.where(masks[c], raw, np.divide(num, den, out=np.zeros_like(num), where=den > 0))
+    return _to_output(rgb, raw.dtype)
+
+
+def demosaic_malvar(raw: np.ndarray = None, bayer_type: str = 'RGGB') -> np.ndarray:
+    """
+    Malvar-He-Cutler high-quality linear demosaic for 2x2 Bayer patterns.
+    H. S. Malvar, L. He, R. Cutler, "High-quality linear interpolation for demosaicing of Bayer-patterned
+    color images", 2004
+
+    :param raw: raw plane with shape (height, width)
+    :param bayer_type: 'RGGB', 'BGGR', 'GRBG' or 'GBRG'
+    :return: RGB image with the raw data type
+    """
+    if raw is None:
+        raise ValueError("Raw image must be non-empty.")
+    raw = np.asarray(raw)
+    n_height, n_width = raw.shape
+    r_site, g_site, b_site, g_r_row, g_b_row = _bayer_masks(bayer_type, n_height, n_width)
+    v = raw.astype(np.float64)
+
+    g_rb = _correlate2d(v, _KERNEL_MHC_G, mode='reflect') / 8
+    c_row = _correlate2d(v, _KERNEL_MHC_ROW, mode='reflect') / 8
+    c_column = _correlate2d(v, _KERNEL_MHC_COLUMN, mode='reflect') / 8
+    c_diagonal = _correlate2d(v, _KERNEL_MHC_DIAGONAL, mode='reflect') / 8
+
+    rgb = np.empty((n_height, n_width, 3), dtype=np.float64)
+    rgb[:, :, 0] = np.select([r_site, g_r_row, g_b_row, b_site], [v, c_row, c_column, c_diagonal])
+    rgb[:, :, 1] = np.where(g_site, v, g_rb)
+    rgb[:, :, 2] = np.select([b_site, g_b_row, g_r_row, r_site], [v, c_row, c_column, c_diagonal])
+    return _to_output(rgb, raw.dtype)
+
+
+def demosaic_edge_aware(raw: np.ndarray = None, bayer_type: str = 'RGGB') -> np.ndarray:
+    """
+    Edge-aware demosaic for 2x2 Bayer patterns: G is interpolated along the direction with the smaller gradient
+    (Hamilton-Adams), R and B are interpolated bilinearly as the color differences to G.
+
+    :param raw: raw plane with shape (height, width)
+    :param bayer_type: 'RGGB', 'BGGR', 'GRBG' or 'GBRG'
+    :return: RGB image with the raw data type
+    """
+    if raw is None:
+        raise ValueError("Raw image must be non-empty.")
+    raw = np.asarray(raw)
+    n_height, n_width = raw.shape
+    r_site, g_site, b_site, _, _ = _bayer_masks(bayer_type, n_height, n_width)
+    v = raw.astype(np.float64)
+    p = np.pad(v, 2, mode='reflect')
+
+    def at(dy, dx):
+        return p[2 + dy:2 + dy + n_height, 2 + dx:2 + dx + n_width]
+
+    # G at R and B sites
+    lap_h = 2 * v - at(0, -2) - at(0, 2)
+    lap_v = 2 * v - at(-2, 0) - at(2, 0)
+    grad_h = np.abs(at(0, -1) - at(0, 1)) + np.abs(lap_h)
+    grad_v = np.abs(at(-1, 0) - at(1, 0)) + np.abs(lap_v)
+    g_h = (at(0, -1) + at(0, 1)) / 2 + lap_h / 4
+    g_v = (at(-1, 0) + at(1, 0)) / 2 + lap_v / 4
+    g = np.select([grad_h < grad_v, grad_v < grad_h], [g_h, g_v], (g_h + g_v) / 2)
+    g = np.where(g_site, v, g)
+
+    rgb = np.empty((n_height, n_width, 3), dtype=np.float64)
+    rgb[:, :, 1] = g
+    # R and B as the bilinear color difference to G
+    for c, site in [(0, r_site), (2, b_site)]:
+        m = site.astype(np.float64)
+        d = (v - g) * m
+        num = _correlate2d(d, _KERNEL_BILINEAR)
+        den = _correlate2d(m, _KERNEL_BILINEAR)
+        rgb[:, :, c] = np.where(site, v, g + np.divide(num, den, out=np.zeros_like(num), where=den > 0))
+    return _to_output(rgb, raw.dtype)
+
+
+def demosaic(raw: np.ndarray = None, bayer_type: str = 'RGGB', method: str = 'bilinear') -> np.ndarray:
+    """
+    Demosaic the raw plane by the reference method.
+
+    :param raw: raw plane with shape (height, width), for example from rgb_to_mosaic
+    :param bayer_type: Bayer type of the raw plane
+    :param method: 'bilinear', 'malvar' or 'edge_aware'
+    :return: RGB image with the raw data type
+    """
+    if method not in _DEMOSAIC_METHOD:
+        raise ValueError("The demosaic method is not exist.")
+    if method == 'malvar':
+        return demosaic_malvar(raw=raw, bayer_type=bayer_type)
+    elif method == 'edge_aware':
+        return demosaic_edge_aware(raw=raw, bayer_type=bayer_type)
+    return demosaic_bilinear(raw=raw, bayer_type=bayer_type)
+
+
+def _image_np(img) -> np.ndarray:
+    if isinstance(img, str):
+        img = PIL.Image.open(img).convert('RGB')
+    return np.asarray(img)[:, :, :3]
+
+
+def _summed_area_table(img: np.ndarray) -> np.ndarray:
+    sat = np.zeros((img.shape[0] + 1, img.shape[1] + 1), dtype=np.float64)
+    np.cumsum(img, axis=0, out=sat[1:, 1:])
+    np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+    return sat
+
+
+def demosaic_score(img_reference=None, img_test=None, json_name: str = None, peak: float = None) -> dict:
+    """
+    Score the demosaic result by the chart ground truth. All patches are calculated at once
+    by the summed-area tables of the squared error and of the color error.
+
+    :param img_reference: the chart RGB image as array or file name
+    :param img_test: the demosaic RGB image as array or file name
+    :param json_name: the chart JSON file with 'objects' from rectangles, ramps or combinations
+    :param peak: the maximum signal value, None - the maximum of the image data type
+    :return: dictionary with the full frame PSNR and color error, and the list of patches with PSNR and color error
+    """
+    if img_reference is None or img_test is None:
+        raise ValueError("Image object must be non-empty.")
+    if json_name is None:
+        raise ValueError("The JSON file must be non-empty.")
+    ref = _image_np(img_reference)
+    test = _image_np(img_test)
+    if ref.shape != test.shape:
+        raise ValueError("Images must have the same shape.")
+    if peak is None:
+        peak = float(np.iinfo(ref.dtype).max) if np.issubdtype(ref.dtype, np.integer) else 1.0
+    with open(json_name, 'r') as fp:
+        objects = json.load(fp)['objects']
+
+    diff = test.astype(np.float64) - ref.astype(np.float64)
+    sq = (diff * diff).sum(axis=2)
+    # the color error of the pixel is the Euclidean distance in RGB space
+    color = np.sqrt(sq)
+    sat_sq = _summed_area_table(sq)
+    sat_color = _summed_area_table(color)
+
+    n_height, n_width = sq.shape
+    x0 = np.clip(np.array([e['x'] for e in objects], dtype=np.int64), 0, n_width)
+    y0 = np.clip(np.array([e['y'] for e in objects], dtype=np.int64), 0, n_height)
+    x1 = np.clip(np.array([e['x'] + e['w'] for e in objects], dtype=np.int64), 0, n_width)
+    y1 = np.clip(np.array([e['y'] + e['h'] for e in objects], dtype=np.int64), 0, n_height)
+    area = (x1 - x0) * (y1 - y0)
+
+    def patch_sum(sat):
+        return sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mse = patch_sum(sat_sq) / (area * 3)
+        psnr = np.where(mse > 0, 10 * np.log10(peak * peak / mse), np.inf)
+        color_error = patch_sum(sat_color) / area
+
+    patches = []
+    for i, e in enumerate(objects):
+        if area[i] > 0:
+            patches.append({'x': e['x'], 'y': e['y'], 'w': e['w'], 'h': e['h'], 'c': e.get('c'),
+                            'psnr': float(psnr[i]), 'color_error': float(color_error[i])})
+
+    mse = sq.mean() / 3
+    return {'psnr': float(10 * np.log10(peak * peak / mse)) if mse > 0 else float('inf'),
+            'color_error': float(color.mean()),
+            'patches': patches}
+
+
+def demosaic_round_trip(image_name: str = None,
+                        json_name: str = None,
+                        bayer_type: str = 'RGGB',
+                        method: str = 'bilinear') -> dict:
+    """
+    Convert the chart to the mosaic, demosaic it by the reference method and score the result.
+
+    :param image_name: the chart image file name
+    :param json_name: the chart JSON file name
+    :param bayer_type: Bayer type of the mosaic
+    :param method: 'bilinear', 'malvar' or 'edge_aware'
+    :return: dictionary of demosaic_score
+    """
+    ref = _image_np(image_name)
+    raw = rgb_to_mosaic(img=ref, bayer_type=bayer_type)
+    rgb = demosaic(raw=raw, bayer_type=bayer_type, method=method)
+    return demosaic_score(img_reference=ref, img_test=rgb, json_name=json_name)
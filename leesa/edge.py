@@ -1,5 +1,121 @@
+import os
+import time
+import concurrent.futures
+from multiprocessing import shared_memory
 from leesa.image import *
-import math
+from leesa.color import image_rgb_to_lum_itu7096
+
+# the angle bins edges of gradient_angle_quantization8, searched with side='right'.
+# The bins 1 and 8 are closed at 23 and 338 degrees, so these edges are moved to the next float.
+_ANGLE_BIN_EDGES = np.array([np.nextafter(23, np.inf), 68, 113, 158, 203, 248, 293, np.nextafter(338, np.inf)])
+# direction for every bin, the last bin is (338, 360] and wraps to the direction 1
+_ANGLE_BIN_LUT = np.array([1, 2, 3, 4, 5, 6, 7, 8, 1], dtype=np.uint8)
+# the color for every direction, 0 - no gradient
+_ANGLE_PALETTE = np.array([[0, 0, 0],
+                           [255, 0, 0],
+                           [254, 179, 0],
+                           [50, 255, 0],
+                           [0, 254, 58],
+                           [0, 255, 251],
+                           [0, 22, 255],
+                           [0, 180, 255],
+                           [255, 0, 117]], dtype=np.uint8)
+
+
+def gradient_extract_np(lum: np.ndarray = None, dtype=np.float32) -> tuple:
+    """
+    Gradients extraction from a luminance array by the 2x2 difference kernel.
+    The last row and the last column have no right/bottom neighbours and stay zero.
+
+    :param lum: luminance as 2D array, for example from image_rgb_to_lum_itu7096
+    :param dtype: output data type
+    :return: tuple with X gradient and Y gradient as arrays
+    """
+    if lum is None:
+        raise ValueError("Image object must be non-empty.")
+    lum = np.asarray(lum, dtype=np.float64)
+    if lum.ndim != 2:
+        raise ValueError("Image object must be 2D luminance array.")
+
+    a = lum[:-1, :-1]
+    b = lum[:-1, 1:]
+    c = lum[1:, :-1]
+    d = lum[1:, 1:]
+    r_grad_x = np.zeros(lum.shape, dtype=dtype)
+    r_grad_y = np.zeros(lum.shape, dtype=dtype)
+    r_grad_x[:-1, :-1] = (b + d - a - c) / 2
+    r_grad_y[:-1, :-1] = (c + d - a - b) / 2
+
+    return r_grad_x, r_grad_y
+
+
+def gradient_amplitude_calc_np(r_grad_x: np.ndarray = None, r_grad_y: np.ndarray = None,
+                               dtype=np.float32) -> np.ndarray:
+    """
+    Calculate gradient amplitude by using X gradient and Y gradient arrays
+
+    :param r_grad_x: X gradient
+    :param r_grad_y: Y gradient
+    :param dtype: output data type
+    :return: gradient amplitude
+    """
+    if r_grad_x is None:
+        raise ValueError("X gradient must be non-empty.")
+    if r_grad_y is None:
+        raise ValueError("Y gradient must be non-empty.")
+
+    r_gx = np.asarray(r_grad_x, dtype=np.float64)
+    r_gy = np.asarray(r_grad_y, dtype=np.float64)
+    amp = np.sqrt(r_gx * r_gx + r_gy * r_gy)
+    return amp.astype(dtype, copy=False)
+
+
+def _gradient_angle(r_gx: np.ndarray, r_gy: np.ndarray, amp: np.ndarray) -> np.ndarray:
+    # the angle is defined only if both gradients are non-zero, as in gradient_angle_calc
+    valid = (r_gx != 0) & (r_gy != 0)
+    r_dab = np.divide(r_gx, amp, out=np.zeros_like(r_gx), where=valid)
+    r_angle = np.degrees(np.arccos(r_dab))
+    r_angle = np.where(r_gy < 0, 360 - r_angle, r_angle)
+    r_angle[~valid] = 0
+    return r_angle
+
+
+def gradient_angle_calc_np(r_grad_x: np.ndarray = None, r_grad_y: np.ndarray = None,
+                           dtype=np.float32) -> np.ndarray:
+    """
+    Calculate gradient angle in degrees [0, 360) by using X gradient and Y gradient arrays
+
+    :param r_grad_x: X gradient
+    :param r_grad_y: Y gradient
+    :param dtype: output data type
+    :return: gradient angle
+    """
+    if r_grad_x is None:
+        raise ValueError("X gradient must be non-empty.")
+    if r_grad_y is None:
+        raise ValueError("Y gradient must be non-empty.")
+
+    r_gx = np.asarray(r_grad_x, dtype=np.float64)
+    r_gy = np.asarray(r_grad_y, dtype=np.float64)
+    amp = np.sqrt(r_gx * r_gx + r_gy * r_gy)
+    return _gradient_angle(r_gx, r_gy, amp).astype(dtype, copy=False)
+
+
+def gradient_calc_np(lum: np.ndarray = None, dtype=np.float32) -> tuple:
+    """
+    Calculate X gradient, Y gradient, amplitude and angle of a luminance array in one pass.
+    All values are calculated in double precision and converted to dtype at the end.
+
+    :param lum: luminance as 2D array, for example from image_rgb_to_lum_itu7096
+    :param dtype: output data type
+    :return: tuple with X gradient, Y gradient, amplitude and angle
+    """
+    r_gx, r_gy = gradient_extract_np(lum, dtype=np.float64)
+    amp = np.sqrt(r_gx * r_gx + r_gy * r_gy)
+    r_angle = _gradient_angle(r_gx, r_gy, amp)
+
+    return (r_gx.astype(dtype, copy=False), r_gy.astype(dtype, copy=False),
+            amp.astype(dtype, copy=False), r_angle.astype(dtype, copy=False))
 
 
 def gradient_extract(img) -> tuple:
@@ -11,21 +127,9 @@ def gradient_extract(img) -> tuple:
 
     if img is None:
         raise ValueError("Image object must be non-empty.")
-    n_height = len(img)
-    n_width = len(img[0])
-    r_grad_x = [[0.0 for _ in range(n_width)] for _ in range(n_height)]
-    r_grad_y = [[0.0 for _ in range(n_width)] for _ in range(n_height)]
-
-    for _n_y in range(n_height - 1):
-        for _n_x in range(n_width - 1):
-            _r_a = img[_n_y][_n_x]
-            _r_b = img[_n_y][_n_x + 1]
-            _r_c = img[_n_y + 1][_n_x]
-            _r_d = img[_n_y + 1][_n_x + 1]
-            r_grad_x[_n_y][_n_x] = (_r_b + _r_d - _r_a - _r_c) / 2
-            r_grad_y[_n_y][_n_x] = (_r_c + _r_d - _r_a - _r_b) / 2
+    r_grad_x, r_grad_y = gradient_extract_np(img, dtype=np.float64)
 
-    return r_grad_x, r_grad_y
+    return r_grad_x.tolist(), r_grad_y.tolist()
 
 
 def gradient_amplitude_calc(r_grad_x: list = None, r_grad_y: list = None) -> list:
@@ -40,17 +144,7 @@ def gradient_amplitude_calc(r_grad_x: list = None, r_grad_y: list = None) -> lis
     if r_grad_y is None:
         raise ValueError("Y gradient must be non-empty.")
 
-    n_height = len(r_grad_x)
-    n_width = len(r_grad_x[0])
-    amp = [[0 for _ in range(n_width)] for _ in range(n_height)]
-
-    for n_y in range(n_height):
-        for n_x in range(n_width):
-            r_gx = r_grad_x[n_y][n_x]
-            r_gy = r_grad_y[n_y][n_x]
-            amp[n_y][n_x] = (math.sqrt((r_gx * r_gx) + (r_gy * r_gy)))
-
-    return amp
+    return gradient_amplitude_calc_np(r_grad_x, r_grad_y, dtype=np.float64).tolist()
 
 
 def gradient_angle_calc(r_grad_x: list = None, r_grad_y: list = None) -> list:
@@ -65,24 +159,7 @@ def gradient_angle_calc(r_grad_x: list = None, r_grad_y: list = None) -> list:
     if r_grad_y is None:
         raise ValueError("Y gradient must be non-empty.")
 
-    n_height = len(r_grad_x)
-    n_width = len(r_grad_x[0])
-    n_ang = [[0.0 for _ in range(n_width)] for _ in range(n_height)]
-
-    for n_y in range(n_height):
-        for n_x in range(n_width):
-            r_gx = r_grad_x[n_y][n_x]
-            r_gy = r_grad_y[n_y][n_x]
-
-            r_angle = 0
-            if r_gx != 0 and r_gy != 0:
-                r_dab = r_gx / math.sqrt(r_gx * r_gx + r_gy * r_gy)
-                r_angle = math.degrees(math.acos(r_dab))
-                if r_gy < 0:
-                    r_angle = 360 - r_angle
-            n_ang[n_y][n_x] = r_angle
-
-    return n_ang
+    return gradient_angle_calc_np(r_grad_x, r_grad_y, dtype=np.float64).tolist()
 
 
 def gradient_angle_quantization8(r_angle: float) -> int:
@@ -106,44 +183,610 @@ def gradient_angle_quantization8(r_angle: float) -> int:
     return n_angle_q
 
 
-def gradient_angle_quantization(r_angle: list = None, amp: list = None) -> np.ndarray:
+def gradient_angle_quantization_np(r_angle: np.ndarray = None, amp: np.ndarray = None) -> np.ndarray:
+    """
+    Quantize gradient angles to the 8 directions of gradient_angle_quantization8 by a single binning operation.
+
+    :param r_angle: gradient angle array in degrees
+    :param amp: gradient amplitude array, pixels with zero amplitude get the direction 0
+    :return: directions array with shape (height, width, 1)
+    """
     if r_angle is None:
         raise ValueError("Angle must be non-empty.")
+    if amp is None:
+        raise ValueError("Amplitude must be non-empty.")
+
+    r_angle = np.asarray(r_angle)
+    n_bin = np.searchsorted(_ANGLE_BIN_EDGES, r_angle, side='right')
+    n_aq = np.where(np.asarray(amp) > 0, _ANGLE_BIN_LUT[n_bin], 0).astype(np.uint8)
+
+    return n_aq.reshape(r_angle.shape[0], r_angle.shape[1], 1)
 
-    n_height = len(r_angle)
-    n_width = len(r_angle[0])
-    n_aq = np.zeros((n_height, n_width, 1), dtype=np.uint8)
-    for n_y in range(n_height):
-        for n_x in range(n_width):
-            if amp[n_y][n_x] > 0:
-                n_angle_q = gradient_angle_quantization8(r_angle[n_y][n_x])
-                n_aq[n_y][n_x] = n_angle_q
 
-    return n_aq
+def gradient_angle_quantization(r_angle: list = None, amp: list = None) -> np.ndarray:
+    if r_angle is None:
+        raise ValueError("Angle must be non-empty.")
+
+    return gradient_angle_quantization_np(r_angle=r_angle, amp=amp)
 
 
 def image_paint_by_angle(n_aq: np.ndarray) -> np.ndarray:
-    n_height, n_width, _ = n_aq.shape
-    n_img = np.zeros((n_height, n_width, 3), dtype=np.uint8)
-    for n_y in range(n_height):
-        for n_x in range(n_width):
-            n_angle = n_aq[n_y][n_x]
-            if n_angle == 0:
-                n_img[n_y][n_x] = [0, 0, 0]
-            elif n_angle == 1:
-                n_img[n_y][n_x] = [255, 0, 0]
-            elif n_angle == 2:
-                n_img[n_y][n_x] = [254, 179, 0]
-            elif n_angle == 3:
-                n_img[n_y][n_x] = [50, 255, 0]
-            elif n_angle == 4:
-                n_img[n_y][n_x] = [0, 254, 58]
-            elif n_angle == 5:
-                n_img[n_y][n_x] = [0, 255, 251]
-            elif n_angle == 6:
-                n_img[n_y][n_x] = [0, 22, 255]
-            elif n_angle == 7:
-                n_img[n_y][n_x] = [0, 180, 255]
-            elif n_angle == 8:
-                n_img[n_y][n_x] = [255, 0, 117]
-    return n_img
+    """
+    Paint the quantized directions by the palette lookup table
+
+    :param n_aq: directions array with shape (height, width, 1) or (height, width)
+    :return: RGB image
+    """
+    n_aq = np.asarray(n_aq)
+    if n_aq.ndim == 3:
+        n_aq = n_aq[:, :, 0]
+    return _ANGLE_PALETTE[n_aq]
+
+
+def edge_strip_calc(img: np.ndarray = None, y_start: int = 0, y_end: int = None, dtype=np.float32) -> tuple:
+    """
+    Calculate amplitude, angle and directions for the rows [y_start, y_end) of an image.
+    The strip is read with one row of halo below it, so the result is the same as for the full frame.
+
+    :param img: luminance as 2D array or RGB image as 3D array, numpy memory map is accepted
+    :param y_start: first row of the strip
+    :param y_end: row after the last row of the strip
+    :param dtype: data type of amplitude and angle
+    :return: tuple with amplitude, angle and directions of the strip
+    """
+    if img is None:
+        raise ValueError("Image object must be non-empty.")
+    n_height = img.shape[0]
+    if y_end is None or y_end > n_height:
+        y_end = n_height
+    if y_start < 0 or y_start >= y_end:
+        raise ValueError("The strip must be non-empty and inside the image.")
+
+    block = np.asarray(img[y_start:min(y_end + 1, n_height)])
+    if block.ndim == 3:
+        block = image_rgb_to_lum_itu7096(block[:, :, :3])
+    _, _, amp, r_angle = gradient_calc_np(block, dtype=dtype)
+    n_rows = y_end - y_start
+    amp = amp[:n_rows]
+    r_angle = r_angle[:n_rows]
+    n_aq = gradient_angle_quantization_np(r_angle, amp)
+
+    return amp, r_angle, n_aq
+
+
+def _npy_rows_map(file_name: str, y_start: int, y_end: int, mode: str = 'r') -> np.memmap:
+    # memory map only the rows [y_start, y_end) of a C-ordered .npy file
+    with open(file_name, 'rb') as fp:
+        version = np.lib.format.read_magic(fp)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+        offset = fp.tell()
+    if fortran_order:
+        raise ValueError("The .npy file must be in C order.")
+    row_size = int(np.prod(shape[1:], dtype=np.int64)) * dtype.itemsize
+    return np.memmap(file_name, dtype=dtype, mode=mode, offset=offset + y_start * row_size,
+                     shape=(y_end - y_start,) + tuple(shape[1:]))
+
+
+# the raw modes of the uncompressed image tiles read by rows: the channels order and the bytes per pixel
+_EDGE_TILE_RAWMODES = {
+    'L': ((0,), 1),
+    'RGB': ((0, 1, 2), 3),
+    'BGR': ((2, 1, 0), 3),
+    'RGBX': ((0, 1, 2), 4),
+    'BGRX': ((2, 1, 0), 4)
+}
+
+
+def _image_tiles(file_name: str) -> tuple:
+    # the image size and the uncompressed tiles as (y_start, y_end, offset, stride, orientation, channels, bytes),
+    # the tiles are None if the image is compressed or its raw mode is not supported
+    with PIL.Image.open(file_name) as pil:
+        n_width, n_height = pil.size
+        tiles = []
+        for t in pil.tile:
+            codec, box, offset, args = t[0], t[1], t[2], t[3]
+            if isinstance(args, str):
+                args = (args,)
+            if codec != 'raw' or args[0] not in _EDGE_TILE_RAWMODES or box[0] != 0 or box[2] != n_width:
+                return n_width, n_height, None
+            channels, n_bytes = _EDGE_TILE_RAWMODES[args[0]]
+            stride = args[1] if len(args) > 1 and args[1] else n_width * n_bytes
+            orientation = args[2] if len(args) > 2 else 1
+            tiles.append((box[1], box[3], offset, stride, orientation, channels, n_bytes))
+    tiles.sort()
+    # the tiles must cover all rows one time
+    if not tiles or [t[0] for t in tiles] != [0] + [t[1] for t in tiles[:-1]] or tiles[-1][1] != n_height:
+        return n_width, n_height, None
+    return n_width, n_height, tiles
+
+
+def _image_rows_read(file_name: str, n_width: int, tiles: list, y_start: int, y_end: int) -> np.ndarray:
+    # read the rows of the uncompressed image through the memory map of its tiles
+    rows = []
+    for t_start, t_end, offset, stride, orientation, channels, n_bytes in tiles:
+        a, b = max(y_start, t_start), min(y_end, t_end)
+        if a >= b:
+            continue
+        # the bottom-up tile is stored from its last row
+        r_start, r_end = (a - t_start, b - t_start) if orientation > 0 else (t_end - b, t_end - a)
+        m = np.memmap(file_name, dtype=np.uint8, mode='r', offset=offset + r_start * stride,
+                      shape=(r_end - r_start, stride))
+        data = m[:, :n_width * n_bytes].reshape(r_end - r_start, n_width, n_bytes)[:, :, list(channels)]
+        rows.append(data if orientation > 0 else data[::-1])
+        del m
+    strip = np.concatenate(rows, axis=0)
+    return strip[:, :, 0] if strip.shape[2] == 1 else strip
+
+
+def edge_analysis_tiled(img=None,
+                        dir_out: str = None,
+                        strip_height: int = 256,
+                        name: str = 'edge') -> dict:
+    """
+    Edge analysis of a large frame by row strips. The amplitude, angle and directions are written
+    to memory-mapped .npy files. Every strip is mapped and released separately, so only one strip
+    of the input, the output and the temporary data is in the memory.
+    The .npy files and the uncompressed images (BMP, PPM/PGM, uncompressed TIFF) are read by strips,
+    the compressed images (PNG, JPEG) can not be decoded by rows and are decoded whole,
+    save them to .npy for the bounded memory.
+
+    :param img: luminance as 2D array, RGB image as 3D array, .npy file name or image file name
+    :param dir_out: the directory to save the .npy files
+    :param strip_height: the number of rows in one strip
+    :param name: the prefix for the output file names
+    :return: dictionary with amplitude, angle and direction file names
+    """
+    if img is None:
+        raise ValueError("Image object must be non-empty.")
+    if dir_out is None:
+        raise ValueError("The output directory must be non-empty.")
+    if strip_height is None or strip_height < 1:
+        raise ValueError("The strip height must be non-empty or > 0.")
+
+    img_npy = None
+    img_tiles = None
+    if isinstance(img, str):
+        if os.path.splitext(img)[1].lower() == '.npy':
+            img_npy = img
+            n_height, n_width = np.load(img_npy, mmap_mode='r').shape[:2]
+        else:
+            n_width, n_height, img_tiles = _image_tiles(img)
+            if img_tiles is None:
+                img = np.asarray(PIL.Image.open(img))
+            else:
+                img_npy = img
+    else:
+        n_height, n_width = img.shape[0], img.shape[1]
+
+    os.makedirs(dir_out, exist_ok=True)
+    results = {'amplitude': os.path.join(dir_out, name + '_amplitude.npy'),
+               'angle': os.path.join(dir_out, name + '_angle.npy'),
+               'direction': os.path.join(dir_out, name + '_direction.npy')}
+    outputs = [(results['amplitude'], np.float32, (n_height, n_width)),
+               (results['angle'], np.float32, (n_height, n_width)),
+               (results['direction'], np.uint8, (n_height, n_width, 1))]
+    # allocate the output files
+    for file_name, dtype, shape in outputs:
+        m = np.lib.format.open_memmap(file_name, mode='w+', dtype=dtype, shape=shape)
+        del m
+
+    for y in range(0, n_height, strip_height):
+        y_end = min(y + strip_height, n_height)
+        if img_npy is not None:
+            # the strip with one row of halo
+            if img_tiles is None:
+                strip = _npy_rows_map(img_npy, y, min(y_end + 1, n_height))
+            else:
+                strip = _image_rows_read(img_npy, n_width, img_tiles, y, min(y_end + 1, n_height))
+            r = edge_strip_calc(strip, 0, y_end - y)
+            del strip
+        else:
+            r = edge_strip_calc(img, y, y_end)
+        for (file_name, _, _), data in zip(outputs, r):
+            m = _npy_rows_map(file_name, y, y_end, mode='r+')
+            m[:] = data
+            m.flush()
+            del m
+
+    return results
+
+
+# the arrays attached to the shared memory in the worker process of edge_analysis_parallel
+_EDGE_SHARED = dict()
+
+
+def _shared_array(shm: shared_memory.SharedMemory, shape: tuple, dtype) -> np.ndarray:
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _edge_worker_init(arrays: list) -> None:
+    # attach the input and output shared memory blocks once per worker process
+    for key, shm_name, shape, dtype in arrays:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _EDGE_SHARED[key] = (shm, _shared_array(shm, shape, dtype))
+
+
+def _edge_worker_tile(y_start: int, y_end: int) -> tuple:
+    img = _EDGE_SHARED['img'][1]
+    amp, r_angle, n_aq = edge_strip_calc(img, y_start, y_end)
+    _EDGE_SHARED['amplitude'][1][y_start:y_end] = amp
+    _EDGE_SHARED['angle'][1][y_start:y_end] = r_angle
+    _EDGE_SHARED['direction'][1][y_start:y_end] = n_aq
+    return y_start, y_end
+
+
+def edge_analysis_parallel(img: np.ndarray = None,
+                           workers: int = None,
+                           tile_height: int = 256) -> tuple:
+    """
+    Edge analysis of a frame on a process pool. The frame is split into row tiles with one row of halo,
+    the input and output arrays are shared with the workers through shared memory, and every tile
+    writes only its own rows, so the result does not depend on the order of tiles completion.
+
+    :param img: luminance as 2D array or RGB image as 3D array
+    :param workers: the number of worker processes, None - the number of CPUs, 1 - run in this process
+    :param tile_height: the number of rows in one tile
+    :return: tuple with amplitude, angle and directions
+    """
+    if img is None:
+        raise ValueError("Image object must be non-empty.")
+    if workers is not None and workers < 1:
+        raise ValueError("The number of workers must be > 0.")
+    if tile_height is None or tile_height < 1:
+        raise ValueError("The tile height must be non-empty or > 0.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    img = np.asarray(img)
+    n_height, n_width = img.shape[0], img.shape[1]
+    tiles = [(y, min(y + tile_height, n_height)) for y in range(0, n_height, tile_height)]
+
+    if workers == 1 or len(tiles) == 1:
+        r = [edge_strip_calc(img, y_start, y_end) for y_start, y_end in tiles]
+        return tuple(np.concatenate(e, axis=0) for e in zip(*r))
+
+    layout = [('img', img.shape, img.dtype),
+              ('amplitude', (n_height, n_width), np.dtype(np.float32)),
+              ('angle', (n_height, n_width), np.dtype(np.float32)),
+              ('direction', (n_height, n_width, 1), np.dtype(np.uint8))]
+    blocks = dict()
+    try:
+        for key, shape, dtype in layout:
+            size = max(int(np.prod(shape, dtype=np.int64)) * dtype.itemsize, 1)
+            blocks[key] = shared_memory.SharedMemory(create=True, size=size)
+        _shared_array(blocks['img'], img.shape, img.dtype)[:] = img
+
+        arrays = [(key, blocks[key].name, shape, dtype) for key, shape, dtype in layout]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_edge_worker_init,
+                                                    initargs=(arrays,)) as executor:
+            futures = [executor.submit(_edge_worker_tile, y_start, y_end) for y_start, y_end in tiles]
+            for f in futures:
+                f.result()
+
+        results = tuple(_shared_array(blocks[key], shape, dtype).copy() for key, shape, dtype in layout[1:])
+    finally:
+        for shm in blocks.values():
+            shm.close()
+            shm.unlink()
+
+    return results
+
+
+# the smoothing part of the separable 3x3 gradient operators, the derivative part is [-1, 0, 1]
+_GRADIENT_OPERATORS = {
+    'sobel': (1, 2, 1),
+    'scharr': (3, 10, 3)
+}
+
+# the neighbour (dy, dx) along the gradient for every quantized direction, the opposite neighbour is (-dy, -dx)
+_DIRECTION_NEIGHBOURS = {
+    1: (0, 1),
+    2: (1, 1),
+    3: (1, 0),
+    4: (1, -1),
+    5: (0, -1),
+    6: (-1, -1),
+    7: (-1, 0),
+    8: (-1, 1)
+}
+
+
+def _correlate_1d(lum: np.ndarray, kernel: tuple, axis: int) -> np.ndarray:
+    # correlation with the edge replication, kernel size is odd
+    n_r = len(kernel) // 2
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (n_r, n_r)
+    p = np.pad(lum, pad, mode='edge')
+    n = lum.shape[axis]
+    r = np.zeros(lum.shape, dtype=np.float64)
+    for i, k in enumerate(kernel):
+        if k != 0:
+            r += k * (p[i:i + n, :] if axis == 0 else p[:, i:i + n])
+    return r
+
+
+def gradient_operator_np(lum: np.ndarray = None, operator: str = 'sobel', dtype=np.float32) -> tuple:
+    """
+    Reference 3x3 gradients by Sobel or Scharr operator, the borders are replicated.
+
+    :param lum: luminance as 2D array
+    :param operator: 'sobel' or 'scharr'
+    :param dtype: output data type
+    :return: tuple with X gradient and Y gradient
+    """
+    if lum is None:
+        raise ValueError("Image object must be non-empty.")
+    if operator not in _GRADIENT_OPERATORS:
+        raise ValueError("The gradient operator is not exist.")
+    lum = np.asarray(lum, dtype=np.float64)
+
+    s = _GRADIENT_OPERATORS[operator]
+    r_grad_x = _correlate_1d(_correlate_1d(lum, (-1, 0, 1), axis=1), s, axis=0)
+    r_grad_y = _correlate_1d(_correlate_1d(lum, (-1, 0, 1), axis=0), s, axis=1)
+    return r_grad_x.astype(dtype, copy=False), r_grad_y.astype(dtype, copy=False)
+
+
+def gaussian_blur_np(lum: np.ndarray = None, sigma: float = 1.4) -> np.ndarray:
+    """
+    Separable Gaussian blur, the kernel radius is 3 sigma, the borders are replicated.
+
+    :param lum: luminance as 2D array
+    :param sigma: standard deviation in pixels, 0 - no blur
+    :return: blurred luminance
+    """
+    if lum is None:
+        raise ValueError("Image object must be non-empty.")
+    lum = np.asarray(lum, dtype=np.float64)
+    if sigma is None or sigma <= 0:
+        return lum
+
+    n_r = max(int(np.ceil(3 * sigma)), 1)
+    x = np.arange(-n_r, n_r + 1)
+    kernel = np.exp(-(x * x) / (2 * sigma * sigma))
+    kernel = tuple(kernel / kernel.sum())
+    return _correlate_1d(_correlate_1d(lum, kernel, axis=0), kernel, axis=1)
+
+
+def _shift(img: np.ndarray, dy: int, dx: int, fill=0) -> np.ndarray:
+    # r[y, x] = img[y + dy, x + dx], outside pixels are fill
+    n_height, n_width = img.shape
+    p = np.pad(img, 1, mode='constant', constant_values=fill)
+    return p[1 + dy:1 + dy + n_height, 1 + dx:1 + dx + n_width]
+
+
+def non_maximum_suppression_np(amp: np.ndarray = None, n_aq: np.ndarray = None) -> np.ndarray:
+    """
+    Non-maximum suppression along the quantized gradient directions.
+
+    :param amp: gradient amplitude
+    :param n_aq: directions from gradient_angle_quantization_np, shape (height, width, 1) or (height, width)
+    :return: amplitude with zeros for the pixels which are not the local maximum across the edge
+    """
+    if amp is None:
+        raise ValueError("Amplitude must be non-empty.")
+    if n_aq is None:
+        raise ValueError("Directions must be non-empty.")
+    amp = np.asarray(amp)
+    n_aq = np.asarray(n_aq)
+    if n_aq.ndim == 3:
+        n_aq = n_aq[:, :, 0]
+
+    keep = np.zeros(amp.shape, dtype=bool)
+    # the directions n and n + 4 have the same axis
+    for n in range(1, 5):
+        dy, dx = _DIRECTION_NEIGHBOURS[n]
+        axis = (n_aq == n) | (n_aq == n + 4)
+        keep |= axis & (amp >= _shift(amp, dy, dx)) & (amp >= _shift(amp, -dy, -dx))
+    keep &= amp > 0
+    return np.where(keep, amp, 0).astype(amp.dtype, copy=False)
+
+
+def connected_components_np(mask: np.ndarray = None) -> tuple:
+    """
+    Label 8-connected components of a mask. The union-find forest is built for all neighbour pairs at once:
+    the larger root of every pair is hooked to the smaller root, then the paths are compressed by pointer jumping,
+    until all pairs have the same root.
+
+    :param mask: 2D boolean array
+    :return: tuple with labels array (0 - background, 1..n - components) and the number of components
+    """
+    if mask is None:
+        raise ValueError("Mask must be non-empty.")
+    mask = np.asarray(mask, dtype=bool)
+    n_labels = np.zeros(mask.shape, dtype=np.int32)
+    n_pixels = int(mask.sum())
+    if n_pixels == 0:
+        return n_labels, 0
+
+    # the position of every mask pixel in the forest
+    rank = np.full(mask.shape, -1, dtype=np.int64)
+    rank[mask] = np.arange(n_pixels)
+    # the neighbour pairs for right, down, down-right and down-left directions
+    pairs_a = []
+    pairs_b = []
+    for a, b in [(rank[:, :-1], rank[:, 1:]), (rank[:-1, :], rank[1:, :]),
+                 (rank[:-1, :-1], rank[1:, 1:]), (rank[:-1, 1:], rank[1:, :-1])]:
+        both = (a >= 0) & (b >= 0)
+        pairs_a.append(a[both])
+        pairs_b.append(b[both])
+    pairs_a = np.concatenate(pairs_a)
+    pairs_b = np.concatenate(pairs_b)
+
+    parent = np.arange(n_pixels)
+    while True:
+        root_a = parent[pairs_a]
+        root_b = parent[pairs_b]
+        diff = root_a != root_b
+        if not diff.any():
+            break
+        # drop the pairs already in one tree
+        pairs_a = pairs_a[diff]
+        pairs_b = pairs_b[diff]
+        root_a = root_a[diff]
+        root_b = root_b[diff]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+    roots, inverse = np.unique(parent, return_inverse=True)
+    n_labels[mask] = inverse.reshape(-1) + 1
+    return n_labels, len(roots)
+
+
+def hysteresis_np(amp: np.ndarray = None, low_threshold: float = 50, high_threshold: float = 100) -> np.ndarray:
+    """
+    Hysteresis thresholding: keep the components of pixels above the low threshold
+    which contain at least one pixel above the high threshold.
+
+    :param amp: gradient amplitude after non-maximum suppression
+    :param low_threshold: low threshold
+    :param high_threshold: high threshold
+    :return: edges as 2D boolean array
+    """
+    if amp is None:
+        raise ValueError("Amplitude must be non-empty.")
+    if low_threshold > high_threshold:
+        raise ValueError("The low threshold must be <= high threshold.")
+    amp = np.asarray(amp)
+
+    n_labels, _ = connected_components_np(amp >= low_threshold)
+    strong = np.unique(n_labels[(amp >= high_threshold) & (n_labels > 0)])
+    return np.isin(n_labels, strong)
+
+
+def canny_np(lum: np.ndarray = None,
+             low_threshold: float = 50,
+             high_threshold: float = 100,
+             sigma: float = 1.4,
+             operator: str = 'sobel') -> dict:
+    """
+    Reference Canny edge detector. Every stage is timed.
+    The directions are quantized by gradient_angle_quantization_np from the full atan2 angle,
+    because the angle of gradient_angle_calc_np is zero if one of the gradients is zero.
+
+    :param lum: luminance as 2D array, for example from image_rgb_to_lum_itu7096
+    :param low_threshold: low hysteresis threshold for the gradient amplitude
+    :param high_threshold: high hysteresis threshold for the gradient amplitude
+    :param sigma: Gaussian blur standard deviation, 0 - no blur
+    :param operator: 'sobel' or 'scharr'
+    :return: dictionary with edges, amplitude, directions and stages time in seconds
+    """
+    if lum is None:
+        raise ValueError("Image object must be non-empty.")
+    timings = dict()
+
+    t = time.perf_counter()
+    blur = gaussian_blur_np(lum, sigma=sigma)
+    timings['blur'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    r_gx, r_gy = gradient_operator_np(blur, operator=operator, dtype=np.float64)
+    amp = np.sqrt(r_gx * r_gx + r_gy * r_gy)
+    timings['gradient'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    r_angle = np.degrees(np.arctan2(r_gy, r_gx)) % 360
+    n_aq = gradient_angle_quantization_np(r_angle, amp)
+    timings['quantization'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    nms = non_maximum_suppression_np(amp, n_aq)
+    timings['nms'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    edges = hysteresis_np(nms, low_threshold=low_threshold, high_threshold=high_threshold)
+    timings['hysteresis'] = time.perf_counter() - t
+    timings['total'] = sum(timings.values())
+
+    return {'edges': edges, 'amplitude': amp, 'direction': n_aq, 'timings': timings}
+
+
+def edge_compare(edges_reference: np.ndarray = None, edges_test: np.ndarray = None, tolerance: int = 1) -> dict:
+    """
+    Compare edges with the reference edges. An edge pixel is matched if there is an edge pixel
+    of the other map within tolerance pixels (Chebyshev distance).
+
+    :param edges_reference: reference edges as 2D boolean array
+    :param edges_test: tested edges as 2D boolean array
+    :param tolerance: the matching distance in pixels
+    :return: dictionary with precision, recall and F1 score
+    """
+    if edges_reference is None or edges_test is None:
+        raise ValueError("Edges must be non-empty.")
+    if tolerance is None or tolerance < 0:
+        raise ValueError("The tolerance must be non-empty or >= 0.")
+    e_ref = np.asarray(edges_reference, dtype=bool)
+    e_test = np.asarray(edges_test, dtype=bool)
+    if e_ref.shape != e_test.shape:
+        raise ValueError("Edges must have the same shape.")
+
+    def dilate(e):
+        n_height, n_width = e.shape
+        p = np.pad(e, tolerance)
+        r = np.zeros(e.shape, dtype=bool)
+        for dy in range(2 * tolerance + 1):
+            for dx in range(2 * tolerance + 1):
+                r |= p[dy:dy + n_height, dx:dx + n_width]
+        return r
+
+    n_test = int(e_test.sum())
+    n_ref = int(e_ref.sum())
+    precision = float((e_test & dilate(e_ref)).sum()) / n_test if n_test > 0 else 0.0
+    recall = float((e_ref & dilate(e_test)).sum()) / n_ref if n_ref > 0 else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+    return {'precision': precision, 'recall': recall, 'f1': f1}
+
+
+def edge_benchmark(img: np.ndarray = None,
+                   repeat: int = 3,
+                   low_threshold: float = 50,
+                   high_threshold: float = 100) -> dict:
+    """
+    Measure the speed of the edge detectors on one image. The best time of the repeats is reported.
+
+    :param img: RGB image as 3D array, luminance as 2D array or image file name,
+                for example the output of Chart.edge_test
+    :param repeat: the number of repeats
+    :param low_threshold: low hysteresis threshold for Canny
+    :param high_threshold: high hysteresis threshold for Canny
+    :return: dictionary with the time in seconds and megapixels per second for every detector and Canny stage
+    """
+    if img is None:
+        raise ValueError("Image object must be non-empty.")
+    if repeat is None or repeat < 1:
+        raise ValueError("The repeat must be non-empty or > 0.")
+    if isinstance(img, str):
+        img = np.asarray(PIL.Image.open(img).convert('RGB'))
+    img = np.asarray(img)
+    lum = image_rgb_to_lum_itu7096(img[:, :, :3]) if img.ndim == 3 else np.asarray(img, dtype=np.float64)
+    megapixels = lum.size / 1e6
+
+    def best(func):
+        r = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            func()
+            r.append(time.perf_counter() - t)
+        return min(r)
+
+    def gradient_2x2():
+        _, _, amp, r_angle = gradient_calc_np(lum)
+        gradient_angle_quantization_np(r_angle, amp)
+
+    results = {'megapixels': megapixels,
+               'gradient_2x2': best(gradient_2x2),
+               'sobel': best(lambda: gradient_operator_np(lum, operator='sobel')),
+               'scharr': best(lambda: gradient_operator_np(lum, operator='scharr'))}
+    canny = [canny_np(lum, low_threshold=low_threshold, high_threshold=high_threshold)['timings']
+             for _ in range(repeat)]
+    results['canny'] = {k: min(t[k] for t in canny) for k in canny[0]}
+    results['mpix_per_second'] = {k: megapixels / results[k] if results[k] > 0 else 0.0
+                                  for k in ['gradient_2x2', 'sobel', 'scharr']}
+    results['mpix_per_second']['canny'] = megapixels / results['canny']['total']
+    return results
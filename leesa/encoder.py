@@ -0,0 +1,226 @@
+"""Contains the streaming image encoders: PNG and uncompressed TIFF written by horizontal strips.
+"""
+import os
+import abc
+import struct
+import zlib
+import numpy as np
+
+# supported channels and bit depths
+_ENCODER_CHANNELS = {1, 3}
+_ENCODER_BIT_DEPTH = {8, 16}
+
+
+class _StripWriter(abc.ABC):
+    """
+    Base class of the strip writers, the rows are written from top to bottom.
+    """
+
+    def __init__(self, file_name: str = None, width: int = 0, height: int = 0, channels: int = 3, bit_depth: int = 8):
+        if file_name is None:
+            raise ValueError("The file name must be non-empty.")
+        if width <= 0 or height <= 0:
+            raise ValueError("The image width and height must be > 0.")
+        if channels not in _ENCODER_CHANNELS:
+            raise ValueError("The number of channels must be 1 or 3.")
+        if bit_depth not in _ENCODER_BIT_DEPTH:
+            raise ValueError("The bit depth must be 8 or 16.")
+        self.file_name = file_name
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.bit_depth = bit_depth
+        self.rows = 0  # the number of written rows
+        if os.path.dirname(file_name):
+            os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        self.fp = open(file_name, 'wb')
+
+    def _strip_check(self, strip: np.ndarray) -> np.ndarray:
+        strip = np.asarray(strip)
+        if strip.ndim == 2:
+            strip = strip[:, :, None]
+        if strip.shape[1] != self.width or strip.shape[2] != self.channels:
+            raise ValueError("The strip shape does not match the image.")
+        if self.rows + strip.shape[0] > self.height:
+            raise ValueError("The strip is out of the image.")
+        self.rows += strip.shape[0]
+        return strip
+
+    @abc.abstractmethod
+    def write(self, strip: np.ndarray) -> None:
+        pass
+
+    def close(self) -> None:
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # the exception of the body is not replaced by the rows check of close
+        if exc_type is not None:
+            self.fp.close()
+            return False
+        self.close()
+
+
+class PngStripWriter(_StripWriter):
+    """
+    PNG encoder, the strips are filtered and compressed as they come, the memory does not depend on the image height.
+    The rows are filtered by 'Up' filter, the equal rows of the charts are compressed to almost nothing.
+
+    with PngStripWriter('img/out/chart.png', width=640, height=360) as w:
+        for y in range(0, 360, 64):
+            w.write(strip)
+
+    """
+
+    def __init__(self, file_name: str = None, width: int = 0, height: int = 0, channels: int = 3, bit_depth: int = 8,
+                 compress_level: int = 6, significant_bits: int = None):
+        """
+
+        :param file_name: the PNG file name
+        :param width: image width
+        :param height: image height
+        :param channels: 1 - grayscale, 3 - RGB
+        :param bit_depth: 8 or 16
+        :param compress_level: zlib compression level from 0 to 9
+        :param significant_bits: the original bits of the samples scaled to the bit depth for sBIT chunk,
+                                 None - all bits are significant
+        """
+        super().__init__(file_name, width, height, channels, bit_depth)
+        if significant_bits is not None and not 0 < significant_bits <= bit_depth:
+            self.fp.close()
+            raise ValueError("The significant bits must be > 0 and <= bit depth.")
+        self.compressor = zlib.compressobj(compress_level)
+        self.previous = np.zeros(width * channels * bit_depth // 8, dtype=np.uint8)
+        self.fp.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, bit_depth, 2 if channels == 3 else 0, 0, 0, 0))
+        if significant_bits is not None and significant_bits != bit_depth:
+            self._chunk(b'sBIT', bytes([significant_bits] * channels))
+
+    def _chunk(self, chunk_type: bytes, data: bytes) -> None:
+        self.fp.write(struct.pack('>I', len(data)))
+        self.fp.write(chunk_type)
+        self.fp.write(data)
+        self.fp.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type))))
+
+    def write(self, strip: np.ndarray) -> None:
+        """
+        Write the next rows.
+
+        :param strip: array with shape (rows, width, channels) or (rows, width), uint8 or uint16
+        :return: None
+        """
+        strip = self._strip_check(strip)
+        if strip.shape[0] == 0:
+            return
+        dtype = np.dtype('>u2') if self.bit_depth == 16 else np.dtype(np.uint8)
+        rows = np.ascontiguousarray(strip, dtype=dtype).view(np.uint8).reshape(strip.shape[0], -1)
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 2  # 'Up' filter
+        np.subtract(rows[0], self.previous, out=filtered[0, 1:])
+        np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+        self.previous = rows[-1].copy()
+        data = self.compressor.compress(filtered)
+        if data:
+            self._chunk(b'IDAT', data)
+
+    def close(self) -> None:
+        if self.rows != self.height:
+            self.fp.close()
+            raise ValueError("Not all image rows are written.")
+        self._chunk(b'IDAT', self.compressor.flush())
+        self._chunk(b'IEND', b'')
+        self.fp.close()
+
+
+class TiffStripWriter(_StripWriter):
+    """
+    Uncompressed baseline TIFF encoder, the image data is written as it comes.
+    """
+
+    def __init__(self, file_name: str = None, width: int = 0, height: int = 0, channels: int = 3, bit_depth: int = 8,
+                 rows_per_strip: int = 256):
+        """
+
+        :param file_name: the TIFF file name
+        :param width: image width
+        :param height: image height
+        :param channels: 1 - grayscale, 3 - RGB
+        :param bit_depth: 8 or 16
+        :param rows_per_strip: the number of rows in one TIFF strip
+        """
+        row_size = width * channels * bit_depth // 8
+        if row_size * height >= 2 ** 32:
+            raise ValueError("The image is too large for TIFF.")
+        super().__init__(file_name, width, height, channels, bit_depth)
+        n_strips = -(-height // rows_per_strip)
+        # the values above 4 bytes are placed after the IFD
+        n_entries = 10
+        values_offset = 8 + 2 + n_entries * 12 + 4
+        bits_offset = values_offset
+        offsets_offset = bits_offset + 2 * channels
+        counts_offset = offsets_offset + 4 * n_strips
+        data_offset = counts_offset + 4 * n_strips
+        strip_offsets = [data_offset + i * rows_per_strip * row_size for i in range(n_strips)]
+        strip_counts = [min(rows_per_strip, height - i * rows_per_strip) * row_size for i in range(n_strips)]
+
+        def entry(tag, value_type, count, value):
+            # SHORT values are left-justified in the 4 bytes value field
+            if value_type == 3 and count == 1:
+                return struct.pack('<HHIHH', tag, value_type, count, value, 0)
+            return struct.pack('<HHII', tag, value_type, count, value)
+
+        ifd = [entry(256, 4, 1, width),
+               entry(257, 4, 1, height),
+               entry(258, 3, channels, bits_offset) if channels > 2 else entry(258, 3, 1, bit_depth),
+               entry(259, 3, 1, 1),
+               entry(262, 3, 1, 2 if channels == 3 else 1),
+               entry(273, 4, n_strips, offsets_offset) if n_strips > 1 else entry(273, 4, 1, strip_offsets[0]),
+               entry(277, 3, 1, channels),
+               entry(278, 4, 1, rows_per_strip),
+               entry(279, 4, n_strips, counts_offset) if n_strips > 1 else entry(279, 4, 1, strip_counts[0]),
+               entry(284, 3, 1, 1)]
+        self.fp.write(b'II*\x00' + struct.pack('<I', 8))
+        self.fp.write(struct.pack('<H', n_entries) + b''.join(ifd) + struct.pack('<I', 0))
+        self.fp.write(struct.pack('<%dH' % channels, *([bit_depth] * channels)))
+        self.fp.write(struct.pack('<%dI' % n_strips, *strip_offsets))
+        self.fp.write(struct.pack('<%dI' % n_strips, *strip_counts))
+
+    def write(self, strip: np.ndarray) -> None:
+        """
+        Write the next rows.
+
+        :param strip: array with shape (rows, width, channels) or (rows, width), uint8 or uint16
+        :return: None
+        """
+        strip = self._strip_check(strip)
+        dtype = np.dtype('<u2') if self.bit_depth == 16 else np.dtype(np.uint8)
+        self.fp.write(np.ascontiguousarray(strip, dtype=dtype).tobytes())
+
+    def close(self) -> None:
+        self.fp.close()
+        if self.rows != self.height:
+            raise ValueError("Not all image rows are written.")
+
+
+def strip_writer(file_name: str = None, width: int = 0, height: int = 0, channels: int = 3, bit_depth: int = 8,
+                 significant_bits: int = None):
+    """
+    The strip writer for the file extension.
+
+    :param file_name: the image file name with .png, .tif or .tiff extension
+    :param width: image width
+    :param height: image height
+    :param channels: 1 - grayscale, 3 - RGB
+    :param bit_depth: 8 or 16
+    :param significant_bits: the original bits of the samples for PNG sBIT chunk, None - all bits are significant
+    :return: PngStripWriter or TiffStripWriter object
+    """
+    ext = os.path.splitext(file_name)[1].lower() if file_name is not None else ''
+    if ext == '.png':
+        return PngStripWriter(file_name, width, height, channels, bit_depth, significant_bits=significant_bits)
+    elif ext in ('.tif', '.tiff'):
+        return TiffStripWriter(file_name, width, height, channels, bit_depth)
+    raise ValueError("The strip writer supports PNG and TIFF files only.")
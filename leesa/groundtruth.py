@@ -0,0 +1,167 @@
+"""Contains the chart ground truth writers and loaders: the streaming JSON and the columnar NPZ formats.
+"""
+import os
+import json
+import numpy as np
+
+# ground truth file formats and extensions
+_GT_FORMAT = {
+    'json': '.json',
+    'npz': '.npz'
+}
+# the columns of the ground truth objects
+_GT_COLUMNS = ['x', 'y', 'w', 'h', 'c']
+# the number of objects formatted at once by the JSON writer
+_GT_JSON_CHUNK = 16384
+# one object as json.dump with indent=2 writes it
+_GT_JSON_OBJECT = ('    {\n      "x": %d,\n      "y": %d,\n      "w": %d,\n      "h": %d,\n'
+                   '      "c": [\n        %d,\n        %d,\n        %d\n      ]\n    }')
+
+
+def gt_columns(x=None, y=None, w=None, h=None, c=None) -> dict:
+    """
+    The ground truth objects as columns.
+
+    :param x: the objects X coordinates as array
+    :param y: the objects Y coordinates, array or scalar for all objects
+    :param w: the objects widths, array or scalar for all objects
+    :param h: the objects heights, array or scalar for all objects
+    :param c: the objects RGB colors with shape (objects, 3)
+    :return: dictionary of the int64 arrays 'x', 'y', 'w', 'h' and the (objects, 3) array 'c'
+    """
+    n = len(x)
+    return {'x': np.asarray(x, dtype=np.int64).reshape(n),
+            'y': np.broadcast_to(np.asarray(y, dtype=np.int64), (n,)),
+            'w': np.broadcast_to(np.asarray(w, dtype=np.int64), (n,)),
+            'h': np.broadcast_to(np.asarray(h, dtype=np.int64), (n,)),
+            'c': np.asarray(c, dtype=np.int64).reshape(n, 3)}
+
+
+def gt_concatenate(columns: list = None) -> dict:
+    """
+    Join the ground truth columns.
+
+    :param columns: list of dictionaries from gt_columns
+    :return: dictionary of the joined columns
+    """
+    return {k: np.concatenate([e[k] for e in columns]) for k in _GT_COLUMNS}
+
+
+def gt_objects(columns: dict = None) -> list:
+    """
+    The ground truth columns as list of object dictionaries.
+
+    :param columns: dictionary from gt_columns
+    :return: list of dictionaries with 'x', 'y', 'w', 'h' and 'c' keys
+    """
+    return [{'x': x, 'y': y, 'w': w, 'h': h, 'c': c}
+            for x, y, w, h, c in zip(*[columns[k].tolist() for k in _GT_COLUMNS])]
+
+
+def gt_file_name(file_name: str = None, gt_format: str = 'json') -> str:
+    """
+    The ground truth file name with the extension of the format.
+
+    :param file_name: the ground truth file name
+    :param gt_format: 'json' or 'npz'
+    :return: the file name, 'json' format keeps the name as is
+    """
+    if gt_format not in _GT_FORMAT:
+        raise ValueError("The ground truth format is not exist.")
+    if file_name is None or gt_format == 'json':
+        return file_name
+    return os.path.splitext(file_name)[0] + _GT_FORMAT[gt_format]
+
+
+def gt_json_write(file_name: str = None, header: dict = None, columns: dict = None) -> None:
+    """
+    Write the ground truth to JSON by chunks of objects, the file is the same as json.dump with indent=2
+    of the header with 'objects' list.
+
+    :param file_name: the JSON file name
+    :param header: dictionary of the header values
+    :param columns: dictionary from gt_columns
+    :return: None
+    """
+    if os.path.dirname(file_name):
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    n = len(columns['x'])
+    table = np.column_stack([columns[k] for k in _GT_COLUMNS[:4]] + [columns['c']]).tolist() if n else []
+    with open(file_name, 'w') as fp:
+        fp.write('{\n')
+        for k, v in header.items():
+            fp.write('  ' + json.dumps(k) + ': ' + json.dumps(v, indent=2).replace('\n', '\n  ') + ',\n')
+        if n == 0:
+            fp.write('  "objects": []\n}')
+            return
+        fp.write('  "objects": [\n')
+        for i in range(0, n, _GT_JSON_CHUNK):
+            if i > 0:
+                fp.write(',\n')
+            fp.write(',\n'.join([_GT_JSON_OBJECT % tuple(e) for e in table[i:i + _GT_JSON_CHUNK]]))
+        fp.write('\n  ]\n}')
+
+
+def gt_npz_write(file_name: str = None, header: dict = None, columns: dict = None) -> None:
+    """
+    Write the ground truth to the columnar NPZ file: the x, y, w, h, c arrays and the JSON header.
+
+    :param file_name: the NPZ file name
+    :param header: dictionary of the header values
+    :param columns: dictionary from gt_columns
+    :return: None
+    """
+    if os.path.dirname(file_name):
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    # the smallest type for every column keeps the file compact
+    arrays = dict()
+    for k in _GT_COLUMNS:
+        a = columns[k]
+        for dtype in ([np.uint8, np.uint16] if k == 'c' else [np.int32]) + [np.int64]:
+            if a.size == 0 or (a.min() >= np.iinfo(dtype).min and a.max() <= np.iinfo(dtype).max):
+                break
+        arrays[k] = np.ascontiguousarray(a, dtype=dtype)
+    with open(file_name, 'wb') as fp:
+        np.savez(fp, header=np.array(json.dumps(header)), **arrays)
+
+
+def gt_save(file_name: str = None, header: dict = None, columns: dict = None, gt_format: str = 'json') -> str:
+    """
+    Save the ground truth in the format.
+
+    :param file_name: the ground truth file name, the extension is replaced by the format extension
+    :param header: dictionary of the header values
+    :param columns: dictionary from gt_columns
+    :param gt_format: 'json' - JSON with the list of objects, 'npz' - columnar NPZ
+    :return: the saved file name
+    """
+    file_name = gt_file_name(file_name, gt_format)
+    if gt_format == 'npz':
+        gt_npz_write(file_name, header, columns)
+    else:
+        gt_json_write(file_name, header, columns)
+    return file_name
+
+
+def gt_load(file_name: str = None) -> tuple:
+    """
+    Load the ground truth of JSON or NPZ file.
+
+    :param file_name: the ground truth file name
+    :return: tuple of the header dictionary and the columns dictionary
+    """
+    if file_name is None:
+        raise ValueError("The ground truth file must be non-empty.")
+    if os.path.splitext(file_name)[1].lower() == _GT_FORMAT['npz']:
+        with np.load(file_name, allow_pickle=False) as dt:
+            header = json.loads(str(dt['header']))
+            columns = {k: dt[k].astype(np.int64) for k in _GT_COLUMNS}
+        return header, columns
+    with open(file_name, 'r') as fp:
+        header = json.load(fp)
+    objects = header.pop('objects')
+    if len(objects) == 0:
+        return header, gt_columns([], [], [], [], np.zeros((0, 3)))
+    columns = gt_columns(x=[e['x'] for e in objects], y=[e['y'] for e in objects], w=[e['w'] for e in objects],
+                         h=[e['h'] for e in objects], c=[e['c'] for e in objects])
+    return header, columns
@@ -4,6 +4,9 @@ import PIL.ImageFont
 import json
 import datetime
 import itertools
+import weakref
+import collections
+import concurrent.futures
 from leesa.image import *
 from leesa.tools import *
 from leesa.camera import *
@@ -11,6 +14,158 @@ from datetime import datetime
 import random
 from leesa.human import *
 
+
+def _position_occupancy(obj_map: list, n_x: int, n_y: int, step: int, box_w: int, box_h: int) -> np.ndarray:
+    # occupancy of the positions grid with the step: the position is occupied if the box of box_w x box_h pixels
+    # at it overlaps the box of any placed object from the corner a to the corner d, both ends are included,
+    # so every placed object occupies one rectangle of the grid
+    occupied = np.zeros((n_y, n_x), dtype=bool)
+    for r in obj_map:
+        x0 = max(-((box_w - 1 - r['a']['x']) // step), 0)
+        y0 = max(-((box_h - 1 - r['a']['y']) // step), 0)
+        x1 = min(r['d']['x'] // step, n_x - 1)
+        y1 = min(r['d']['y'] // step, n_y - 1)
+        if x0 <= x1 and y0 <= y1:
+            occupied[y0:y1 + 1, x0:x1 + 1] = True
+    return occupied
+
+
+# the placement of the scales in all_scales_one_image
+_ODCHART_PACKING = {'grid', 'skyline'}
+
+
+def _skyline_pack(boxes: list, width: int, height: int) -> list:
+    # pack the boxes (w, h) to the frame by the skyline bottom-left rule from the largest box:
+    # the skyline is the list of segments [x, y, w] of the lowest free row over the columns, every box is placed
+    # where its bottom is the highest, then where its left side is the leftmost,
+    # the result is the list of the positions (x, y) or None if the box does not fit
+    skyline = [[0, 0, width]]
+    positions = [None] * len(boxes)
+    order = sorted(range(len(boxes)), key=lambda i: (-boxes[i][0] * boxes[i][1], -boxes[i][1], i))
+    for i in order:
+        w, h = boxes[i]
+        if w <= 0 or h <= 0 or w > width or h > height:
+            continue
+        best = None
+        for k in range(len(skyline)):
+            x = skyline[k][0]
+            if x + w > width:
+                break
+            # the top of the box is the lowest free row of the segments under it
+            y = 0
+            covered = 0
+            j = k
+            while covered < w:
+                y = max(y, skyline[j][1])
+                covered += skyline[j][2] - (x - skyline[j][0] if j == k else 0)
+                j += 1
+            if y + h <= height and (best is None or (y + h, x) < (best[1] + h, best[0])):
+                best = (x, y)
+        if best is None:
+            continue
+        x, y = best
+        positions[i] = best
+        # replace the segments under the box by the box top, the rest of the last segment is kept
+        updated = []
+        for sx, sy, sw in skyline:
+            if sx + sw <= x or sx >= x + w:
+                updated.append([sx, sy, sw])
+                continue
+            if sx < x:
+                updated.append([sx, sy, x - sx])
+            if sx + sw > x + w:
+                updated.append([x + w, sy, sx + sw - x - w])
+        updated.append([x, y + h, w])
+        updated.sort()
+        # join the neighbour segments of the same height
+        skyline = [updated[0]]
+        for e in updated[1:]:
+            if e[1] == skyline[-1][1]:
+                skyline[-1][2] += e[2]
+            else:
+                skyline.append(e)
+    return positions
+
+
+# the image modes of the crop pyramids, the other modes are resized from the crop
+_ODCHART_PYRAMID_MODES = {'L', 'LA', 'RGB', 'RGBA'}
+
+
+class _ScalePyramid:
+    """
+    The crop of the object from the source image and its copies reduced by the box filter, the level k is
+    2^k times smaller than the crop. The levels are created when the smaller sizes are requested.
+    """
+
+    def __init__(self, img, box: tuple):
+        self.source = weakref.ref(img)
+        self.levels = [img.crop(box)]
+        self.size = self._image_bytes(self.levels[0])
+
+    @staticmethod
+    def _image_bytes(img) -> int:
+        return img.width * img.height * len(img.getbands())
+
+    def resize(self, w: int, h: int):
+        """
+        Resize the smallest level that is not smaller than the requested size.
+
+        :param w: the requested width
+        :param h: the requested height
+        :return: PIL image
+        """
+        crop = self.levels[0]
+        k = 0
+        if crop.mode in _ODCHART_PYRAMID_MODES:
+            while crop.width >= 2 ** (k + 1) * max(w, 1) and crop.height >= 2 ** (k + 1) * max(h, 1):
+                k += 1
+        if k == 0:
+            return crop.resize((w, h))
+        while len(self.levels) <= k:
+            # every level is reduced from the crop, the halved levels would shift the odd sizes
+            self.levels.append(crop.reduce(2 ** len(self.levels)))
+            self.size += self._image_bytes(self.levels[-1])
+        # the last row and column of the level are partial, the box keeps the crop geometry
+        return self.levels[k].resize((w, h), box=(0, 0, crop.width / 2 ** k, crop.height / 2 ** k))
+
+
+def _od_name_reserve(name: str) -> str:
+    # reserve the output name by the exclusive creation of its JSON file, the concurrent jobs and processes
+    # with the same name get the suffix _1, _2, ...
+    os.makedirs(os.path.dirname(name) or '.', exist_ok=True)
+    n = 0
+    while True:
+        s = name if n == 0 else name + '_' + str(n)
+        try:
+            os.close(os.open(s + '.json', os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return s
+        except FileExistsError:
+            n += 1
+
+
+# the chart and the last decoded image of the worker process, the jobs come in the images order,
+# so every image is decoded once per worker
+_OD_WORKER = {'params': None, 'chart': None, 'image_name': None, 'img': None}
+
+
+def _od_worker_job(params: dict, image_name: str, method: str, kwargs: dict) -> dict:
+    # one job of object_to_images or object_to_one_image in the worker process
+    w = _OD_WORKER
+    if w['params'] != params:
+        od = ODChart(frame_type=params['frame_type'], color_background=params['color_background'],
+                     scale_cache_size=params['scale_cache_size'])
+        od.scale_size = params['scale_size']
+        od.scales = params['scales']
+        w['params'] = params
+        w['chart'] = od
+    if w['image_name'] != image_name:
+        w['img'] = None
+        w['img'] = PIL.Image.open(image_name)
+        w['img'].load()
+        w['image_name'] = image_name
+    return getattr(w['chart'], method)(img=w['img'], **kwargs)
+
+
 class ODChart:
     """
     Object Detection chart creation. Image, and JSON files in the output.
@@ -18,11 +173,13 @@ class ODChart:
 
     """
 
-    def __init__(self, frame_type: str = 'QQVGA', color_background: tuple = (0, 0, 0)):
+    def __init__(self, frame_type: str = 'QQVGA', color_background: tuple = (0, 0, 0),
+                 scale_cache_size: int = 2 ** 28):
         """
 
         :param frame_type: key value taken from the _FRAME_SIZE dictionary
         :param color_background: color for image background fill, color as RGB list
+        :param scale_cache_size: the memory limit of the object crop pyramids in bytes, 0 - no cache
         """
         fr = FrameResolution()
         _FRAME_SIZE = fr.get_dict()
@@ -36,6 +193,8 @@ class ODChart:
             raise ValueError("The color background must be non-empty.")
         if len(color_background) != 3:
             raise ValueError("The color background must be 3 elements tuple.")
+        if scale_cache_size is None or scale_cache_size < 0:
+            raise ValueError("The scale cache size must be non-empty or >= 0.")
         # allocate output image
         self.frame = _FRAME_SIZE[frame_type]
         self.color_background = color_background
@@ -43,6 +202,9 @@ class ODChart:
         self.scales_fixed = [35, 34, 33, 32, 31, 30, 29, 28, 27, 26, 25, 24, 23, 22, 21, 20, 19,
                              18, 17, 16, 15, 14, 13, 12, 11, 10, 9, 8, 7, 6, 5, 4, 3]
         self.scale_size = 4  # the size of scale unit in the pixels
+        # the crop pyramids of the objects in the least recently used order
+        self.scale_cache_size = scale_cache_size
+        self.scale_cache = collections.OrderedDict()
 
     def scale_mode_to_string(self, mode):
         r = ''
@@ -84,44 +246,69 @@ class ODChart:
         return inside
 
     def search_free_position(self, obj_map, scale, size, offset, img_w, img_h, font_v, font_h):
-        # x_step = scale
-        # y_step = scale
-        x_step = scale
-        y_step = scale
-        free_pos = False
-        ret_x = 0
-        ret_y = 0
-
-        x_start, y_start = 0, 0
-
+        """
+        Find the first free position of the object with the label on the grid of scale pixels, the rows are
+        searched from the top and the positions in the row from the left. Every placed object occupies
+        the rectangle of the grid positions whose box overlaps it, so the occupancy of all positions is marked
+        by one array slice per object, all overlaps are found and the first free position is one array search.
+
+        :param obj_map: list of the placed objects, the found object is appended
+        :param scale: the grid step in pixels
+        :param size: dictionary with the object width 'w' and height 'h'
+        :param offset: the offset saved to the object record
+        :param img_w: image width
+        :param img_h: image height
+        :param font_v: the label width
+        :param font_h: the label height
+        :return: tuple of True and the position or False, 0, 0 if there is no free position
+        """
         x_end = img_w - size['w'] - 1 - font_v
         y_end = img_h - size['h'] - 1 - font_h
-
-        y = y_start
-        while y < y_end:
-            x = x_start
-            while x < x_end:
-                a = {'x': x, 'y': y}
-                b = {'x': x + size['w'], 'y': y}
-                c = {'x': x, 'y': y + size['h'] + font_h}
-                d = {'x': x + size['w'] + font_v, 'y': y + size['h'] + font_h}
-                obj_rec = {'a': a, 'b': b, 'c': c, 'd': d, 'scale': scale, 'offset': offset}
-
-                inside = 0
-                for i in range(0, len(obj_map)):
-                    inside = inside + self.rect_rect_intersection_test(obj_map[i], obj_rec)
-                if inside == 0:
-                    if d['x'] < img_w:
-                        if d['y'] < img_h:
-                            obj_map.append(obj_rec)
-                            free_pos = True
-                            ret_x = x
-                            ret_y = y
-                            x = img_w + 1
-                            y = img_h + 1
-                x = x + x_step
-            y = y + y_step
-        return free_pos, ret_x, ret_y
+        if x_end <= 0 or y_end <= 0:
+            return False, 0, 0
+        n_x = -(-x_end // scale)
+        n_y = -(-y_end // scale)
+        # the box of the object with the label, both ends are included
+        occupied = _position_occupancy(obj_map, n_x, n_y, scale, size['w'] + font_v + 1, size['h'] + font_h + 1)
+        free = np.flatnonzero(~occupied)
+        if free.size == 0:
+            return False, 0, 0
+        x = int(free[0] % n_x) * scale
+        y = int(free[0] // n_x) * scale
+        a = {'x': x, 'y': y}
+        b = {'x': x + size['w'], 'y': y}
+        c = {'x': x, 'y': y + size['h'] + font_h}
+        d = {'x': x + size['w'] + font_v, 'y': y + size['h'] + font_h}
+        obj_map.append({'a': a, 'b': b, 'c': c, 'd': d, 'scale': scale, 'offset': offset})
+        return True, x, y
+
+    def scale_resize(self, img_detect, rect, w, h):
+        """
+        Crop the object and resize it to the requested size. The object is cropped once and the smaller sizes
+        are resized from the nearest larger level of its pyramid, the pyramids above the cache size are evicted
+        in the least recently used order.
+
+        :param img_detect: the source image
+        :param rect: the object rectangle
+        :param w: the requested width
+        :param h: the requested height
+        :return: PIL image
+        """
+        box = (rect['x'], rect['y'], rect['x'] + rect['w'], rect['y'] + rect['h'])
+        if self.scale_cache_size == 0:
+            return img_detect.crop(box).resize((w, h))
+        key = (id(img_detect),) + box
+        pyramid = self.scale_cache.get(key)
+        # the id of the released image can be reused by the new one
+        if pyramid is None or pyramid.source() is not img_detect:
+            pyramid = _ScalePyramid(img_detect, box)
+            self.scale_cache[key] = pyramid
+        self.scale_cache.move_to_end(key)
+        img = pyramid.resize(w, h)
+        size = sum(p.size for p in self.scale_cache.values())
+        while size > self.scale_cache_size and len(self.scale_cache) > 0:
+            size -= self.scale_cache.popitem(last=False)[1].size
+        return img
 
     def scale(self, img_detect, scale, rect, scale_mode: int = 0):
         h = 10
@@ -149,8 +336,7 @@ class ODChart:
         w = int(w)
         h = int(h)
 
-        img = img_detect.crop((rect['x'], rect['y'], rect['x'] + rect['w'], rect['y'] + rect['h']))
-        img = img.resize((w, h))
+        img = self.scale_resize(img_detect, rect, w, h)
         # print(scale)
         # return [0, 0, w, h], img
         return {'x': 0, 'y': 0, 'w': w, 'h': h, 'face_w': face_w_new, 'eyes_d': eyes_d_new}, img
@@ -180,34 +366,80 @@ class ODChart:
                              detect_position,
                              rect,
                              dir_out: str = None,
-                             scale_mode: int = 0) -> dict:
+                             scale_mode: int = 0,
+                             packing: str = 'grid') -> dict:
+        """
+        Place the object at all scales with the labels to one image and save image and JSON files.
+
+        :param img: the source image
+        :param img_name: the source image file name
+        :param detect_name: the object type
+        :param detect_position: the object index in the source JSON
+        :param rect: the object rectangle
+        :param dir_out: the directory to save result - image and JSON
+        :param scale_mode: 0 - scale by detect width, 1 - scale by face width, 2 = scale by distance between eyes
+        :param packing: 'grid' - the first free position on the grid of scale pixels in the scales order,
+                        'skyline' - the skyline packing from the largest object, dense for hundreds of scales
+        :return: dictionary with image and JSON file names and the list of the scales that do not fit
+        """
+        if packing not in _ODCHART_PACKING:
+            raise ValueError("The packing must be 'grid' or 'skyline'.")
         img_chart = PIL.Image.new(mode='RGB', size=(self.frame['w'], self.frame['h']), color=self.color_background)
         results = dict()
         stats = []
+        not_fit = []
         # Create empty map
         obj_map = []
         # allocate the font
         font = PIL.ImageFont.truetype("arial.ttf", 12)
 
-        # cycle over scales
+        def place(x, y, rect_scaled, img_scaled, scale):
+            img_chart.paste(img_scaled, (x, y))
+            e = {'x': x, 'y': y, 'w': rect_scaled['w'], 'h': rect_scaled['h'], 'scale': scale}
+            if scale_mode == 1:
+                e['face_w'] = rect_scaled['face_w']
+            elif scale_mode == 2:
+                e['eyes_d'] = rect_scaled['eyes_d']
+            stats.append(e)
+
+        # the label sizes
+        labels = []
         for i in range(0, len(self.scales)):
             # scale string for print
-            sequence = 'S=' + str(self.scales[i])
-            sequence_width = font.getmask(sequence).getbbox()[2]
-            sequence_height = font.getmask(sequence).getbbox()[3]
-            # scale image
-            rect_scaled, img_scaled = self.scale(img_detect=img, scale=self.scales[i], rect=rect, scale_mode=scale_mode)
-            scale_c_h = {'w': rect_scaled['w'], 'h': rect_scaled['h']}
-            free_pos, x, y = self.search_free_position(obj_map, self.scales[i], scale_c_h, 0, self.frame['w'],
-                                                       self.frame['h'], sequence_width, sequence_height)
-            if free_pos is True:
-                img_chart.paste(img_scaled, (x, y))
-                e = {'x': x, 'y': y, 'w': rect_scaled['w'], 'h': rect_scaled['h'], 'scale': self.scales[i]}
-                if scale_mode == 1:
-                    e['face_w'] = rect_scaled['face_w']
-                elif scale_mode == 2:
-                    e['eyes_d'] = rect_scaled['eyes_d']
-                stats.append(e)
+            bbox = font.getmask('S=' + str(self.scales[i])).getbbox()
+            labels.append((bbox[2], bbox[3]))
+
+        if packing == 'grid':
+            # cycle over scales
+            for i in range(0, len(self.scales)):
+                # scale image
+                rect_scaled, img_scaled = self.scale(img_detect=img, scale=self.scales[i], rect=rect,
+                                                     scale_mode=scale_mode)
+                scale_c_h = {'w': rect_scaled['w'], 'h': rect_scaled['h']}
+                free_pos, x, y = self.search_free_position(obj_map, self.scales[i], scale_c_h, 0, self.frame['w'],
+                                                           self.frame['h'], labels[i][0], labels[i][1])
+                if free_pos is True:
+                    place(x, y, rect_scaled, img_scaled, self.scales[i])
+                else:
+                    not_fit.append(self.scales[i])
+        else:
+            scaled = [self.scale(img_detect=img, scale=s, rect=rect, scale_mode=scale_mode) for s in self.scales]
+            # the box of the object with the label below it
+            boxes = [(r['w'] + labels[i][0] + 1, r['h'] + labels[i][1] + 1) for i, (r, _) in enumerate(scaled)]
+            positions = _skyline_pack(boxes, self.frame['w'], self.frame['h'])
+            for i in range(0, len(self.scales)):
+                rect_scaled, img_scaled = scaled[i]
+                if positions[i] is None:
+                    not_fit.append(self.scales[i])
+                    continue
+                x, y = positions[i]
+                w_label, h_label = labels[i]
+                obj_map.append({'a': {'x': x, 'y': y},
+                                'b': {'x': x + rect_scaled['w'], 'y': y},
+                                'c': {'x': x, 'y': y + rect_scaled['h'] + h_label},
+                                'd': {'x': x + rect_scaled['w'] + w_label, 'y': y + rect_scaled['h'] + h_label},
+                                'scale': self.scales[i], 'offset': 0})
+                place(x, y, rect_scaled, img_scaled, self.scales[i])
 
         date_obj = datetime.now()
         timestamp = date_obj.strftime("%d-%b-%Y(%H-%M-%S-%f)")
@@ -221,17 +453,17 @@ class ODChart:
         s_d_pos = str(detect_position)
         name = dir_out + '/' + '{0}_scales-{1}_detect-{2}-{3}_{4}'.format(s_img_ne[0], s_s_used, detect_name, s_d_pos,
                                                                           timestamp)
+        name = _od_name_reserve(name)
         img_name = name + '.png'
-        os.makedirs(os.path.dirname(img_name), exist_ok=True)
         img_save(img=img_chart, image_name=img_name)
         json_name = name + '.json'
         dt_json = {'exporter': 'Leesa Exporter v0.1.6', 'time': timestamp, 'type': 'object detection',
                    'scale_size': self.scale_size, 'detect_type': detect_name, 'scale_mode': scale_mode,
-                   'objects': stats}
+                   'packing': packing, 'not_fit': not_fit, 'objects': stats}
         with open(json_name, 'w') as outfile:
             json.dump(dt_json, outfile, indent=2)
 
-        results = {'image': img_name, 'json': json_name}
+        results = {'image': img_name, 'json': json_name, 'not_fit': not_fit}
         return results
 
     def object_to_one_image(self,
@@ -241,6 +473,8 @@ class ODChart:
                             scales: list = None,
                             scale_size: int = 4,
                             scale_mode: int = 0,
+                            packing: str = 'grid',
+                            workers: int = 1
                             ) -> list:
         """
         Create object detection chart and save image and JSON files.
@@ -251,7 +485,12 @@ class ODChart:
         :param scales: list of the scales
         :param scale_size: size of the 1 scale unit in pixels
         :param scale_mode: 0 - scale by detect width, 1 - scale by face width, 2 = scale by distance between eyes
-        :return: list of images and jsons
+        :param packing: 'grid' - the first free position on the grid of scale pixels in the scales order,
+                        'skyline' - the skyline packing from the largest object, dense for hundreds of scales
+        :param workers: the number of worker processes for the (image, object) jobs, None - the number of CPUs,
+                        1 - run in this process
+        :return: list of images and jsons in the order of the images and objects, the scales that do not fit
+                 to the image are listed in 'not_fit'
         """
         # an object dictionaries for comparison
         sm_0 = {"obj": "face", "x": 672, "y": 42, "w": 970, "h": 1134}
@@ -266,6 +505,10 @@ class ODChart:
             raise ValueError("The scale_size be non-empty or > 0.")
         else:
             self.scale_size = scale_size
+        if packing not in _ODCHART_PACKING:
+            raise ValueError("The packing must be 'grid' or 'skyline'.")
+        if workers is not None and workers < 1:
+            raise ValueError("The number of workers must be > 0.")
         # select the proper scales
         if scales is None or len(scales) == 0:
             self.scales = self.scales_fixed
@@ -275,11 +518,10 @@ class ODChart:
         result, pairs = get_image_json_pair_dir(directory_img=dir_img, pattern_img=['*.png', '*.jpg'],
                                                 directory_json=dir_json, pattern_json=['*.json'])
 
-        results = []
+        jobs = []
 
         if result is True:
             for e in pairs:
-                img = PIL.Image.open(e[0])
                 fp = open(e[1], 'r')
                 img_json = json.load(fp)
                 fp.close()
@@ -293,15 +535,12 @@ class ODChart:
                     elif scale_mode == 2 and dictionary_compare_keys(etalon=sm_2, d=d) is False:
                         print("Some keys in object is absent. Please verify format. Must be a {0}".format(sm_2.keys()))
                     else:
-                        r = self.all_scales_one_image(img=img,
-                                                      img_name=e[0],
-                                                      detect_name=d['obj'],
-                                                      detect_position=i,
-                                                      rect=d,
-                                                      dir_out=dir_out,
-                                                      scale_mode=scale_mode)
-                        results.append(r)
+                        jobs.append((e[0], 'all_scales_one_image',
+                                     {'img_name': e[0], 'detect_name': d['obj'], 'detect_position': i, 'rect': d,
+                                      'dir_out': dir_out, 'scale_mode': scale_mode, 'packing': packing}))
                     i += 1
+
+        results = self.jobs_run(jobs=jobs, workers=workers)
         print(results)
         return results
 
@@ -333,19 +572,30 @@ class ODChart:
         :return: dictionary with image and json files
         """
         img_chart = PIL.Image.new(mode='RGB', size=(self.frame['w'], self.frame['h']), color=self.color_background)
-        stats = []
-
-        w_lim = (self.frame['w'] - gap_x) // (rect['w'] + gap_x)
-        w_lim = w_lim * (rect['w'] + gap_x)
-
-        h_lim = (self.frame['h'] - gap_y) // (rect['h'] + gap_y)
-        h_lim = h_lim * (rect['h'] + gap_y)
-
-        for y in range(gap_y, h_lim, rect['h'] + gap_y):
-            for x in range(gap_x, w_lim, rect['w'] + gap_x):
-                e = {'x': x, 'y': y, 'w': rect['w'], 'h': rect['h'], 'scale': scale}
-                stats.append(e)
-                img_chart.paste(img, (x, y))
+        # the period of the grid cells
+        p_x = rect['w'] + gap_x
+        p_y = rect['h'] + gap_y
+
+        w_lim = (self.frame['w'] - gap_x) // p_x
+        w_lim = w_lim * p_x
+
+        h_lim = (self.frame['h'] - gap_y) // p_y
+        h_lim = h_lim * p_y
+
+        xs = np.arange(gap_x, w_lim, p_x)
+        ys = np.arange(gap_y, h_lim, p_y)
+        stats = [{'x': x, 'y': y, 'w': rect['w'], 'h': rect['h'], 'scale': scale}
+                 for y in ys.tolist() for x in xs.tolist()]
+
+        if xs.size > 0 and ys.size > 0:
+            # one cell with the gaps on the right and bottom, the row of cells is tiled and the rows are repeated
+            cell = PIL.Image.new(mode='RGB', size=(p_x, p_y), color=self.color_background)
+            cell.paste(img, (0, 0))
+            row = np.tile(np.asarray(cell), (1, xs.size, 1))
+            canvas = np.array(img_chart)
+            grid = canvas[gap_y:gap_y + ys.size * p_y, gap_x:gap_x + xs.size * p_x]
+            grid.reshape(ys.size, p_y, xs.size * p_x, 3)[:] = row
+            img_chart = PIL.Image.fromarray(canvas)
 
         date_obj = datetime.now()
         timestamp = date_obj.strftime("%d-%b-%Y(%H-%M-%S-%f)")
@@ -360,8 +610,8 @@ class ODChart:
         s_d_pos = str(detect_position)
         name = dir_out + '/' + '{0}_scale-{1}_detect-{2}-{3}_{4}'.format(s_img_ne[0], s_s_used, detect_name, s_d_pos,
                                                                          timestamp)
+        name = _od_name_reserve(name)
         img_name = name + '.png'
-        os.makedirs(os.path.dirname(img_name), exist_ok=True)
         img_save(img=img_chart, image_name=img_name)
         json_name = name + '.json'
         dt_json = {'exporter': 'Leesa Exporter v0.1.8', 'time': timestamp, 'type': 'object detection',
@@ -381,6 +631,7 @@ class ODChart:
                          scale_size: int = 4,
                          gap_x: int = 5,
                          gap_y: int = 5,
+                         workers: int = 1
                          ) -> list:
         """
         Create object detection chart and save image and JSON files.
@@ -392,7 +643,9 @@ class ODChart:
         :param scale_size: size of the 1 scale unit in pixels
         :param gap_x: gap between 2 objects on X axis
         :param gap_y: gap between 2 objects on Y axis
-        :return: list of images and jsons
+        :param workers: the number of worker processes for the (image, object, scale) jobs, None - the number of CPUs,
+                        1 - run in this process
+        :return: list of images and jsons in the order of the images, objects and scales
         """
 
         if gap_x is None or gap_x < 0:
@@ -407,6 +660,8 @@ class ODChart:
             raise ValueError("The scale_size be non-empty or > 0.")
         else:
             self.scale_size = scale_size
+        if workers is not None and workers < 1:
+            raise ValueError("The number of workers must be > 0.")
         # select the proper scales
         if scales is None or len(scales) == 0:
             self.scales = self.scales_fixed
@@ -415,11 +670,10 @@ class ODChart:
         # get the pairs of image and JSON
         result, pairs = get_image_json_pair_dir(directory_img=dir_img, pattern_img=['*.png', '*.jpg'],
                                                 directory_json=dir_json, pattern_json=['*.json'])
-        results = []
+        jobs = []
 
         if result is True:
             for e in pairs:
-                img = PIL.Image.open(e[0])
                 fp = open(e[1], 'r')
                 img_json = json.load(fp)
                 fp.close()
@@ -428,26 +682,69 @@ class ODChart:
                 for d in img_json:
                     # cycle over scales
                     for j in range(0, len(self.scales)):
-                        # scale image
-                        rect_scaled, img_scaled = self.scale(img_detect=img, scale=self.scales[j], rect=d,
-                                                             scale_mode=0)
-
-                        r = self.process_frame(
-                            img=img_scaled,
-                            scale=self.scales[j],
-                            img_name=e[0],
-                            detect_name=d['obj'],
-                            detect_position=i,
-                            dir_out=dir_out,
-                            rect=rect_scaled,
-                            gap_x=gap_x,
-                            gap_y=gap_y,
-                            scale_mode=0)
-
-                        results.append(r)
+                        jobs.append((e[0], 'scale_frame',
+                                     {'img_name': e[0], 'rect': d, 'detect_position': i, 'scale': self.scales[j],
+                                      'dir_out': dir_out, 'gap_x': gap_x, 'gap_y': gap_y}))
                     i += 1
 
-        return results
+        return self.jobs_run(jobs=jobs, workers=workers)
+
+    def scale_frame(self, img, img_name, rect, detect_position, scale, dir_out, gap_x, gap_y) -> dict:
+        """
+        Scale the object and create the single image with it, one job of object_to_images.
+
+        :param img: pillow image
+        :param img_name: the file name of the pillow image
+        :param rect: the dictionary with object description
+        :param detect_position: the position counter
+        :param scale: the scale
+        :param dir_out: the directory to save image and json files
+        :param gap_x: gap between 2 objects on X axis
+        :param gap_y: gap between 2 objects on Y axis
+        :return: dictionary with image and json files
+        """
+        # scale image
+        rect_scaled, img_scaled = self.scale(img_detect=img, scale=scale, rect=rect, scale_mode=0)
+
+        return self.process_frame(
+            img=img_scaled,
+            scale=scale,
+            img_name=img_name,
+            detect_name=rect['obj'],
+            detect_position=detect_position,
+            dir_out=dir_out,
+            rect=rect_scaled,
+            gap_x=gap_x,
+            gap_y=gap_y,
+            scale_mode=0)
+
+    def jobs_run(self, jobs: list = None, workers: int = 1) -> list:
+        """
+        Run the jobs (image name, method name, parameters) in this process or on a process pool. The jobs must
+        come in the images order, every image is decoded once per process.
+
+        :param jobs: list of the jobs, the method gets the decoded image as 'img' parameter
+        :param workers: the number of worker processes, None - the number of CPUs, 1 - run in this process
+        :return: list of the method results in the jobs order
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers == 1 or len(jobs) < 2:
+            results = []
+            img_name = None
+            img = None
+            for image_name, method, kwargs in jobs:
+                if image_name != img_name:
+                    img = PIL.Image.open(image_name)
+                    img_name = image_name
+                results.append(getattr(self, method)(img=img, **kwargs))
+            return results
+
+        params = {'frame_type': self.frame_type, 'color_background': self.color_background,
+                  'scale_cache_size': self.scale_cache_size, 'scale_size': self.scale_size, 'scales': self.scales}
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            futures = [executor.submit(_od_worker_job, params, *job) for job in jobs]
+            return [f.result() for f in futures]
 
     def object_to_crowd3d(self,
                           dir_img: str = None,
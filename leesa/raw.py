@@ -0,0 +1,196 @@
+"""Contains the packed raw image writers and readers: RAW8, MIPI RAW10, MIPI RAW12 and little-endian RAW16.
+"""
+import os
+import json
+import numpy as np
+
+# packing: the number of pixels in one group and the number of bytes for this group
+_RAW_FORMATS = {
+    'RAW8': {'bits': 8, 'pixels': 1, 'bytes': 1},
+    'RAW10': {'bits': 10, 'pixels': 4, 'bytes': 5},
+    'RAW12': {'bits': 12, 'pixels': 2, 'bytes': 3},
+    'RAW16': {'bits': 16, 'pixels': 1, 'bytes': 2},
+}
+
+
+def raw_format_bits(raw_format: str = 'RAW10') -> int:
+    """
+    The number of bits per pixel of the raw format.
+
+    :param raw_format: key of the _RAW_FORMATS
+    :return: bits per pixel
+    """
+    if raw_format not in _RAW_FORMATS:
+        raise ValueError("The raw format is not exist.")
+    return _RAW_FORMATS[raw_format]['bits']
+
+
+def raw_line_stride(width: int, raw_format: str = 'RAW10') -> int:
+    """
+    The size of one packed line in bytes, the line is padded with zero pixels to the whole pixel group.
+
+    :param width: the line width in pixels
+    :param raw_format: key of the _RAW_FORMATS
+    :return: line size in bytes
+    """
+    f = _RAW_FORMATS[raw_format]
+    return -(-width // f['pixels']) * f['bytes']
+
+
+def raw_pack(raw: np.ndarray = None, raw_format: str = 'RAW10') -> np.ndarray:
+    """
+    Pack the raw rows to bytes.
+
+    :param raw: raw pixels with shape (height, width)
+    :param raw_format: key of the _RAW_FORMATS
+    :return: packed lines as uint8 array with shape (height, stride)
+    """
+    if raw is None:
+        raise ValueError("Raw image must be non-empty.")
+    if raw_format not in _RAW_FORMATS:
+        raise ValueError("The raw format is not exist.")
+    f = _RAW_FORMATS[raw_format]
+    n_height, n_width = raw.shape
+    n_pad = -n_width % f['pixels']
+    p = raw
+    if n_pad > 0:
+        p = np.pad(raw, ((0, 0), (0, n_pad)))
+    p = p.reshape(n_height, -1, f['pixels']).astype(np.uint16, copy=False)
+    out = np.empty((n_height, p.shape[1], f['bytes']), dtype=np.uint8)
+
+    if raw_format == 'RAW8':
+        out[:, :, 0] = p[:, :, 0]
+    elif raw_format == 'RAW16':
+        out[:, :, 0] = p[:, :, 0] & 0xFF
+        out[:, :, 1] = p[:, :, 0] >> 8
+    elif raw_format == 'RAW10':
+        out[:, :, :4] = p >> 2
+        out[:, :, 4] = (p[:, :, 0] & 3) | ((p[:, :, 1] & 3) << 2) | ((p[:, :, 2] & 3) << 4) | ((p[:, :, 3] & 3) << 6)
+    elif raw_format == 'RAW12':
+        out[:, :, :2] = p >> 4
+        out[:, :, 2] = (p[:, :, 0] & 0xF) | ((p[:, :, 1] & 0xF) << 4)
+
+    return out.reshape(n_height, -1)
+
+
+def raw_unpack(data: np.ndarray = None, width: int = None, raw_format: str = 'RAW10') -> np.ndarray:
+    """
+    Unpack the packed lines to raw pixels.
+
+    :param data: packed lines as uint8 array with shape (height, stride)
+    :param width: the line width in pixels
+    :param raw_format: key of the _RAW_FORMATS
+    :return: raw pixels with shape (height, width), uint8 for RAW8 and uint16 for other formats
+    """
+    if data is None:
+        raise ValueError("Raw data must be non-empty.")
+    if raw_format not in _RAW_FORMATS:
+        raise ValueError("The raw format is not exist.")
+    f = _RAW_FORMATS[raw_format]
+    n_height = data.shape[0]
+    d = np.asarray(data).reshape(n_height, -1, f['bytes'])
+
+    if raw_format == 'RAW8':
+        return d[:, :width, 0].copy()
+
+    p = np.empty((n_height, d.shape[1], f['pixels']), dtype=np.uint16)
+    if raw_format == 'RAW16':
+        p[:, :, 0] = d[:, :, 0] | (d[:, :, 1].astype(np.uint16) << 8)
+    elif raw_format == 'RAW10':
+        low = d[:, :, 4].astype(np.uint16)
+        for i in range(4):
+            p[:, :, i] = (d[:, :, i].astype(np.uint16) << 2) | ((low >> (2 * i)) & 3)
+    elif raw_format == 'RAW12':
+        low = d[:, :, 2].astype(np.uint16)
+        p[:, :, 0] = (d[:, :, 0].astype(np.uint16) << 4) | (low & 0xF)
+        p[:, :, 1] = (d[:, :, 1].astype(np.uint16) << 4) | (low >> 4)
+
+    return p.reshape(n_height, -1)[:, :width]
+
+
+def raw_sidecar_name(file_name: str) -> str:
+    return os.path.splitext(file_name)[0] + '.json'
+
+
+def raw_write(raw: np.ndarray = None,
+              file_name: str = None,
+              raw_format: str = 'RAW10',
+              cfa: str = None,
+              strip_height: int = 256,
+              json_name: str = None) -> dict:
+    """
+    Write raw pixels to the packed raw file and the JSON sidecar with the format, dimensions and CFA pattern.
+    The file is written by strips through the memory-mapped buffer. The pixels with several channels
+    are written interleaved, the sidecar records the number of channels.
+
+    :param raw: raw pixels with shape (height, width) or (height, width, channels), the values must fit the format bits
+    :param file_name: the raw file name with path and extension
+    :param raw_format: 'RAW8', 'RAW10', 'RAW12' or 'RAW16'
+    :param cfa: CFA pattern name for the sidecar, for example 'RGGB'
+    :param strip_height: the number of rows packed at once
+    :param json_name: the sidecar file name, None - the raw file name with .json extension
+    :return: dictionary with raw and json files
+    """
+    if raw is None:
+        raise ValueError("Raw image must be non-empty.")
+    if file_name is None:
+        raise ValueError("The file name must be non-empty.")
+    if raw_format not in _RAW_FORMATS:
+        raise ValueError("The raw format is not exist.")
+    if strip_height is None or strip_height < 1:
+        raise ValueError("The strip height must be non-empty or > 0.")
+    if raw.ndim not in (2, 3):
+        raise ValueError("Raw image must be 2D or 3D array.")
+    f = _RAW_FORMATS[raw_format]
+    if raw.size > 0 and int(raw.max()) >= (1 << f['bits']):
+        raise ValueError("The raw values do not fit {0} bits.".format(f['bits']))
+
+    n_height, n_width = raw.shape[:2]
+    n_channels = raw.shape[2] if raw.ndim == 3 else 1
+    raw = raw.reshape(n_height, n_width * n_channels)
+    stride = raw_line_stride(n_width * n_channels, raw_format)
+    os.makedirs(os.path.dirname(os.path.abspath(file_name)), exist_ok=True)
+    with open(file_name, 'wb') as fp:
+        fp.truncate(n_height * stride)
+
+    for y in range(0, n_height, strip_height):
+        y_end = min(y + strip_height, n_height)
+        m = np.memmap(file_name, dtype=np.uint8, mode='r+', offset=y * stride, shape=(y_end - y, stride))
+        m[:] = raw_pack(raw[y:y_end], raw_format)
+        m.flush()
+        del m
+
+    if json_name is None:
+        json_name = raw_sidecar_name(file_name)
+    dt_json = {'exporter': 'Leesa Exporter v0.1.8', 'format': raw_format, 'bit_depth': f['bits'],
+               'width': n_width, 'height': n_height, 'stride': stride, 'endian': 'little', 'cfa': cfa}
+    if n_channels > 1:
+        dt_json['channels'] = n_channels
+    with open(json_name, 'w') as outfile:
+        json.dump(dt_json, outfile, indent=2)
+
+    return {'raw': file_name, 'json': json_name}
+
+
+def raw_read(file_name: str = None, json_name: str = None) -> tuple:
+    """
+    Read the packed raw file described by the JSON sidecar.
+
+    :param file_name: the raw file name
+    :param json_name: the sidecar file name, None - the raw file name with .json extension
+    :return: tuple with raw pixels with shape (height, width) or (height, width, channels) and sidecar dictionary
+    """
+    if file_name is None:
+        raise ValueError("The file name must be non-empty.")
+    if json_name is None:
+        json_name = raw_sidecar_name(file_name)
+    with open(json_name, 'r') as fp:
+        header = json.load(fp)
+
+    data = np.memmap(file_name, dtype=np.uint8, mode='r', shape=(header['height'], header['stride']))
+    channels = header.get('channels', 1)
+    raw = raw_unpack(data, header['width'] * channels, header['format'])
+    del data
+    if channels > 1:
+        raw = raw.reshape(header['height'], header['width'], channels)
+    return raw, header
@@ -0,0 +1,376 @@
+"""Contains the video chart sequences: the frames with motion are streamed to uncompressed Y4M or raw YUV file,
+the ground truth of every frame is written to one JSON-lines file.
+"""
+import os
+import json
+import time
+import queue
+import itertools
+import datetime
+import tempfile
+import threading
+import numpy as np
+import PIL.Image
+from leesa.image import *
+from leesa.chart import Chart
+from leesa.odchart import ODChart
+from leesa.sensor import SensorSony
+from leesa.groundtruth import gt_load
+
+# Y4M color spaces: the chroma subsampling of the width and the height and the header tag
+_VIDEO_COLORSPACE = {
+    'C420': (2, 2, 'C420jpeg'),
+    'C444': (1, 1, 'C444')
+}
+# the motions of the sequences
+_VIDEO_MOTION = {'ramps', 'edge_bars', 'objects_scale'}
+# BT.709 RGB to limited range YCbCr: Y in [16, 235], Cb and Cr in [16, 240]
+_BT709_MATRIX = np.array([[0.2126, 0.7152, 0.0722],
+                          [-0.2126 / 1.8556, -0.7152 / 1.8556, 0.5],
+                          [0.5, -0.7152 / 1.5748, -0.0722 / 1.5748]]) * (np.array([[219], [224], [224]]) / 255)
+_BT709_OFFSET = np.array([16, 128, 128])
+
+
+def rgb_to_yuv(img: np.ndarray = None, colorspace: str = 'C420') -> tuple:
+    """
+    Convert RGB image to BT.709 limited range Y, Cb and Cr planes.
+    The chroma of 'C420' is calculated from the mean RGB of the 2x2 pixel blocks, the chroma sample is centered.
+
+    :param img: RGB image as uint8 array with shape (height, width, 3), the height and width are even for 'C420'
+    :param colorspace: 'C420' or 'C444'
+    :return: tuple of Y, Cb and Cr planes as uint8 arrays
+    """
+    if img is None:
+        raise ValueError("Image object must be non-empty.")
+    if colorspace not in _VIDEO_COLORSPACE:
+        raise ValueError("The color space is not exist.")
+    sx, sy, _ = _VIDEO_COLORSPACE[colorspace]
+    h, w = img.shape[:2]
+    if h % sy or w % sx:
+        raise ValueError("The image size must be multiple of the chroma subsampling.")
+    m = _BT709_MATRIX.astype(np.float32)
+    rgb = img.astype(np.float32)
+    y = np.clip(rgb @ m[0] + (_BT709_OFFSET[0] + 0.5), 0, 255).astype(np.uint8)
+    if sx > 1 or sy > 1:
+        rgb = rgb.reshape(h // sy, sy, w // sx, sx, 3).mean(axis=(1, 3))
+    cb = np.clip(rgb @ m[1] + (_BT709_OFFSET[1] + 0.5), 0, 255).astype(np.uint8)
+    cr = np.clip(rgb @ m[2] + (_BT709_OFFSET[2] + 0.5), 0, 255).astype(np.uint8)
+    return y, cb, cr
+
+
+class Y4mWriter:
+    """
+    Uncompressed Y4M stream writer, the planes of every frame are written as they come.
+    The file with .yuv extension is written as raw planar YUV without the stream and frame headers.
+
+    with Y4mWriter('img/out/video.y4m', width=1280, height=720, fps=90) as w:
+        w.write(*rgb_to_yuv(img))
+
+    """
+
+    def __init__(self, file_name: str = None, width: int = 0, height: int = 0, fps: float = 30,
+                 colorspace: str = 'C420'):
+        """
+
+        :param file_name: the Y4M or raw YUV file name
+        :param width: frame width
+        :param height: frame height
+        :param fps: frames per second
+        :param colorspace: 'C420' or 'C444'
+        """
+        if file_name is None:
+            raise ValueError("The file name must be non-empty.")
+        if width <= 0 or height <= 0:
+            raise ValueError("The frame width and height must be > 0.")
+        if fps is None or fps <= 0:
+            raise ValueError("The fps must be non-empty or > 0.")
+        if colorspace not in _VIDEO_COLORSPACE:
+            raise ValueError("The color space is not exist.")
+        sx, sy, tag = _VIDEO_COLORSPACE[colorspace]
+        if height % sy or width % sx:
+            raise ValueError("The frame size must be multiple of the chroma subsampling.")
+        self.file_name = file_name
+        self.width = width
+        self.height = height
+        self.chroma = (height // sy, width // sx)
+        self.frames = 0
+        self.raw = os.path.splitext(file_name)[1].lower() == '.yuv'
+        if os.path.dirname(file_name):
+            os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        self.fp = open(file_name, 'wb')
+        if not self.raw:
+            # the frame rate as the ratio of integers, 29.97 is written as 30000:1001
+            num, den = (int(fps), 1) if float(fps).is_integer() else (int(round(fps * 1001)), 1001)
+            self.fp.write(('YUV4MPEG2 W%d H%d F%d:%d Ip A1:1 %s XCOLORRANGE=LIMITED\n' %
+                           (width, height, num, den, tag)).encode())
+
+    def write(self, y: np.ndarray, cb: np.ndarray, cr: np.ndarray) -> None:
+        """
+        Write the next frame.
+
+        :param y: Y plane as uint8 array with shape (height, width)
+        :param cb: Cb plane as uint8 array with the chroma shape
+        :param cr: Cr plane as uint8 array with the chroma shape
+        :return: None
+        """
+        if y.shape != (self.height, self.width) or cb.shape != self.chroma or cr.shape != self.chroma:
+            raise ValueError("The planes shape does not match the frame.")
+        if not self.raw:
+            self.fp.write(b'FRAME\n')
+        for p in (y, cb, cr):
+            self.fp.write(np.ascontiguousarray(p, dtype=np.uint8).data)
+        self.frames += 1
+
+    def close(self) -> None:
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _gt_line(frame: int, fps: float, objects: str) -> str:
+    # one line of the JSON-lines ground truth, the objects are formatted as JSON array
+    return '{"frame":%d,"time":%s,"objects":%s}\n' % (frame, json.dumps(frame / fps), objects)
+
+
+class _ScrollSequence:
+    # the chart scrolled with wrapping: the frame t is the chart moved by t * speed pixels,
+    # the planes are converted once for the doubled chart and the frames are the slices of them,
+    # the chroma of 'C420' is kept for the even and the odd offsets, so every frame is exact
+
+    def __init__(self, canvas: np.ndarray, columns: dict, colorspace: str, speed: int, direction: int):
+        sx, sy, _ = _VIDEO_COLORSPACE[colorspace]
+        self.direction = direction
+        self.axis = 1 if direction == 0 else 0
+        self.size = canvas.shape[self.axis]
+        self.sub = sx if direction == 0 else sy
+        self.speed = speed
+        self.columns = columns
+        self.frame_size = {'w': canvas.shape[1], 'h': canvas.shape[0]}
+        # the objects JSON is split around the moved coordinate, the frame joins the parts with the coordinates
+        table = np.column_stack([columns[k] for k in ['x', 'y', 'w', 'h']] + [columns['c']]).tolist()
+        if direction == 0:
+            self.gt_pre = ['{"x":'] * len(table)
+            self.gt_post = [',"y":%d,"w":%d,"h":%d,"c":[%d,%d,%d]}' % tuple(e[1:]) for e in table]
+        else:
+            self.gt_pre = ['{"x":%d,"y":' % e[0] for e in table]
+            self.gt_post = [',"w":%d,"h":%d,"c":[%d,%d,%d]}' % tuple(e[2:]) for e in table]
+        self.gt_pre[1:] = [',' + e for e in self.gt_pre[1:]]
+        doubled = np.concatenate([canvas, canvas], axis=self.axis)
+        self.y = rgb_to_yuv(doubled, colorspace)[0]
+        self.chroma = []
+        for phase in range(self.sub):
+            shifted = np.roll(doubled, -phase, axis=self.axis)
+            self.chroma.append(rgb_to_yuv(shifted, colorspace)[1:])
+
+    def _slice(self, plane: np.ndarray, start: int, size: int) -> np.ndarray:
+        if self.axis == 1:
+            return plane[:, start:start + size]
+        return plane[start:start + size]
+
+    def frame(self, t: int, gt: bool = True) -> tuple:
+        offset = (t * self.speed) % self.size
+        phase = offset % self.sub
+        cb, cr = self.chroma[phase]
+        c_start = (offset - phase) // self.sub
+        c_size = self.size // self.sub
+        planes = (self._slice(self.y, offset, self.size), self._slice(cb, c_start, c_size),
+                  self._slice(cr, c_start, c_size))
+        # the objects are moved with the chart, the coordinate is wrapped as the image
+        if not gt:
+            return planes, None
+        moved = (self.columns['x' if self.direction == 0 else 'y'] - offset) % self.size
+        objects = itertools.chain.from_iterable(zip(self.gt_pre, map(str, moved.tolist()), self.gt_post))
+        return planes, '[' + ''.join(objects) + ']'
+
+
+def _chart_sequence(method: str, frame_type: str, color_background: tuple, colorspace: str, speed: int,
+                    direction: int, params: dict) -> _ScrollSequence:
+    # render the chart once, its ground truth is read from the temporary NPZ file
+    ct = Chart(frame_type=frame_type, color_background=color_background, gt_format='npz')
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        getattr(ct, method)(json_name=os.path.join(dir_tmp, 'gt.json'), **params)
+        _, columns = gt_load(os.path.join(dir_tmp, 'gt.npz'))
+    return _ScrollSequence(ct.canvas, columns, colorspace, speed, direction)
+
+
+class _ScaleSequence:
+    # the object of the ODChart scaled from the start to the end scale in the frame center,
+    # the background planes are converted once, only the object is converted in every frame
+
+    def __init__(self, od: ODChart, img_name: str, json_name: str, detect_position: int, colorspace: str,
+                 scale_start: float, scale_end: float, frames: int, scale_mode: int):
+        sx, sy, _ = _VIDEO_COLORSPACE[colorspace]
+        self.od = od
+        self.sub = (sx, sy)
+        self.colorspace = colorspace
+        with open(json_name, 'r') as f:
+            self.rect = json.load(f)[detect_position]
+        with PIL.Image.open(img_name) as img:
+            self.img = img.convert('RGB')
+        self.scales = np.linspace(scale_start, scale_end, frames) if frames > 1 else np.array([scale_start])
+        self.scale_mode = scale_mode
+        # the background color of one chroma block gives the background planes
+        bg = np.empty((sy, sx, 3), dtype=np.uint8)
+        bg[:] = od.color_background
+        y, cb, cr = rgb_to_yuv(bg, colorspace)
+        chroma = (od.frame['h'] // sy, od.frame['w'] // sx)
+        self.background = [np.full((od.frame['h'], od.frame['w']), y[0, 0], dtype=np.uint8),
+                           np.full(chroma, cb[0, 0], dtype=np.uint8), np.full(chroma, cr[0, 0], dtype=np.uint8)]
+
+    def frame(self, t: int, gt: bool = True) -> tuple:
+        sx, sy = self.sub
+        rect, img = self.od.scale(self.img, float(self.scales[t]), self.rect, self.scale_mode)
+        # the object is cut to the frame and to the chroma blocks
+        w = min(rect['w'], self.od.frame['w']) // sx * sx
+        h = min(rect['h'], self.od.frame['h']) // sy * sy
+        x = (self.od.frame['w'] - w) // 2 // sx * sx
+        y = (self.od.frame['h'] - h) // 2 // sy * sy
+        planes = [p.copy() for p in self.background]
+        if w > 0 and h > 0:
+            obj = np.asarray(img)[:h, :w]
+            for p, o, (fx, fy) in zip(planes, rgb_to_yuv(obj, self.colorspace), [(1, 1), (sx, sy), (sx, sy)]):
+                p[y // fy:(y + h) // fy, x // fx:(x + w) // fx] = o
+        if not gt:
+            return planes, None
+        objects = [{'obj': self.rect.get('obj'), 'x': x, 'y': y, 'w': w, 'h': h,
+                    'scale': float(self.scales[t]), 'face_w': rect['face_w'], 'eyes_d': rect['eyes_d']}]
+        return planes, json.dumps(objects, separators=(',', ':'))
+
+
+def sensor_fps(sensor_name: str = None) -> tuple:
+    """
+    The frame type and the frame rate of the sensor.
+
+    :param sensor_name: the sensor name from SensorSony
+    :return: tuple of the frame type and fps
+    """
+    s = SensorSony()
+    _SENSORS = s.get_dict()
+    if sensor_name not in _SENSORS:
+        raise ValueError("The sensor is not exist.")
+    return _SENSORS[sensor_name]['resolution'], _SENSORS[sensor_name]['fps']
+
+
+def video_render(motion: str = 'ramps',
+                 frames: int = 90,
+                 sensor_name: str = 'IMX662-AAQR',
+                 frame_type: str = None,
+                 fps: float = None,
+                 color_background: tuple = (127, 127, 127),
+                 colorspace: str = 'C420',
+                 params: dict = None,
+                 video_name: str = None,
+                 json_name: str = None,
+                 queue_size: int = 8) -> dict:
+    """
+    Render the chart sequence with motion to Y4M or raw YUV file. The frames are produced by the thread
+    and written by the caller thread through the bounded queue, so the memory does not depend on the number
+    of frames. The ground truth is one JSON line for the header and one line for every frame.
+
+    'ramps' - Chart.ramps scrolled by params 'speed' pixels per frame, 'direction' 0 - horizontal, 1 - vertical
+    'edge_bars' - Chart.edge_test bars moved the same way
+    'objects_scale' - the object of params 'img_name' and 'json_name' (ODChart input) in the frame center
+                      scaled from 'scale_start' to 'scale_end' scale units of 'scale_size' pixels
+
+    :param motion: 'ramps', 'edge_bars' or 'objects_scale'
+    :param frames: the number of frames
+    :param sensor_name: the sensor name from SensorSony, it gives the frame type and fps
+    :param frame_type: the frame type, None - the sensor resolution
+    :param fps: frames per second, None - the sensor fps
+    :param color_background: color for image background fill, color as RGB list
+    :param colorspace: 'C420' or 'C444'
+    :param params: the motion parameters, the other parameters are passed to the Chart method
+    :param video_name: the .y4m or .yuv file name
+    :param json_name: the JSON-lines ground truth file name, None - the ground truth is not saved
+    :param queue_size: the maximum number of the frames in the queue
+    :return: dictionary with the file names, the frame size, fps, the rendered fps, True in 'realtime'
+             if the rendered fps is not below fps, and the total time
+    """
+    if motion not in _VIDEO_MOTION:
+        raise ValueError("The motion is not exist.")
+    if video_name is None:
+        raise ValueError("The video file name must be non-empty.")
+    if frames is None or frames < 1:
+        raise ValueError("The number of frames must be non-empty or > 0.")
+    if queue_size is None or queue_size < 1:
+        raise ValueError("The queue size must be non-empty or > 0.")
+    if frame_type is None or fps is None:
+        sensor_frame_type, sensor_fps_value = sensor_fps(sensor_name)
+        frame_type = sensor_frame_type if frame_type is None else frame_type
+        fps = sensor_fps_value if fps is None else fps
+    params = dict() if params is None else dict(params)
+    header_params = dict(params)
+
+    time_start = time.time()
+    timestamp = datetime.datetime.now().strftime("%d-%b-%Y(%H-%M-%S)")
+    if motion == 'objects_scale':
+        od = ODChart(frame_type=frame_type, color_background=color_background)
+        od.scale_size = params.get('scale_size', od.scale_size)
+        sequence = _ScaleSequence(od, params['img_name'], params['json_name'], params.get('detect_position', 0),
+                                  colorspace, params.get('scale_start', 3), params.get('scale_end', 35), frames,
+                                  params.get('scale_mode', 0))
+        frame = od.frame
+    else:
+        speed = params.pop('speed', 4)
+        direction = params.pop('direction', 0)
+        sequence = _chart_sequence('ramps' if motion == 'ramps' else 'edge_test', frame_type, color_background,
+                                   colorspace, speed, direction, params)
+        frame = sequence.frame_size
+
+    # the producer renders the frames, the bounded queue stops it if the writer is behind
+    frames_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for t in range(frames):
+                if stop.is_set():
+                    return
+                frames_queue.put(sequence.frame(t, json_name is not None))
+            frames_queue.put(None)
+        except BaseException as e:
+            frames_queue.put(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    time_render = time.time()
+    gt = None
+    try:
+        if json_name is not None:
+            if os.path.dirname(json_name):
+                os.makedirs(os.path.dirname(json_name), exist_ok=True)
+            gt = open(json_name, 'w')
+            gt.write(json.dumps({'exporter': 'Leesa Exporter v0.1.8', 'time': timestamp, 'type': 'video',
+                                 'motion': motion, 'params': header_params, 'frame_type': frame_type, 'w': frame['w'],
+                                 'h': frame['h'], 'fps': fps, 'frames': frames, 'colorspace': colorspace,
+                                 'matrix': 'BT.709', 'range': 'limited'}, default=str) + '\n')
+        with Y4mWriter(video_name, frame['w'], frame['h'], fps, colorspace) as writer:
+            producer.start()
+            for t in range(frames + 1):
+                item = frames_queue.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                planes, objects = item
+                writer.write(*planes)
+                if gt is not None:
+                    gt.write(_gt_line(t, fps, objects))
+    finally:
+        stop.set()
+        # release the producer blocked on the full queue
+        while producer.is_alive():
+            try:
+                frames_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        if gt is not None:
+            gt.close()
+    render_time = time.time() - time_render
+    render_fps = frames / render_time if render_time > 0 else float('inf')
+    return {'video': video_name, 'json': json_name, 'frame_type': frame_type, 'w': frame['w'], 'h': frame['h'],
+            'fps': fps, 'frames': frames, 'render_fps': render_fps, 'realtime': render_fps >= fps,
+            'time': time.time() - time_start}
@@ -15,12 +15,9 @@ if __name__ == '__main__':
              json_name='img/out/ramps.json')
 
     # An example of usage for converting RGB to Bayer images
-    # for RGGB Bayer type
-    rgb_to_bayer(image_name='img/out/ramps.png', dir_name='img/out', bayer_type='RGGB')
-    # for BGGR Bayer type
-    rgb_to_bayer(image_name='img/out/ramps.png', dir_name='img/out', bayer_type='BGGR')
-    # for X-TRANS Bayer type
-    rgb_to_bayer(image_name='img/out/ramps.png', dir_name='img/out', bayer_type='X-TRANS')
+    # RGGB, BGGR and X-TRANS Bayer types from one decode of the image,
+    # the output names are ramps_RGGB_r.png, ramps_RGGB_g.png, ..., ramps_X-TRANS_b.png
+    rgb_to_bayer_batch(images=['img/out/ramps.png'], dir_name='img/out', bayer_types=['RGGB', 'BGGR', 'X-TRANS'])
 
     # An example of usage for chart with color combinations
     ct = Chart(frame_type='nHD', color_background=(127, 127, 127))
@@ -0,0 +1,95 @@
+import unittest
+import tempfile
+import os
+import numpy as np
+import PIL.Image
+from leesa.bayer import rgb_to_mosaic, rgb_to_channels, cfa_pattern_add, cfa_sites, rgb_to_bayer_batch
+
+
+class BayerTests(unittest.TestCase):
+    def test_mosaic_bayer_type_unknown(self):
+        """ Test Bayer type is Unknown """
+        try:
+            _ = rgb_to_mosaic(img=np.zeros((2, 2, 3), dtype=np.uint8), bayer_type='a')
+        except ValueError as e:
+            self.assertEqual(type(e), ValueError)
+        else:
+            self.fail('ValueError for Bayer type is unknown not raised')
+
+    def test_mosaic_rggb(self):
+        """ Test RGGB mosaic takes R, G, G, B sites """
+        img = np.zeros((3, 3, 3), dtype=np.uint8)
+        img[:, :, 0] = 10
+        img[:, :, 1] = 20
+        img[:, :, 2] = 30
+        raw = rgb_to_mosaic(img=img, bayer_type='RGGB')
+        self.assertEqual(raw.dtype, np.uint8)
+        self.assertEqual(raw.tolist(), [[10, 20, 10], [20, 30, 20], [10, 20, 10]])
+        raw = rgb_to_mosaic(img=img, bayer_type='RGGB', bit_depth=16)
+        self.assertEqual(raw.dtype, np.uint16)
+        self.assertEqual(raw[1, 1], 30 << 8)
+
+    def test_channels_sum_is_mosaic(self):
+        """ Test the channel planes add up to the mosaic """
+        img = np.random.default_rng(0).integers(0, 256, size=(13, 14, 3), dtype=np.uint8)
+        for bayer_type in ['RGGB', 'BGGR', 'GRBG', 'GBRG', 'X-TRANS', 'QUAD-BAYER']:
+            planes = rgb_to_channels(img=img, bayer_type=bayer_type)
+            raw = rgb_to_mosaic(img=img, bayer_type=bayer_type)
+            np.testing.assert_array_equal(sum(p.astype(int) for p in planes), raw)
+
+    def test_mosaic_quad_bayer(self):
+        """ Test Quad Bayer mosaic has 2x2 blocks of one color """
+        img = np.zeros((4, 4, 3), dtype=np.uint8)
+        img[:, :, 0] = 1
+        img[:, :, 1] = 2
+        img[:, :, 2] = 3
+        raw = rgb_to_mosaic(img=img, bayer_type='QUAD-BAYER')
+        self.assertEqual(raw.tolist(), [[1, 1, 2, 2], [1, 1, 2, 2], [2, 2, 3, 3], [2, 2, 3, 3]])
+
+    def test_mosaic_rgbw(self):
+        """ Test RGBW mosaic takes luminance at W sites and has W plane """
+        img = np.full((4, 4, 3), 100, dtype=np.uint8)
+        raw = rgb_to_mosaic(img=img, bayer_type='RGBW')
+        self.assertEqual(raw.min(), 100)
+        self.assertEqual(raw.max(), 100)
+        planes = rgb_to_channels(img=img, bayer_type='RGBW')
+        self.assertEqual(len(planes), 4)
+        self.assertEqual(int((planes[3] > 0).sum()), 8)
+
+    def test_custom_pattern(self):
+        """ Test any NxM pattern can be added and the sites are cached """
+        cfa_pattern_add('test-3x1', ['RGB'])
+        img = np.zeros((2, 5, 3), dtype=np.uint8)
+        img[:, :, 1] = 7
+        raw = rgb_to_mosaic(img=img, bayer_type='test-3x1')
+        self.assertEqual(raw.tolist(), [[0, 7, 0, 0, 7], [0, 7, 0, 0, 7]])
+        self.assertIs(cfa_sites('test-3x1', 2, 5), cfa_sites('test-3x1', 2, 5))
+        try:
+            cfa_pattern_add('test-bad', ['RG', 'G'])
+        except ValueError as e:
+            self.assertEqual(type(e), ValueError)
+        else:
+            self.fail('ValueError for pattern rows length not raised')
+
+    def test_batch_unique_names(self):
+        """ Test batch conversion writes every Bayer type of every image to unique names """
+        with tempfile.TemporaryDirectory() as dir_out:
+            os.makedirs(os.path.join(dir_out, 'a'))
+            os.makedirs(os.path.join(dir_out, 'b'))
+            # the suffix of the second chart.png is the name of chart_1.png, the same image is passed twice
+            images = [os.path.join(dir_out, 'chart.png'), os.path.join(dir_out, 'a', 'chart.png'),
+                      os.path.join(dir_out, 'b', 'chart_1.png'), os.path.join(dir_out, 'chart.png')]
+            for i, image_name in enumerate(images[:3]):
+                PIL.Image.fromarray(np.full((4, 6, 3), 10 * (i + 1), dtype=np.uint8)).save(image_name)
+            r = rgb_to_bayer_batch(images=images, dir_name=dir_out, bayer_types=['RGGB', 'BGGR'], workers=1)
+            self.assertEqual(list(r), ['chart', 'chart_1', 'chart_1_1', 'chart_2'])
+            names = [f for files in r.values() for f in files]
+            self.assertEqual(len(names), 24)
+            self.assertEqual(len(set(names)), 24)
+            self.assertEqual(os.path.basename(r['chart_1'][0]), 'chart_1_RGGB_r.png')
+            self.assertEqual(np.asarray(PIL.Image.open(r['chart_1'][0])).max(), 20)
+            self.assertEqual(np.asarray(PIL.Image.open(r['chart_1_1'][0])).max(), 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
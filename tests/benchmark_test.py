@@ -0,0 +1,68 @@
+import unittest
+import copy
+import os
+import tempfile
+from unittest import mock
+import leesa.benchmark
+from leesa.benchmark import benchmark_run, benchmark_compare, main
+
+
+class BenchmarkTests(unittest.TestCase):
+    def test_benchmark_run(self):
+        """ Test the results of the frame dependent and independent cases """
+        r = benchmark_run(cases=['chart_ramps', 'fov_vs_ground_intersection'], sizes=['QQVGA', 'small'], repeat=1)
+        self.assertEqual([(e['case'], e['frame_type']) for e in r['results']],
+                         [('chart_ramps', 'QQVGA'), ('chart_ramps', 'nHD'), ('fov_vs_ground_intersection', None)])
+        for e in r['results']:
+            self.assertIsNone(e['error'])
+            self.assertGreater(e['time'], 0)
+        self.assertGreater(r['results'][1]['memory'], r['results'][0]['memory'])
+        self.assertEqual(r['failures'], [])
+
+    def test_benchmark_modules(self):
+        """ Test the smoke cases of the bayer, edge and odchart modules """
+        cases = ['rgb_to_bayer', 'edge_gradient', 'edge_canny', 'edge_parallel', 'od_object_to_images']
+        r = benchmark_run(cases=cases, sizes=['QQVGA'], repeat=1)
+        self.assertEqual(r['failures'], [])
+        self.assertEqual([e['case'] for e in r['results']], cases)
+        for e in r['results']:
+            self.assertGreater(e['time'], 0)
+
+    def test_benchmark_failure(self):
+        """ Test the failed case is reported, is not saved to the results and gives exit code 1 """
+        def setup(frame_type, dir_data, dir_out):
+            raise OSError('cannot open resource')
+
+        with tempfile.TemporaryDirectory() as dir_out, \
+                mock.patch.dict(leesa.benchmark._BENCHMARK_CASES, {'broken': (setup, False)}):
+            json_name = os.path.join(dir_out, 'current.json')
+            self.assertEqual(main(['run', '--json_name', json_name, '--cases', 'broken', 'fov_vs_ground_intersection',
+                                   '--repeat', '1']), 1)
+            r = benchmark_run(cases=['broken', 'fov_vs_ground_intersection'], repeat=1)
+            self.assertEqual([e['case'] for e in r['results']], ['fov_vs_ground_intersection'])
+            self.assertEqual([e['error'] for e in r['failures']], ["OSError('cannot open resource')"])
+            c = benchmark_compare(baseline=json_name, current=r, threshold=100)
+            self.assertEqual([e['case'] for e in c['failures']], ['broken'])
+            self.assertEqual(main(['compare', json_name, json_name, '--threshold', '100']), 1)
+
+    def test_benchmark_compare(self):
+        """ Test the regressions above the threshold """
+        baseline = {'results': [{'case': 'a', 'size': 'small', 'frame_type': 'nHD', 'time': 1.0, 'memory': 100,
+                                 'error': None},
+                                {'case': 'b', 'size': None, 'frame_type': None, 'time': 1.0, 'memory': 100,
+                                 'error': None}]}
+        current = copy.deepcopy(baseline)
+        current['results'][0]['time'] = 1.05
+        current['results'][1]['memory'] = 150
+        r = benchmark_compare(baseline=baseline, current=current, threshold=0.1)
+        self.assertEqual([e['case'] for e in r['regressions']], ['b'])
+        self.assertTrue(r['regressions'][0]['memory_regression'])
+        self.assertFalse(r['regressions'][0]['time_regression'])
+        current['results'][0]['error'] = 'OSError()'
+        r = benchmark_compare(baseline=baseline, current=current, threshold=0.6)
+        self.assertEqual(r['regressions'], [])
+        self.assertEqual([e['case'] for e in r['missing']], ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
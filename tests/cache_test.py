@@ -0,0 +1,101 @@
+import unittest
+import tempfile
+import os
+import concurrent.futures
+import json
+import numpy as np
+import PIL.Image
+from leesa.chart import Chart
+from leesa.cache import ChartCache
+
+
+def _cache_put(dir_name: str, worker: int, n: int) -> None:
+    # put n entries from the worker process
+    cache = ChartCache(dir_name=dir_name)
+    for i in range(n):
+        file_name = os.path.join(dir_name, '..', 'w{0}_{1}.png'.format(worker, i))
+        with open(file_name, 'wb') as fp:
+            fp.write(bytes(10))
+        cache.put(key='w{0}_{1}'.format(worker, i), image_name=file_name)
+
+
+class CacheTests(unittest.TestCase):
+    def test_chart_cache_hit(self):
+        """ Test the second chart with the same parameters is taken from the cache """
+        with tempfile.TemporaryDirectory() as dir_out:
+            cache = ChartCache(dir_name=os.path.join(dir_out, 'cache'), link=True)
+            image_name = os.path.join(dir_out, 'out', 'a.png')
+            json_name = os.path.join(dir_out, 'out', 'a.json')
+            ct = Chart(frame_type='QQVGA', color_background=(9, 9, 9), cache=cache)
+            a = ct.rectangles(color_mode='gradient_color', rectangle_color=[[0, 0, 0], [255, 0, 0]],
+                              image_name=image_name, json_name=json_name)
+            self.assertEqual(cache.info()['entries'], 1)
+            ct = Chart(frame_type='QQVGA', color_background=(9, 9, 9), cache=cache)
+            b = ct.rectangles(color_mode='gradient_color', rectangle_color=[[0, 0, 0], [255, 0, 0]],
+                              image_name=image_name, json_name=json_name)
+            self.assertTrue(np.array_equal(a, b))
+            self.assertTrue(np.array_equal(ct.canvas, a))
+            self.assertEqual(cache.info()['entries'], 1)
+            # the other background is the other chart, the hard-linked output is not changed in the cache
+            ct = Chart(frame_type='QQVGA', color_background=(0, 0, 0), cache=cache)
+            ct.rectangles(color_mode='gradient_color', rectangle_color=[[0, 0, 0], [255, 0, 0]],
+                          image_name=image_name, json_name=json_name)
+            self.assertEqual(cache.info()['entries'], 2)
+            ct = Chart(frame_type='QQVGA', color_background=(9, 9, 9), cache=cache)
+            c = ct.rectangles(color_mode='gradient_color', rectangle_color=[[0, 0, 0], [255, 0, 0]],
+                              image_name=image_name, json_name=json_name)
+            self.assertTrue(np.array_equal(a, c))
+
+    def test_cache_output_overwrite(self):
+        """ Test the uncached chart written over the output of the cache hit does not change the cache """
+        with tempfile.TemporaryDirectory() as dir_out:
+            cache = ChartCache(dir_name=os.path.join(dir_out, 'cache'))
+            names = [os.path.join(dir_out, 'out', n) for n in ['a.png', 'a.json', 'b.png', 'b.json']]
+            ramps = Chart(frame_type='QQVGA', cache=cache)
+            ramps.ramps(image_name=names[0], json_name=names[1])
+            Chart(frame_type='QQVGA', cache=cache).ramps(image_name=names[2], json_name=names[3])
+            # the red combinations without the cache over the output of the hit
+            red = Chart(frame_type='QQVGA', color_background=(255, 0, 0))
+            red.combinations(image_name=names[2], json_name=names[3])
+            self.assertTrue(os.path.isfile(os.path.join(dir_out, 'cache', 'index.json')))
+            for f in os.listdir(os.path.join(dir_out, 'cache')):
+                if f != 'index.json':
+                    self.assertFalse(os.stat(os.path.join(dir_out, 'cache', f)).st_mode & 0o222)
+            ct = Chart(frame_type='QQVGA', cache=cache)
+            ct.ramps(image_name=names[2], json_name=names[3])
+            self.assertTrue(np.array_equal(ct.canvas, ramps.canvas))
+            self.assertTrue(np.array_equal(np.asarray(PIL.Image.open(names[2])), ramps.canvas))
+            with open(names[1], 'r') as fp1, open(names[3], 'r') as fp2:
+                self.assertEqual(json.load(fp1)['objects'], json.load(fp2)['objects'])
+
+    def test_cache_lru_eviction(self):
+        """ Test the least recently used entries are evicted above the size limit """
+        with tempfile.TemporaryDirectory() as dir_out:
+            cache = ChartCache(dir_name=os.path.join(dir_out, 'cache'))
+            for i in range(3):
+                ct = Chart(frame_type='QQVGA', color_background=(i, i, i), cache=cache)
+                ct.ramps(image_name=os.path.join(dir_out, str(i) + '.png'))
+            items = cache.info()['items']
+            self.assertEqual(len(items), 3)
+            r = cache.prune(size_limit=items[0]['size'])
+            self.assertEqual(r['entries'], 1)
+            self.assertEqual(r['items'][0]['key'], items[0]['key'])
+            cache.clear()
+            self.assertEqual(cache.info()['entries'], 0)
+
+    def test_cache_concurrent_put(self):
+        """ Test the entries put by the concurrent processes are all kept in the index """
+        with tempfile.TemporaryDirectory() as dir_out:
+            dir_name = os.path.join(dir_out, 'cache')
+            ChartCache(dir_name=dir_name)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=4) as executor:
+                for f in [executor.submit(_cache_put, dir_name, worker, 25) for worker in range(4)]:
+                    f.result()
+            info = ChartCache(dir_name=dir_name).info()
+            self.assertEqual(info['entries'], 100)
+            self.assertEqual(info['size'], 1000)
+            self.assertEqual(sorted(os.listdir(dir_name)), sorted(['index.json'] + [e['image'] for e in info['items']]))
+
+
+if __name__ == '__main__':
+    unittest.main()
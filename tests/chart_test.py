@@ -1,5 +1,13 @@
 import unittest
-from leesa.chart import Chart
+import tempfile
+import os
+import concurrent.futures
+from unittest import mock
+import numpy as np
+import PIL.Image
+from leesa.chart import Chart, chart_render_all
+from leesa.raw import raw_read
+from leesa.groundtruth import gt_load
 
 
 class ChartTests(unittest.TestCase):
@@ -119,6 +127,149 @@ class ChartTests(unittest.TestCase):
         else:
             self.fail('ValueError for gap_y must be non-empty or = 0 not raised')
 
+    def test_rectangle_gradient_colors(self):
+        """ Test gradient colors are truncated steps and the last color is exact """
+        ct = Chart(frame_type='QQVGA')
+        img = ct.rectangles(color_mode='gradient_color', rectangle_color=[[0, 0, 0], [255, 100, 10]],
+                            rectangle_width=40, rectangle_height=60, gap_x=0, gap_y=0)
+        self.assertEqual(img[0, 0].tolist(), [0, 0, 0])
+        self.assertEqual(img[0, 40].tolist(), [31, 12, 1])
+        self.assertEqual(img[0, 80].tolist(), [63, 25, 2])
+        self.assertEqual(img[119, 159].tolist(), [255, 100, 10])
+
+    def test_ramp_draw(self):
+        """ Test ramp elements and coordinates after the step """
+        ct = Chart(frame_type='QQVGA')
+        stats = ct.ramp_draw(start_x=2, start_y=3, element_width=2, element_height=4, start_color=(0, 0, 0),
+                             end_color=(255, 255, 255), ramp_size=4)
+        img = np.array(ct.img)
+        self.assertEqual(img[3:7, 2:10, 0].tolist(), [[0, 0, 85, 85, 170, 170, 255, 255]] * 4)
+        self.assertEqual(img[7, 2:10, 0].tolist(), [0] * 8)
+        self.assertEqual(stats[0], {'x': 4, 'y': 3, 'w': 2, 'h': 4, 'c': [0, 0, 0]})
+        self.assertEqual(len(stats), 4)
+
+    def test_canvas_in_place(self):
+        """ Test chart methods paint on the same canvas """
+        ct = Chart(frame_type='QQVGA', color_background=(1, 2, 3))
+        canvas = ct.canvas
+        ct.ramp_draw(start_color=(9, 9, 9), end_color=(9, 9, 9), ramp_size=2)
+        ct.ramp_draw(start_x=10, start_color=(7, 7, 7), end_color=(7, 7, 7), ramp_size=2)
+        self.assertIs(ct.canvas, canvas)
+        self.assertEqual(canvas[0, 0].tolist(), [9, 9, 9])
+        self.assertEqual(canvas[0, 10].tolist(), [7, 7, 7])
+        self.assertEqual(ct.img.getpixel((100, 100)), (1, 2, 3))
+
+    def test_image_copy(self):
+        """ Test the image is a copy of the canvas and the edits are kept by the assignment """
+        ct = Chart(frame_type='QQVGA', color_background=(1, 2, 3))
+        img = ct.to_image()
+        img.paste((200, 100, 50), (0, 0, 10, 10))
+        self.assertEqual(ct.canvas[5, 5].tolist(), [1, 2, 3])
+        ct.img = img
+        self.assertEqual(ct.canvas[5, 5].tolist(), [200, 100, 50])
+        self.assertEqual(ct.img.getpixel((5, 5)), (200, 100, 50))
+
+    def test_strip_mode(self):
+        """ Test the chart rendered by strips is the same as the chart painted on the canvas """
+        with tempfile.TemporaryDirectory() as dir_out:
+            for strip_height in [None, 7]:
+                ct = Chart(frame_type='QQVGA', color_background=(5, 6, 7), strip_height=strip_height)
+                ct.ramp_draw(start_x=100, start_y=3, element_width=1, element_height=200, ramp_size=50,
+                             end_color=(255, 0, 0))
+                ct.combinations(image_name=os.path.join(dir_out, str(strip_height) + '.png'))
+            a = np.array(PIL.Image.open(os.path.join(dir_out, 'None.png')))
+            b = np.array(PIL.Image.open(os.path.join(dir_out, '7.png')))
+            self.assertTrue(np.array_equal(a, b))
+
+    def test_border_in_place(self):
+        """ Test the border is written to the padding of the canvas and the content is not moved """
+        ct = Chart(frame_type='nHD', color_background=(5, 6, 7))
+        content = ct.canvas
+        ct.border_draw()
+        b_size = 640 // 46
+        self.assertEqual(ct.canvas.shape, (360 + 2 * b_size, 640 + 2 * b_size, 3))
+        self.assertTrue(np.shares_memory(ct.canvas, content))
+        self.assertEqual(ct.canvas[0, 0].tolist(), [0, 0, 0])
+        self.assertEqual(ct.canvas[b_size, b_size].tolist(), [5, 6, 7])
+        self.assertEqual(ct.canvas[0, ct.canvas.shape[1] // 2].tolist(), [255, 255, 255])
+
+    def test_render_all_manifest(self):
+        """ Test the chart is rendered for every frame type and the manifest is sorted by resolution """
+        with tempfile.TemporaryDirectory() as dir_out:
+            m = chart_render_all(method='combinations', frame_types=['nHD', 'QQVGA'], dir_name=dir_out, workers=1)
+            self.assertEqual([e['frame_type'] for e in m['frames']], ['QQVGA', 'nHD'])
+            for e in m['frames']:
+                self.assertTrue(os.path.isfile(e['image']))
+                self.assertTrue(os.path.isfile(e['json']))
+            self.assertTrue(os.path.isfile(os.path.join(dir_out, 'combinations_manifest.json')))
+
+    def test_render_all_memory_limit(self):
+        """ Test the process pool runs one job at a time above the memory limit from the largest frame """
+        frame_types = ['QQVGA', 'VGA', 'nHD']
+        futures_wait = concurrent.futures.wait
+        for memory_limit, running_max in [(1, 1), (2 ** 40, 2)]:
+            running = []
+
+            def wait(fs, **kwargs):
+                running.append(len(fs))
+                return futures_wait(fs, **kwargs)
+
+            with tempfile.TemporaryDirectory() as dir_out, mock.patch('leesa.chart.concurrent.futures.wait', wait):
+                m = chart_render_all(method='ramps', frame_types=frame_types, dir_name=dir_out, workers=2,
+                                     memory_limit=memory_limit)
+                self.assertEqual([e['frame_type'] for e in m['frames']], ['QQVGA', 'nHD', 'VGA'])
+                for e in m['frames']:
+                    self.assertTrue(os.path.isfile(e['image']))
+                    self.assertTrue(os.path.isfile(e['json']))
+                    self.assertEqual(os.path.basename(e['image']), 'ramps_' + e['frame_type'] + '.png')
+                if memory_limit == 1:
+                    # the jobs are finished one by one from the largest frame
+                    times = [os.stat(e['image']).st_mtime_ns for e in m['frames']]
+                    self.assertEqual(times, sorted(times, reverse=True))
+            self.assertEqual(max(running), running_max)
+
+    def test_high_bit_depth_ramp(self):
+        """ Test 12-bit ramp has every code value """
+        ct = Chart(frame_type='QQVGA', color_background=(2048, 2048, 2048), bit_depth=12)
+        stats = ct.ramp_draw(start_x=0, start_y=5, element_width=1, element_height=2, end_color=(4095, 0, 4095),
+                             ramp_size=4096)
+        self.assertEqual(ct.canvas.dtype, np.uint16)
+        self.assertEqual(ct.canvas[5, :, 0].tolist(), list(range(160)))
+        self.assertEqual(ct.canvas[0, 0].tolist(), [2048, 2048, 2048])
+        self.assertEqual([e['c'][0] for e in stats], list(range(4096)))
+        self.assertEqual(stats[-1]['c'], [4095, 0, 4095])
+
+    def test_color_bit_depth(self):
+        """ Test the method colors above the code range of the bit depth are not accepted """
+        ct = Chart(frame_type='QQVGA', bit_depth=10)
+        with self.assertRaises(ValueError):
+            ct.ramp_draw(end_color=(4095, 4095, 4095), ramp_size=16)
+        with self.assertRaises(ValueError):
+            ct.ramp_draw(start_color=(-1, 0, 0), end_color=(1023, 1023, 1023), ramp_size=16)
+        with self.assertRaises(ValueError):
+            ct.rectangles(color_mode='gradient_color', rectangle_color=[[0, 0, 0], [1024, 0, 0]])
+        with self.assertRaises(ValueError):
+            Chart(frame_type='QQVGA').rectangles(color_mode='single_color', rectangle_color=[[256, 0, 0]])
+        self.assertEqual(ct.canvas.max(), 0)
+        ct.ramp_draw(end_color=(1023, 1023, 1023), ramp_size=16)
+        self.assertEqual(ct.canvas.max(), 1023)
+
+    def test_high_bit_depth_files(self):
+        """ Test raw file and ground truth of 10-bit chart keep the code values, the strips are the same """
+        with tempfile.TemporaryDirectory() as dir_out:
+            ct = Chart(frame_type='QQVGA', color_background=(512, 512, 512), bit_depth=10, gt_format='npz')
+            ct.ramps(element_height=4, ramp_size=64, image_name=os.path.join(dir_out, 'a.raw'),
+                     json_name=os.path.join(dir_out, 'a.json'))
+            raw, header = raw_read(os.path.join(dir_out, 'a.raw'), os.path.join(dir_out, 'a.raw.json'))
+            self.assertEqual(header['format'], 'RAW10')
+            self.assertTrue(np.array_equal(raw, ct.canvas))
+            header, columns = gt_load(os.path.join(dir_out, 'a.npz'))
+            self.assertEqual(header['bit_depth'], 10)
+            self.assertEqual(columns['c'].max(), 1023)
+            st = Chart(frame_type='QQVGA', color_background=(512, 512, 512), bit_depth=10, strip_height=16)
+            st.ramps(element_height=4, ramp_size=64, image_name=os.path.join(dir_out, 'b.raw'))
+            self.assertTrue(np.array_equal(raw_read(os.path.join(dir_out, 'b.raw'),
+                                                    os.path.join(dir_out, 'b.raw.json'))[0], raw))
 
 
 if __name__ == '__main__':
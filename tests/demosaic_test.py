@@ -0,0 +1,50 @@
+import unittest
+import tempfile
+import json
+import os
+import numpy as np
+from leesa.bayer import rgb_to_mosaic
+from leesa.demosaic import demosaic, demosaic_score
+
+
+class DemosaicTests(unittest.TestCase):
+    def test_demosaic_flat(self):
+        """ Test every method reproduces the flat image """
+        img = np.zeros((8, 10, 3), dtype=np.uint8)
+        img[:, :] = (40, 120, 200)
+        for bayer_type in ['RGGB', 'BGGR', 'GRBG', 'GBRG']:
+            raw = rgb_to_mosaic(img=img, bayer_type=bayer_type)
+            for method in ['bilinear', 'malvar', 'edge_aware']:
+                self.assertTrue(np.array_equal(demosaic(raw=raw, bayer_type=bayer_type, method=method), img))
+
+    def test_demosaic_bilinear_any_cfa(self):
+        """ Test bilinear demosaic of X-Trans mosaic """
+        img = np.zeros((12, 12, 3), dtype=np.uint8)
+        img[:, :] = (40, 120, 200)
+        raw = rgb_to_mosaic(img=img, bayer_type='X-TRANS')
+        self.assertTrue(np.array_equal(demosaic(raw=raw, bayer_type='X-TRANS'), img))
+
+    def test_demosaic_malvar_not_bayer(self):
+        """ Test Malvar-He-Cutler demosaic rejects X-Trans mosaic """
+        with self.assertRaises(ValueError):
+            demosaic(raw=np.zeros((6, 6), dtype=np.uint8), bayer_type='X-TRANS', method='malvar')
+
+    def test_demosaic_score(self):
+        """ Test PSNR and color error of the patches """
+        ref = np.zeros((4, 8, 3), dtype=np.uint8)
+        test = ref.copy()
+        test[:, 4:] = 3
+        with tempfile.TemporaryDirectory() as dir_out:
+            json_name = os.path.join(dir_out, 'a.json')
+            with open(json_name, 'w') as fp:
+                json.dump({'objects': [{'x': 0, 'y': 0, 'w': 4, 'h': 4, 'c': [0, 0, 0]},
+                                       {'x': 4, 'y': 0, 'w': 4, 'h': 4, 'c': [0, 0, 0]}]}, fp)
+            r = demosaic_score(img_reference=ref, img_test=test, json_name=json_name)
+        self.assertEqual(r['patches'][0]['psnr'], float('inf'))
+        self.assertEqual(r['patches'][0]['color_error'], 0)
+        self.assertAlmostEqual(r['patches'][1]['psnr'], 10 * np.log10(255 * 255 / 9))
+        self.assertAlmostEqual(r['patches'][1]['color_error'], np.sqrt(27))
+
+
+if __name__ == '__main__':
+    unittest.main()
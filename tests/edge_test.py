@@ -0,0 +1,135 @@
+import unittest
+import tempfile
+import numpy as np
+import PIL.Image
+from leesa.color import image_rgb_to_lum_itu7096
+from leesa.edge import gradient_extract, gradient_amplitude_calc, gradient_angle_calc, \
+    gradient_extract_np, gradient_calc_np, gradient_angle_quantization8, gradient_angle_quantization_np, \
+    image_paint_by_angle, edge_analysis_tiled, edge_analysis_parallel, gradient_operator_np, \
+    connected_components_np, canny_np, edge_compare
+
+
+class EdgeTests(unittest.TestCase):
+    def test_gradient_extract_none(self):
+        """ Test gradient extraction from empty image """
+        try:
+            _ = gradient_extract_np(None)
+        except ValueError as e:
+            self.assertEqual(type(e), ValueError)
+        else:
+            self.fail('ValueError for image object must be non-empty not raised')
+
+    def test_gradient_calc_np(self):
+        """ Test gradients, amplitude and angle of the 2x2 kernel """
+        lum = np.array([[0, 0, 0],
+                        [0, 10, 10],
+                        [0, 10, 10]], dtype=float)
+        gx, gy, amp, angle = gradient_calc_np(lum)
+        self.assertEqual(gx.dtype, np.float32)
+        np.testing.assert_array_equal(gx, [[5, 0, 0], [10, 0, 0], [0, 0, 0]])
+        np.testing.assert_array_equal(gy, [[5, 10, 0], [0, 0, 0], [0, 0, 0]])
+        np.testing.assert_allclose(amp, [[50 ** 0.5, 10, 0], [10, 0, 0], [0, 0, 0]], rtol=1e-6)
+        np.testing.assert_allclose(angle, [[45, 0, 0], [0, 0, 0], [0, 0, 0]], atol=1e-4)
+
+    def test_gradient_angle_negative_y(self):
+        """ Test gradient angle for the negative Y gradient """
+        lum = np.array([[10, 0],
+                        [0, 0]], dtype=float)
+        _, _, _, angle = gradient_calc_np(lum)
+        self.assertAlmostEqual(float(angle[0, 0]), 225, places=4)
+
+    def test_gradient_list_wrapper(self):
+        """ Test list API returns the same values as array API """
+        lum = np.random.default_rng(0).random((16, 24)) * 255
+        gx, gy = gradient_extract(lum.tolist())
+        amp = gradient_amplitude_calc(gx, gy)
+        angle = gradient_angle_calc(gx, gy)
+        n_gx, n_gy, n_amp, n_angle = gradient_calc_np(lum, dtype=np.float64)
+        self.assertEqual(gx, n_gx.tolist())
+        self.assertEqual(gy, n_gy.tolist())
+        self.assertEqual(amp, n_amp.tolist())
+        self.assertEqual(angle, n_angle.tolist())
+
+    def test_gradient_angle_quantization_np(self):
+        """ Test binning matches the per-pixel quantization boundaries """
+        angle = np.array([[0, 23, 23.5, 67.9, 68, 112.9, 113, 158, 203, 248, 292.9, 293, 338, 338.1, 359.9]])
+        amp = np.ones(angle.shape)
+        n_aq = gradient_angle_quantization_np(angle, amp)
+        self.assertEqual(n_aq.shape, (1, angle.shape[1], 1))
+        self.assertEqual(n_aq[0, :, 0].tolist(), [gradient_angle_quantization8(a) for a in angle[0]])
+        n_aq = gradient_angle_quantization_np(angle, np.zeros(angle.shape))
+        self.assertEqual(n_aq.max(), 0)
+
+    def test_image_paint_by_angle(self):
+        """ Test painting by the palette lookup table """
+        n_aq = np.array([[[0], [1]], [[5], [8]]], dtype=np.uint8)
+        img = image_paint_by_angle(n_aq)
+        self.assertEqual(img.dtype, np.uint8)
+        self.assertEqual(img.tolist(), [[[0, 0, 0], [255, 0, 0]], [[0, 255, 251], [255, 0, 117]]])
+
+    def test_edge_analysis_tiled(self):
+        """ Test strips give the same result as the full frame """
+        img = np.random.default_rng(1).integers(0, 256, size=(37, 29, 3), dtype=np.uint8)
+        lum = image_rgb_to_lum_itu7096(img)
+        _, _, amp, angle = gradient_calc_np(lum)
+        n_aq = gradient_angle_quantization_np(angle, amp)
+        with tempfile.TemporaryDirectory() as dir_out:
+            np.save(dir_out + '/img.npy', img)
+            # the bottom-up BMP and the uncompressed TIFF are read by strips, PNG is decoded whole
+            for ext in ['bmp', 'tif', 'png']:
+                PIL.Image.fromarray(img).save(dir_out + '/img.' + ext)
+            for src in [img, dir_out + '/img.npy', dir_out + '/img.bmp', dir_out + '/img.tif', dir_out + '/img.png']:
+                r = edge_analysis_tiled(img=src, dir_out=dir_out, strip_height=8)
+                np.testing.assert_array_equal(np.load(r['amplitude']), amp)
+                np.testing.assert_array_equal(np.load(r['angle']), angle)
+                np.testing.assert_array_equal(np.load(r['direction']), n_aq)
+
+    def test_edge_analysis_parallel(self):
+        """ Test tiles on the process pool give the same result as the full frame """
+        img = np.random.default_rng(2).integers(0, 256, size=(41, 23, 3), dtype=np.uint8)
+        lum = image_rgb_to_lum_itu7096(img)
+        _, _, amp, angle = gradient_calc_np(lum)
+        n_aq = gradient_angle_quantization_np(angle, amp)
+        for workers in [1, 2]:
+            r = edge_analysis_parallel(img=img, workers=workers, tile_height=9)
+            np.testing.assert_array_equal(r[0], amp)
+            np.testing.assert_array_equal(r[1], angle)
+            np.testing.assert_array_equal(r[2], n_aq)
+
+    def test_gradient_operator_sobel(self):
+        """ Test Sobel gradients on a vertical step """
+        lum = np.zeros((5, 6))
+        lum[:, 3:] = 10
+        gx, gy = gradient_operator_np(lum, operator='sobel')
+        np.testing.assert_array_equal(gx[2], [0, 0, 40, 40, 0, 0])
+        self.assertEqual(np.abs(gy).max(), 0)
+
+    def test_connected_components_np(self):
+        """ Test 8-connected components labeling """
+        mask = np.zeros((6, 6), dtype=bool)
+        mask[0, 0] = mask[1, 1] = mask[2, 2] = True
+        mask[0, 5] = True
+        mask[4, 1:5] = True
+        mask[5, 0] = True
+        n_labels, n = connected_components_np(mask)
+        self.assertEqual(n, 3)
+        self.assertEqual(len({n_labels[0, 0], n_labels[1, 1], n_labels[2, 2]}), 1)
+        self.assertEqual(n_labels[4, 1], n_labels[5, 0])
+        self.assertNotEqual(n_labels[0, 0], n_labels[0, 5])
+        self.assertEqual(n_labels[~mask].max(), 0)
+
+    def test_canny_np(self):
+        """ Test Canny edges of a rectangle are on its border """
+        lum = np.zeros((60, 80))
+        lum[20:40, 30:60] = 200
+        r = canny_np(lum, low_threshold=20, high_threshold=60)
+        ys, xs = np.nonzero(r['edges'])
+        self.assertTrue(ys.min() >= 18 and ys.max() <= 41)
+        self.assertTrue(xs.min() >= 28 and xs.max() <= 61)
+        self.assertEqual(r['edges'][25:35, 35:55].sum(), 0)
+        self.assertIn('hysteresis', r['timings'])
+        self.assertEqual(edge_compare(r['edges'], r['edges'])['f1'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import tempfile
+import os
+import numpy as np
+import PIL.Image
+from leesa.encoder import strip_writer, TiffStripWriter, _StripWriter
+
+
+class EncoderTests(unittest.TestCase):
+    def test_strip_writers(self):
+        """ Test PNG and TIFF written by strips are read back as the same image """
+        img = np.random.default_rng(1).integers(0, 256, size=(21, 13, 3), dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as dir_out:
+            for ext in ['.png', '.tif']:
+                file_name = os.path.join(dir_out, 'a' + ext)
+                with strip_writer(file_name, width=13, height=21) as w:
+                    for y in range(0, 21, 8):
+                        w.write(img[y:y + 8])
+                self.assertTrue(np.array_equal(np.array(PIL.Image.open(file_name)), img))
+
+    def test_strip_writer_rows_missing(self):
+        """ Test the image with missing rows is not closed silently """
+        with tempfile.TemporaryDirectory() as dir_out:
+            w = strip_writer(os.path.join(dir_out, 'a.png'), width=4, height=4)
+            w.write(np.zeros((2, 4, 3), dtype=np.uint8))
+            with self.assertRaises(ValueError):
+                w.close()
+
+    def test_strip_writer_body_error(self):
+        """ Test the error of the with body is not replaced by the rows check and the file is closed """
+        with tempfile.TemporaryDirectory() as dir_out:
+            for ext in ['png', 'tif']:
+                with self.assertRaises(KeyError):
+                    with strip_writer(os.path.join(dir_out, 'a.' + ext), width=4, height=4) as w:
+                        w.write(np.zeros((2, 4, 3), dtype=np.uint8))
+                        raise KeyError('body')
+                self.assertTrue(w.fp.closed)
+            # the too large TIFF is found before the file is opened
+            with self.assertRaises(ValueError):
+                TiffStripWriter(os.path.join(dir_out, 'large.tif'), width=2 ** 16, height=2 ** 16, bit_depth=16)
+            self.assertFalse(os.path.exists(os.path.join(dir_out, 'large.tif')))
+        with self.assertRaises(TypeError):
+            _StripWriter('a.png', 4, 4)
+
+    def test_png_significant_bits(self):
+        """ Test 16-bit PNG of 12-bit samples has sBIT chunk """
+        with tempfile.TemporaryDirectory() as dir_out:
+            file_name = os.path.join(dir_out, 'a.png')
+            with strip_writer(file_name, width=4, height=2, bit_depth=16, significant_bits=12) as w:
+                w.write(np.full((2, 4, 3), 4095 << 4, dtype=np.uint16))
+            with open(file_name, 'rb') as f:
+                data = f.read()
+        self.assertEqual(data[33:44], b'\x00\x00\x00\x03sBIT\x0c\x0c\x0c')
+
+
+if __name__ == '__main__':
+    unittest.main()
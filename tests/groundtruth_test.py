@@ -0,0 +1,36 @@
+import unittest
+import tempfile
+import json
+import os
+import numpy as np
+from leesa.chart import Chart
+from leesa.groundtruth import gt_columns, gt_save, gt_load
+
+
+class GroundTruthTests(unittest.TestCase):
+    def test_json_writer_as_json_dump(self):
+        """ Test the streaming JSON writer writes the same file as json.dump with indent=2 """
+        header = {'exporter': 'Leesa Exporter v0.1.6', 'time': 't', 'type': 'ramps', 'color': 'RGB'}
+        columns = gt_columns(x=[1, 2], y=3, w=4, h=[5, 6], c=[[0, 1, 2], [255, 254, 253]])
+        with tempfile.TemporaryDirectory() as dir_out:
+            file_name = gt_save(os.path.join(dir_out, 'a.json'), header, columns)
+            with open(file_name, 'r') as fp:
+                txt = fp.read()
+        objects = [{'x': 1, 'y': 3, 'w': 4, 'h': 5, 'c': [0, 1, 2]},
+                   {'x': 2, 'y': 3, 'w': 4, 'h': 6, 'c': [255, 254, 253]}]
+        self.assertEqual(txt, json.dumps(dict(header, objects=objects), indent=2))
+
+    def test_npz_load(self):
+        """ Test the columnar ground truth of the chart is the same as JSON ground truth """
+        with tempfile.TemporaryDirectory() as dir_out:
+            Chart(frame_type='QQVGA').edge_test(json_name=os.path.join(dir_out, 'a.json'))
+            Chart(frame_type='QQVGA', gt_format='npz').edge_test(json_name=os.path.join(dir_out, 'a.json'))
+            header_json, columns_json = gt_load(os.path.join(dir_out, 'a.json'))
+            header_npz, columns_npz = gt_load(os.path.join(dir_out, 'a.npz'))
+        self.assertEqual(header_npz['type'], header_json['type'])
+        for k in columns_json:
+            self.assertTrue(np.array_equal(columns_json[k], columns_npz[k]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+import json
+import numpy as np
+import PIL.Image
+import PIL.ImageFont
+from leesa.odchart import ODChart, _skyline_pack, _od_name_reserve
+
+
+class ODChartTests(unittest.TestCase):
+    def test_search_free_position_cross_overlap(self):
+        """ Test the overlap of the crossed boxes without corners inside each other is found """
+        od = ODChart(frame_type='QQVGA')
+        # the tall box from x 20 to 30 and y 0 to 100
+        obj_map = [{'a': {'x': 20, 'y': 0}, 'b': {'x': 30, 'y': 0}, 'c': {'x': 20, 'y': 100},
+                    'd': {'x': 30, 'y': 100}, 'scale': 1, 'offset': 0}]
+        # the wide box 60 x 10 crosses the tall box at every position left of x 31 and above y 101
+        free_pos, x, y = od.search_free_position(obj_map, 1, {'w': 60, 'h': 10}, 0, 160, 120, 0, 0)
+        self.assertEqual((free_pos, x, y), (True, 31, 0))
+        self.assertEqual(obj_map[-1]['d'], {'x': 91, 'y': 10})
+
+    def test_search_free_position_grid(self):
+        """ Test the positions are on the scale grid in the rows order and the full frame is reported """
+        od = ODChart(frame_type='QQVGA')
+        obj_map = []
+        positions = [od.search_free_position(obj_map, 7, {'w': 40, 'h': 50}, 0, 160, 120, 5, 4) for _ in range(5)]
+        self.assertEqual(positions, [(True, 0, 0), (True, 49, 0), (True, 98, 0), (True, 0, 56), (True, 49, 56)])
+        for x, y in [(0, 0), (49, 0), (98, 0)]:
+            self.assertEqual((x % 7, y % 7), (0, 0))
+        self.assertEqual(od.search_free_position(obj_map, 7, {'w': 200, 'h': 50}, 0, 160, 120, 5, 4), (False, 0, 0))
+
+    def test_skyline_pack(self):
+        """ Test the skyline packing places the boxes from the largest without overlaps and reports the rest """
+        boxes = [(10, 10), (50, 40), (30, 60), (200, 10), (20, 20), (40, 40)]
+        positions = _skyline_pack(boxes, 100, 60)
+        # the largest box is placed first to the top left corner, the box wider than the frame does not fit
+        # and the last box does not fit to the rest
+        self.assertEqual(positions[1], (0, 0))
+        self.assertEqual(positions[2], (50, 0))
+        self.assertIsNone(positions[3])
+        self.assertIsNone(positions[5])
+        placed = [(p[0], p[1], b[0], b[1]) for p, b in zip(positions, boxes) if p is not None]
+        self.assertEqual(len(placed), 4)
+        for i, (x, y, w, h) in enumerate(placed):
+            self.assertTrue(0 <= x and x + w <= 100 and 0 <= y and y + h <= 60)
+            for x1, y1, w1, h1 in placed[i + 1:]:
+                self.assertTrue(x + w <= x1 or x1 + w1 <= x or y + h <= y1 or y1 + h1 <= y)
+
+    def test_all_scales_one_image_skyline(self):
+        """ Test the skyline packing of all scales to one image reports the scales that do not fit """
+        rng = np.random.default_rng(3)
+        img = PIL.Image.fromarray(rng.integers(0, 256, (50, 50, 3), dtype=np.uint8))
+        rect = {'x': 0, 'y': 0, 'w': 50, 'h': 50}
+        od = ODChart(frame_type='QQVGA')
+        # the object 200 x 200 of the scale 50 is larger than the frame 160 x 120
+        od.scales = [2, 5, 10, 50]
+        # the default font of Pillow instead of arial.ttf, the font file is not installed everywhere
+        font = PIL.ImageFont.load_default(size=12)
+        with tempfile.TemporaryDirectory() as dir_out, mock.patch('PIL.ImageFont.truetype', lambda *a, **k: font):
+            r = od.all_scales_one_image(img, 'face.png', 'face', 0, rect, dir_out=dir_out, packing='skyline')
+            img_chart = PIL.Image.open(r['image'])
+            self.assertEqual(img_chart.size, (160, 120))
+            with open(r['json'], 'r') as fp:
+                dt_json = json.load(fp)
+        self.assertEqual(r['not_fit'], [50])
+        self.assertEqual(dt_json['not_fit'], [50])
+        self.assertEqual(dt_json['packing'], 'skyline')
+        self.assertEqual([e['scale'] for e in dt_json['objects']], [2, 5, 10])
+        placed = [(e['x'], e['y'], e['w'], e['h']) for e in dt_json['objects']]
+        for i, (x, y, w, h) in enumerate(placed):
+            self.assertTrue(0 <= x and x + w <= 160 and 0 <= y and y + h <= 120)
+            for x1, y1, w1, h1 in placed[i + 1:]:
+                self.assertTrue(x + w <= x1 or x1 + w1 <= x or y + h <= y1 or y1 + h1 <= y)
+
+    def test_scale_pyramid(self):
+        """ Test the scales from the crop pyramid are close to the direct resize of the crop """
+        rng = np.random.default_rng(1)
+        img = PIL.Image.fromarray(rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)).resize((800, 600))
+        rect = {'x': 101, 'y': 53, 'w': 397, 'h': 463}
+        od = ODChart()
+        od_direct = ODChart(scale_cache_size=0)
+        for scale in [30, 17, 9, 4, 2]:
+            r, img_scaled = od.scale(img, scale, rect)
+            r_direct, img_direct = od_direct.scale(img, scale, rect)
+            self.assertEqual(r, r_direct)
+            self.assertEqual(img_scaled.size, img_direct.size)
+            diff = np.abs(np.asarray(img_scaled, dtype=float) - np.asarray(img_direct, dtype=float)).mean()
+            self.assertLess(diff, 4)
+        # the object is cropped once
+        self.assertEqual(len(od.scale_cache), 1)
+        self.assertEqual(len(od_direct.scale_cache), 0)
+
+    def test_scale_cache_size(self):
+        """ Test the pyramids above the cache size are evicted in the least recently used order """
+        img = PIL.Image.new('RGB', (400, 300), (10, 20, 30))
+        rects = [{'x': 0, 'y': 0, 'w': 100, 'h': 100}, {'x': 200, 'y': 100, 'w': 100, 'h': 100}]
+        # the crop with 3 levels for the width 8 takes (100 * 100 + 50 * 50 + 25 * 25 + 13 * 13) * 3 = 39882 bytes
+        od = ODChart(scale_cache_size=40000)
+        od.scale(img, 2, rects[0])
+        od.scale(img, 2, rects[1])
+        self.assertEqual(list(od.scale_cache), [(id(img), 200, 100, 300, 200)])
+        od = ODChart(scale_cache_size=1000)
+        r, img_scaled = od.scale(img, 2, rects[0])
+        self.assertEqual(img_scaled.size, (8, 8))
+        self.assertEqual(len(od.scale_cache), 0)
+        with self.assertRaises(ValueError):
+            ODChart(scale_cache_size=-1)
+
+    def test_process_frame_tiling(self):
+        """ Test the tiled frame is equal to the object pasted to every grid cell """
+        rng = np.random.default_rng(2)
+        img = PIL.Image.fromarray(rng.integers(0, 256, (9, 7, 4), dtype=np.uint8), mode='RGBA')
+        rect = {'x': 0, 'y': 0, 'w': 7, 'h': 9}
+        od = ODChart(frame_type='QQVGA', color_background=(30, 60, 90))
+        with tempfile.TemporaryDirectory() as dir_out:
+            r = od.process_frame(img, scale=3, img_name='face.png', detect_name='face', dir_out=dir_out, rect=rect,
+                                 gap_x=3, gap_y=2)
+            img_chart = np.asarray(PIL.Image.open(r['image']))
+            with open(r['json'], 'r') as fp:
+                objects = json.load(fp)['objects']
+        expected = PIL.Image.new(mode='RGB', size=(160, 120), color=(30, 60, 90))
+        for y in range(2, 110, 11):
+            for x in range(3, 150, 10):
+                expected.paste(img, (x, y))
+        np.testing.assert_array_equal(img_chart, np.asarray(expected))
+        self.assertEqual(len(objects), 15 * 10)
+        self.assertEqual(objects[16], {'x': 13, 'y': 13, 'w': 7, 'h': 9, 'scale': 3})
+
+    def test_name_reserve(self):
+        """ Test the same output name is reserved with the suffix """
+        with tempfile.TemporaryDirectory() as dir_out:
+            name = os.path.join(dir_out, 'out', 'face_scale-5')
+            self.assertEqual(_od_name_reserve(name), name)
+            self.assertEqual(_od_name_reserve(name), name + '_1')
+            self.assertEqual(_od_name_reserve(name), name + '_2')
+            self.assertTrue(os.path.isfile(name + '_1.json'))
+
+    def test_object_to_images_workers(self):
+        """ Test the process pool gives the same images in the same order as the serial run """
+        with tempfile.TemporaryDirectory() as dir_out:
+            r = []
+            for workers in [1, 2]:
+                od = ODChart(frame_type='nHD')
+                r.append(od.object_to_images(dir_img='tests/data_sample/sample_0/',
+                                             dir_json='tests/data_sample/sample_0/',
+                                             dir_out=os.path.join(dir_out, str(workers)), scales=[10, 5],
+                                             workers=workers))
+            self.assertEqual(len(r[0]), 4)
+            self.assertEqual(len(set(e['image'] for e in r[0] + r[1])), 8)
+            for e1, e2 in zip(r[0], r[1]):
+                np.testing.assert_array_equal(np.asarray(PIL.Image.open(e1['image'])),
+                                              np.asarray(PIL.Image.open(e2['image'])))
+                with open(e1['json'], 'r') as fp1, open(e2['json'], 'r') as fp2:
+                    self.assertEqual(json.load(fp1)['objects'], json.load(fp2)['objects'])
+        with self.assertRaises(ValueError):
+            ODChart().object_to_images(dir_img='tests/data_sample/sample_0/', dir_json='tests/data_sample/sample_0/',
+                                       dir_out='img/out', workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
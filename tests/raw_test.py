@@ -0,0 +1,45 @@
+import unittest
+import tempfile
+import os
+import numpy as np
+from leesa.raw import raw_pack, raw_write, raw_read
+
+
+class RawTests(unittest.TestCase):
+    def test_raw10_mipi_packing(self):
+        """ Test RAW10 packs 4 pixels to 4 high bytes and 1 byte of low bits """
+        p = raw_pack(np.array([[0x3FF, 0x001, 0x2AA, 0x155]], dtype=np.uint16), raw_format='RAW10')
+        self.assertEqual(p[0].tolist(), [0xFF, 0x00, 0xAA, 0x55, 0x67])
+
+    def test_raw12_mipi_packing(self):
+        """ Test RAW12 packs 2 pixels to 2 high bytes and 1 byte of low bits """
+        p = raw_pack(np.array([[0xABC, 0x123]], dtype=np.uint16), raw_format='RAW12')
+        self.assertEqual(p[0].tolist(), [0xAB, 0x12, 0x3C])
+
+    def test_raw_value_overflow(self):
+        """ Test values above the format bits are rejected """
+        with tempfile.TemporaryDirectory() as dir_out:
+            try:
+                raw_write(raw=np.full((2, 4), 1024, dtype=np.uint16), file_name=os.path.join(dir_out, 'a.raw'),
+                          raw_format='RAW10')
+            except ValueError as e:
+                self.assertEqual(type(e), ValueError)
+            else:
+                self.fail('ValueError for raw values do not fit bits not raised')
+
+    def test_raw_write_read(self):
+        """ Test write and read back for all formats and widths not aligned to pixel groups """
+        rng = np.random.default_rng(0)
+        with tempfile.TemporaryDirectory() as dir_out:
+            for raw_format, bits in [('RAW8', 8), ('RAW10', 10), ('RAW12', 12), ('RAW16', 16)]:
+                raw = rng.integers(0, 1 << bits, size=(7, 11)).astype(np.uint16 if bits > 8 else np.uint8)
+                r = raw_write(raw=raw, file_name=os.path.join(dir_out, 'a.raw'), raw_format=raw_format, cfa='RGGB',
+                              strip_height=3)
+                raw_in, header = raw_read(r['raw'])
+                np.testing.assert_array_equal(raw_in, raw)
+                self.assertEqual(header['cfa'], 'RGGB')
+                self.assertEqual(os.path.getsize(r['raw']), header['stride'] * 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import tempfile
+import json
+import os
+import numpy as np
+from leesa.chart import Chart
+from leesa.video import rgb_to_yuv, video_render
+
+
+class VideoTests(unittest.TestCase):
+    def test_rgb_to_yuv(self):
+        """ Test BT.709 limited range of black, white and red """
+        img = np.zeros((2, 4, 3), dtype=np.uint8)
+        img[:, 2:] = 255
+        y, cb, cr = rgb_to_yuv(img=img, colorspace='C420')
+        self.assertEqual(y.tolist(), [[16, 16, 235, 235]] * 2)
+        self.assertEqual(cb.tolist(), [[128, 128]])
+        self.assertEqual(cr.tolist(), [[128, 128]])
+        img[:] = (255, 0, 0)
+        y, cb, cr = rgb_to_yuv(img=img, colorspace='C444')
+        self.assertEqual((y[0, 0], cb[0, 0], cr[0, 0]), (63, 102, 240))
+
+    def test_video_scroll(self):
+        """ Test the scrolled frames and the ground truth of the odd offsets """
+        ct = Chart(frame_type='QQVGA', color_background=(127, 127, 127))
+        ct.ramps(element_width=1, element_height=8, ramp_size=64)
+        w, h = ct.frame['w'], ct.frame['h']
+        with tempfile.TemporaryDirectory() as dir_out:
+            video_name = os.path.join(dir_out, 'ramps.y4m')
+            json_name = os.path.join(dir_out, 'ramps.jsonl')
+            r = video_render(motion='ramps', frames=4, frame_type='QQVGA', fps=30,
+                             params={'speed': 3, 'element_height': 8, 'ramp_size': 64},
+                             video_name=video_name, json_name=json_name, queue_size=1)
+            with open(video_name, 'rb') as f:
+                data = f.read()
+            with open(json_name, 'r') as f:
+                lines = [json.loads(e) for e in f]
+        header = b'YUV4MPEG2 W160 H120 F30:1 Ip A1:1 C420jpeg XCOLORRANGE=LIMITED\n'
+        self.assertTrue(data.startswith(header))
+        frame_size = len(b'FRAME\n') + w * h * 3 // 2
+        self.assertEqual(len(data), len(header) + 4 * frame_size)
+        self.assertEqual(r['frames'], 4)
+        for t in range(4):
+            offset = len(header) + t * frame_size + len(b'FRAME\n')
+            planes = rgb_to_yuv(np.roll(ct.canvas, -3 * t, axis=1), 'C420')
+            self.assertEqual(data[offset:offset + frame_size - 6], b''.join(p.tobytes() for p in planes))
+        self.assertEqual(lines[0]['fps'], 30)
+        self.assertEqual([e['frame'] for e in lines[1:]], [0, 1, 2, 3])
+        x0 = [e['x'] for e in lines[1]['objects']]
+        self.assertEqual([e['x'] for e in lines[4]['objects']], [(x - 9) % w for x in x0])
+
+    def test_video_raw_scale(self):
+        """ Test raw YUV 4:4:4 output of the scaled object """
+        with tempfile.TemporaryDirectory() as dir_out:
+            video_name = os.path.join(dir_out, 'objects.yuv')
+            json_name = os.path.join(dir_out, 'objects.jsonl')
+            video_render(motion='objects_scale', frames=3, frame_type='QQVGA', fps=25, colorspace='C444',
+                         params={'img_name': 'tests/data_sample/sample_2/sample_0.jpg',
+                                 'json_name': 'tests/data_sample/sample_2/sample_0.json',
+                                 'scale_size': 2, 'scale_start': 10, 'scale_end': 20},
+                         video_name=video_name, json_name=json_name)
+            self.assertEqual(os.path.getsize(video_name), 3 * 160 * 120 * 3)
+            with open(json_name, 'r') as f:
+                lines = [json.loads(e) for e in f]
+        self.assertEqual([e['objects'][0]['w'] for e in lines[1:]], [20, 30, 40])
+
+
+if __name__ == '__main__':
+    unittest.main()